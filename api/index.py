@@ -5,12 +5,13 @@ from __future__ import annotations
 import json
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 from urllib.parse import quote
 
 from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 BACKEND_DIR = PROJECT_ROOT / "backend"
@@ -18,17 +19,34 @@ sys.path.insert(0, str(PROJECT_ROOT))
 sys.path.insert(0, str(BACKEND_DIR))
 os.environ.setdefault("FONT_DIR", str(PROJECT_ROOT / "backend" / "assets" / "fonts"))
 
-from app.services.image_processor import process_image_to_data_url  # noqa: E402
-from app.services.report_service import ReportServiceError, generate_pdf_bytes  # noqa: E402
+from app.routes.jobs import router as jobs_router  # noqa: E402
+from app.routes.metrics import router as metrics_router  # noqa: E402
+from app.services.admission import AdmissionRejected, admission_scope  # noqa: E402
+from app.services.body_encoder import InlineImage  # noqa: E402
+from app.services.http_client import get_upstream_pool, upstream_pool_lifespan  # noqa: E402
+from app.services.image_processor import process_image_to_jpeg  # noqa: E402
+from app.services.jobs import job_manager_lifespan  # noqa: E402
+from app.services.pdf_delivery import pdf_streaming_response  # noqa: E402
+from app.services.render_executor import render_executor_lifespan  # noqa: E402
+from app.services.report_service import (  # noqa: E402
+    ReportServiceError,
+    generate_pdf_file,
+    stream_pdf_generation,
+)
+from app.services.sse import SSE_HEADERS, error_payload, format_sse  # noqa: E402
+from app.settings import get_settings  # noqa: E402
 from app.web_ui import render_image_merger_html, render_index_html  # noqa: E402
 
-app = FastAPI(title="外卖四件套 PDF 生成")
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    async with upstream_pool_lifespan(app), render_executor_lifespan(app), job_manager_lifespan(app):
+        yield
 
-def _build_error_payload(exc: BaseException) -> dict[str, Any]:
-    if os.getenv("DIAGNOSTIC_LOGS") == "1":
-        return {"detail": f"内部错误: {exc}", "type": exc.__class__.__name__}
-    return {"detail": "服务器内部错误"}
+
+app = FastAPI(title="外卖四件套 PDF 生成", lifespan=_lifespan)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
 
 
 @app.middleware("http")
@@ -36,7 +54,7 @@ async def add_debug_headers(request: Request, call_next):
     try:
         response = await call_next(request)
     except BaseException as exc:
-        response = JSONResponse(status_code=500, content=_build_error_payload(exc))
+        response = JSONResponse(status_code=500, content=error_payload(exc))
     response.headers.update(build_debug_headers())
     return response
 
@@ -45,7 +63,7 @@ async def add_debug_headers(request: Request, call_next):
 async def handle_unexpected_error(request: Request, exc: Exception):
     return JSONResponse(
         status_code=500,
-        content=_build_error_payload(exc),
+        content=error_payload(exc),
         headers=build_debug_headers(),
     )
 
@@ -129,17 +147,18 @@ def build_debug_headers() -> dict[str, str]:
     }
 
 
-@app.post("/api/generate")
-async def generate(
+async def _read_generate_request(
     request: Request,
-    module: str | None = Form(None),
-    payload_json: str | None = Form(None),
-    screenshot: UploadFile | None = File(None),
-):
+    module: str | None,
+    payload_json: str | None,
+    screenshot: UploadFile | None,
+    no_cache: bool,
+) -> tuple[str, dict[str, Any], InlineImage | None, bool]:
     if request.headers.get("content-type", "").startswith("application/json"):
         body = await request.json()
         module = body.get("module")
         payload = body.get("payload") or {}
+        no_cache = bool(body.get("no_cache"))
     else:
         payload = _parse_payload(payload_json)
 
@@ -151,17 +170,78 @@ async def generate(
     screenshot_data_url = None
     if screenshot is not None:
         raw = await screenshot.read()
-        screenshot_data_url = process_image_to_data_url(raw)
+        screenshot_data_url = InlineImage(process_image_to_jpeg(raw))
         payload["enableScreenshotAnalysis"] = True
+    return module, payload, screenshot_data_url, no_cache
+
+
+@app.post("/api/generate")
+async def generate(
+    request: Request,
+    module: str | None = Form(None),
+    payload_json: str | None = Form(None),
+    screenshot: UploadFile | None = File(None),
+    no_cache: bool = Form(False),
+):
+    module, payload, screenshot_data_url, no_cache = await _read_generate_request(
+        request, module, payload_json, screenshot, no_cache
+    )
 
     try:
-        pdf_bytes = await generate_pdf_bytes(
-            module=module, payload=payload, screenshot_data_url=screenshot_data_url
-        )
+        with admission_scope(deadline_seconds=get_settings().upstream_request_deadline_seconds):
+            spool = await generate_pdf_file(
+                module=module,
+                payload=payload,
+                screenshot_data_url=screenshot_data_url,
+                client=get_upstream_pool().client,
+                bypass_cache=no_cache,
+            )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        ) from e
     except ReportServiceError as e:
         raise HTTPException(status_code=502, detail=str(e)) from e
 
     filename = build_pdf_filename(module, payload)
     headers = {"Content-Disposition": build_content_disposition(filename)}
     headers.update(build_debug_headers())
-    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+    return pdf_streaming_response(spool, headers=headers)
+
+
+@app.post("/api/generate/stream")
+async def generate_stream(
+    request: Request,
+    module: str | None = Form(None),
+    payload_json: str | None = Form(None),
+    screenshot: UploadFile | None = File(None),
+    no_cache: bool = Form(False),
+):
+    module, payload, screenshot_data_url, no_cache = await _read_generate_request(
+        request, module, payload_json, screenshot, no_cache
+    )
+    filename = build_pdf_filename(module, payload)
+
+    async def events():
+        try:
+            with admission_scope(deadline_seconds=get_settings().upstream_request_deadline_seconds):
+                async for event, data in stream_pdf_generation(
+                    module=module,
+                    payload=payload,
+                    screenshot_data_url=screenshot_data_url,
+                    client=get_upstream_pool().client,
+                    bypass_cache=no_cache,
+                ):
+                    if event == "pdf":
+                        data = {**data, "filename": filename}
+                    yield format_sse(event, data)
+        except AdmissionRejected as e:
+            yield format_sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except ReportServiceError as e:
+            yield format_sse("error", {"detail": str(e)})
+        except Exception as e:  # noqa: BLE001 - 流已开始，只能以事件形式返回错误
+            yield format_sse("error", error_payload(e))
+
+    headers = dict(SSE_HEADERS)
+    headers.update(build_debug_headers())
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
@@ -1,5 +1,6 @@
 """FastAPI 应用入口。"""
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -7,18 +8,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
+from app.routes.assets import router as assets_router
 from app.routes.healthz import router as healthz_router
+from app.routes.jobs import router as jobs_router
+from app.routes.metrics import router as metrics_router
 from app.routes.reports import router as reports_router
 from app.routes.screenshot import router as screenshot_router
+from app.services.font_assets import FontAssets
+from app.services.http_client import upstream_pool_lifespan
+from app.services.jobs import job_manager_lifespan
+from app.services.render_executor import render_executor_lifespan
 from app.services.report_store import InMemoryReportStore
 from app.services.template_renderer import ReportTemplateRenderer
 from app.settings import get_settings
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    async with upstream_pool_lifespan(app), render_executor_lifespan(app), job_manager_lifespan(app):
+        yield
+
+
 def create_app() -> FastAPI:
     settings = get_settings()
 
-    app = FastAPI(title="外卖店铺四件套 FastAPI 后端")
+    app = FastAPI(title="外卖店铺四件套 FastAPI 后端", lifespan=_lifespan)
     app.state.settings = settings
     app.state.report_store = InMemoryReportStore(
         ttl_seconds=settings.report_ttl_seconds
@@ -28,7 +42,10 @@ def create_app() -> FastAPI:
     templates_dir = Path(__file__).resolve().parent / "templates"
     fonts_dir = base_dir / "assets" / "fonts"
     app.state.template_renderer = ReportTemplateRenderer(
-        templates_dir=templates_dir, fonts_dir=fonts_dir
+        templates_dir=templates_dir,
+        fonts_dir=fonts_dir,
+        font_subsets=settings.preview_font_subsets,
+        font_assets=FontAssets(fonts_dir, subset_cache_size=settings.preview_font_subset_cache_size),
     )
 
     allow_origins = [
@@ -43,7 +60,10 @@ def create_app() -> FastAPI:
         expose_headers=["Content-Disposition"],
     )
 
+    app.include_router(assets_router)
     app.include_router(healthz_router)
+    app.include_router(jobs_router)
+    app.include_router(metrics_router)
     app.include_router(reports_router)
     app.include_router(screenshot_router)
 
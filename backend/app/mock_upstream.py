@@ -0,0 +1,363 @@
+"""
+本地模拟上游（OpenAI 兼容 /v1/chat/completions），用于离线压测与端到端测试。
+
+说明：
+- 支持非流式与 SSE 流式；按模块返回固定的 ReportData 结构 JSON，系统提示词要求 Markdown 时返回 Markdown，
+  大纲模式的大纲/单章请求分别返回大纲与单章 blocks。
+- 首字节延迟可选 fixed / uniform / lognormal 分布，输出按 tokens_per_second 匀速吐出，超过 max_tokens 时截断（finish_reason=length），续写请求从已输出部分之后继续。
+- 可按比例注入 500 错误、429 限流（带 Retry-After）与截断的 JSON。
+- 启动：`uvicorn app.mock_upstream:create_mock_app --factory --port 9000`，
+  再设置 `UPSTREAM_BASE_URL=http://127.0.0.1:9000/v1/chat/completions`、`UPSTREAM_API_KEY=mock`。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ConfigDict
+from pydantic_settings import BaseSettings
+
+from app.services.sse import SSE_HEADERS
+from app.services.token_estimator import estimate_messages_tokens, estimate_tokens
+
+
+class MockUpstreamSettings(BaseSettings):
+    latency_distribution: str = "lognormal"
+    latency_ms: float = 800.0
+    latency_spread: float = 0.5
+    model_latency_ms: dict[str, float] = {}
+    tokens_per_second: float = 200.0
+    chunk_chars: int = 24
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: int = 1
+    truncate_rate: float = 0.0
+    sections: int = 4
+    seed: int | None = None
+
+    model_config = ConfigDict(
+        env_prefix="MOCK_UPSTREAM_",
+        env_file=(".env", ".env.local"),
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+_MODULE_KEYWORDS = [
+    ("market", "商圈调研"),
+    ("store-activity", "活动方案"),
+    ("data-statistics", "数据统计"),
+    ("brand", "品牌定位"),
+]
+
+_MODULE_TOPICS: dict[str, tuple[str, list[str]]] = {
+    "brand": ("品牌定位分析方案", ["品牌现状诊断", "目标客群画像", "差异化定位", "视觉与话术", "落地执行计划", "效果评估"]),
+    "market": ("商圈调研分析报告", ["商圈概况", "客流与消费力", "竞品分布", "外卖供需", "选址与投放建议", "风险提示"]),
+    "store-activity": ("外卖店铺活动方案", ["活动目标", "满减与折扣设计", "爆品与套餐", "流量投放", "活动节奏", "复盘指标"]),
+    "data-statistics": ("数据统计分析报告", ["核心指标总览", "流量漏斗", "转化与客单价", "商品结构", "评价与复购", "改进建议"]),
+}
+
+
+def detect_module(user_prompt: str) -> str:
+    for module, keyword in _MODULE_KEYWORDS:
+        if keyword in user_prompt:
+            return module
+    return "brand"
+
+
+def canned_report(module: str, *, sections: int = 4) -> dict[str, Any]:
+    title, topics = _MODULE_TOPICS.get(module) or _MODULE_TOPICS["brand"]
+    out_sections = []
+    for idx in range(max(1, sections)):
+        topic = topics[idx % len(topics)]
+        out_sections.append(
+            {
+                "title": f"{idx + 1}. {topic}",
+                "summary": f"围绕“{topic}”梳理现状、问题与可执行动作，便于门店按周落地。",
+                "blocks": [
+                    {"type": "subtitle", "text": f"{topic}要点"},
+                    {
+                        "type": "paragraph",
+                        "text": (
+                            f"结合近30天经营数据与周边竞品情况，{topic}环节仍有明显提升空间。"
+                            "建议优先处理曝光不足与进店转化偏低的问题，再逐步优化客单价与复购。"
+                        ),
+                    },
+                    {
+                        "type": "bullets",
+                        "items": [
+                            "午晚高峰前30分钟加大曝光投放，控制单次点击成本",
+                            "主推2款高毛利爆品，详情页补充实拍图与卖点",
+                            "满减梯度按客单价中位数上下各设一档",
+                        ],
+                    },
+                    {
+                        "type": "table",
+                        "headers": ["指标", "当前", "目标", "负责人"],
+                        "rows": [
+                            ["曝光人数", "12,800", "16,000", "店长"],
+                            ["进店转化率", "8.6%", "11%", "运营"],
+                            ["下单转化率", "21%", "25%", "运营"],
+                        ],
+                    },
+                    {
+                        "type": "highlight_cards",
+                        "items": [
+                            {"title": "本周重点", "text": f"完成{topic}相关调整并记录数据变化"},
+                            {"title": "预期效果", "text": "订单量提升10%-15%，评分稳定在4.7以上"},
+                        ],
+                    },
+                ],
+            }
+        )
+    return {
+        "cover": {
+            "store_name": "示例餐饮店",
+            "report_title": title,
+            "report_subtitle": "模拟上游生成，仅用于压测",
+            "business_line": "外卖",
+            "period_text": "2024年01月",
+            "plan_date": "2024-01-01",
+        },
+        "sections": out_sections,
+    }
+
+
+def canned_markdown(module: str, *, sections: int = 4) -> str:
+    report = canned_report(module, sections=sections)
+    lines = [f"# {report['cover']['report_title']}", ""]
+    for section in report["sections"]:
+        lines += [f"## {section['title']}", "", section["summary"], ""]
+        for block in section["blocks"]:
+            if block["type"] == "subtitle":
+                lines += [f"### {block['text']}", ""]
+            elif block["type"] == "paragraph":
+                lines += [block["text"], ""]
+            elif block["type"] == "bullets":
+                lines += [f"- {item}" for item in block["items"]] + [""]
+            elif block["type"] == "table":
+                lines.append("| " + " | ".join(block["headers"]) + " |")
+                lines.append("|" + "---|" * len(block["headers"]))
+                lines += ["| " + " | ".join(row) + " |" for row in block["rows"]]
+                lines.append("")
+            elif block["type"] == "highlight_cards":
+                lines += [f"> **{item['title']}**：{item['text']}" for item in block["items"]] + [""]
+    return "\n".join(lines).strip()
+
+
+def _message_text(messages: list[dict[str, Any]], role: str) -> str:
+    texts = []
+    for message in messages:
+        if message.get("role") != role:
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts += [part.get("text") or "" for part in content if part.get("type") == "text"]
+    return "\n".join(texts)
+
+
+def _cut_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+class MockUpstream:
+    def __init__(self, settings: MockUpstreamSettings | None = None):
+        self.settings = settings or MockUpstreamSettings()
+        self.random = random.Random(self.settings.seed)
+        self.requests_total = 0
+        self.streams_total = 0
+        self.errors_total = 0
+        self.rate_limited_total = 0
+        self.truncated_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def first_byte_seconds(self, model: str) -> float:
+        s = self.settings
+        median = float(s.model_latency_ms.get(model, s.latency_ms)) / 1000.0
+        if median <= 0:
+            return 0.0
+        if s.latency_distribution == "fixed":
+            return median
+        if s.latency_distribution == "uniform":
+            return max(0.0, self.random.uniform(median * (1 - s.latency_spread), median * (1 + s.latency_spread)))
+        return self.random.lognormvariate(0.0, max(0.0, s.latency_spread)) * median
+
+    def output_seconds(self, text: str) -> float:
+        tps = self.settings.tokens_per_second
+        return estimate_tokens(text) / tps if tps > 0 else 0.0
+
+    def build_content(self, body: dict[str, Any]) -> tuple[str, str]:
+        """按请求体生成 (内容, finish_reason)。"""
+        messages = body.get("messages") or []
+        module = detect_module(_message_text(messages, "user"))
+        sections = self.settings.sections
+        user_text = _message_text(messages, "user")
+        if "Markdown" in _message_text(messages, "system"):
+            content = canned_markdown(module, sections=sections)
+        elif "只输出报告大纲" in user_text:
+            report = canned_report(module, sections=sections)
+            outline = [{"title": s["title"], "summary": s["summary"]} for s in report["sections"]]
+            content = json.dumps({"cover": report["cover"], "sections": outline}, ensure_ascii=False, indent=2)
+        elif "只输出指定章节的内容块" in user_text:
+            blocks = canned_report(module, sections=1)["sections"][0]["blocks"]
+            content = json.dumps({"blocks": blocks}, ensure_ascii=False, indent=2)
+        else:
+            content = json.dumps(canned_report(module, sections=sections), ensure_ascii=False, indent=2)
+        # 续写请求：从已输出部分之后继续
+        partial = _message_text(messages, "assistant")
+        if partial and content.startswith(partial):
+            content = content[len(partial) :]
+        elif self.settings.truncate_rate > 0 and self.random.random() < self.settings.truncate_rate:
+            self.truncated_total += 1
+            content = content[: int(len(content) * self.random.uniform(0.3, 0.9))]
+        max_tokens = int(body.get("max_tokens") or 0)
+        if max_tokens > 0:
+            cut = _cut_to_tokens(content, max_tokens)
+            if cut != content:
+                return cut, "length"
+        return content, "stop"
+
+    def injected_error(self) -> JSONResponse | None:
+        s = self.settings
+        if s.rate_limit_rate > 0 and self.random.random() < s.rate_limit_rate:
+            self.rate_limited_total += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": str(s.retry_after_seconds)},
+            )
+        if s.error_rate > 0 and self.random.random() < s.error_rate:
+            self.errors_total += 1
+            return JSONResponse({"error": {"message": "Internal error (mock)", "type": "server_error"}}, status_code=500)
+        return None
+
+    def enter(self) -> None:
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "requests_total": self.requests_total,
+            "streams_total": self.streams_total,
+            "errors_total": self.errors_total,
+            "rate_limited_total": self.rate_limited_total,
+            "truncated_total": self.truncated_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+
+def _usage(body: dict[str, Any], content: str) -> dict[str, int]:
+    prompt_tokens = estimate_messages_tokens(body.get("messages") or [])
+    completion_tokens = estimate_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+async def _stream_events(
+    mock: MockUpstream, body: dict[str, Any], content: str, finish_reason: str
+) -> AsyncIterator[bytes]:
+    completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    model = str(body.get("model") or "")
+    step = max(1, mock.settings.chunk_chars)
+
+    def chunk(delta: dict[str, Any], finish: str | None = None) -> bytes:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    try:
+        yield chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(content), step):
+            piece = content[start : start + step]
+            await asyncio.sleep(mock.output_seconds(piece))
+            yield chunk({"content": piece})
+        yield chunk({}, finish_reason)
+        yield b"data: [DONE]\n\n"
+    finally:
+        mock.leave()
+
+
+def create_mock_app(settings: MockUpstreamSettings | None = None) -> FastAPI:
+    mock = MockUpstream(settings)
+    app = FastAPI(title="模拟上游（OpenAI 兼容）")
+    app.state.mock = mock
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = str(body.get("model") or "")
+        mock.enter()
+        streaming = False
+        try:
+            await asyncio.sleep(mock.first_byte_seconds(model))
+            error = mock.injected_error()
+            if error is not None:
+                return error
+
+            content, finish_reason = mock.build_content(body)
+            if body.get("stream"):
+                mock.streams_total += 1
+                streaming = True
+                return StreamingResponse(
+                    _stream_events(mock, body, content, finish_reason),
+                    media_type="text/event-stream",
+                    headers=SSE_HEADERS,
+                )
+
+            await asyncio.sleep(mock.output_seconds(content))
+            return {
+                "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": finish_reason,
+                    }
+                ],
+                "usage": _usage(body, content),
+            }
+        finally:
+            if not streaming:
+                mock.leave()
+
+    @app.get("/mock/stats")
+    def stats():
+        return mock.metrics()
+
+    return app
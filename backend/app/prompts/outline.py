@@ -0,0 +1,59 @@
+"""大纲模式提示词：先生成封面与章节大纲，再逐章生成内容块。"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from app.prompts.json_schema import JSON_RULES
+from app.prompts.registry import build_prompt
+
+OUTLINE_RULES = """
+请严格输出 JSON 对象，不要输出 Markdown 或 HTML，不要用 ``` 包裹。
+本次只输出报告大纲，顶层字段：cover、sections。
+cover 字段包含：store_name、report_title、report_subtitle、business_line、period_text、plan_date。
+sections 为数组（6-10 项），每项只包含：
+- title（章节标题）
+- summary（目录摘要，一句话）
+不要输出 blocks。
+""".strip()
+
+SECTION_RULES = """
+请严格输出 JSON 对象，不要输出 Markdown 或 HTML，不要用 ``` 包裹。
+本次只输出指定章节的内容块，顶层字段仅 blocks（内容块数组）。
+
+blocks 支持类型：
+1) {"type": "paragraph", "text": "..."}
+2) {"type": "subtitle", "text": "..."}
+3) {"type": "bullets", "items": ["..."] }
+4) {"type": "table", "headers": ["..."], "rows": [["..."]] }
+5) {"type": "highlight_cards", "items": [{"title": "...", "text": "..."}] }
+""".strip()
+
+
+def _brief(module: str, payload: dict[str, Any]) -> str:
+    """模块提示词去掉整篇 JSON 规则后的业务信息与内容要求。"""
+    prompt = build_prompt(module, payload)
+    return prompt.removeprefix(JSON_RULES).strip()
+
+
+def build_outline_prompt(module: str, payload: dict[str, Any]) -> str:
+    return f"{OUTLINE_RULES}\n\n{_brief(module, payload)}\n"
+
+
+def build_section_prompt(module: str, payload: dict[str, Any], outline: dict[str, Any], index: int) -> str:
+    sections = outline.get("sections") or []
+    toc = "\n".join(
+        f"{i + 1}. {s.get('title', '')}：{s.get('summary', '')}" for i, s in enumerate(sections)
+    )
+    section = sections[index]
+    cover = outline.get("cover") or {}
+    return (
+        f"{SECTION_RULES}\n\n"
+        f"{_brief(module, payload)}\n\n"
+        f"报告标题：{cover.get('report_title', '')}\n"
+        f"报告目录：\n{toc}\n\n"
+        f"本次只需输出第 {index + 1} 章的 blocks：\n"
+        f"{json.dumps({'title': section.get('title', ''), 'summary': section.get('summary', '')}, ensure_ascii=False)}\n"
+        "内容需紧扣本章标题与摘要，不要重复其他章节的内容。\n"
+    )
@@ -0,0 +1,49 @@
+"""预览页字体资源接口（内容哈希 URL，长期缓存）。"""
+
+from __future__ import annotations
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from app.routes.reports_common import get_renderer
+from app.services.font_assets import CACHE_CONTROL, MEDIA_TYPES, SUBSET_FLAVOR, URL_PREFIX
+from app.services.single_flight import get_flight_group
+
+router = APIRouter()
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return request.headers.get("if-none-match") == etag
+
+
+@router.get(URL_PREFIX + "/subset/{name}")
+async def font_subset(request: Request, name: str):
+    stem, _, flavor = name.rpartition(".")
+    key, _, weight = stem.partition("-")
+    if flavor != SUBSET_FLAVOR or not key or not weight:
+        raise HTTPException(status_code=404, detail="字体不存在")
+    etag = f'"{stem}"'
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    assets = get_renderer(request).font_assets
+    # 子集化耗时数百毫秒：放到线程中执行，同一子集的并发请求合并
+    data = await get_flight_group("font_subset").do(stem, lambda: asyncio.to_thread(assets.subset_bytes, key, weight))
+    if data is None:
+        raise HTTPException(status_code=404, detail="字体子集不存在或已过期")
+    return Response(data, media_type=MEDIA_TYPES[flavor], headers=headers)
+
+
+@router.get(URL_PREFIX + "/{filename}")
+def font_file(request: Request, filename: str):
+    font = get_renderer(request).font_assets.find(filename)
+    if font is None:
+        raise HTTPException(status_code=404, detail="字体不存在")
+    etag = f'"{font.digest}"'
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(font.path, media_type=font.media_type, headers=headers)
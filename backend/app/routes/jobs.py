@@ -0,0 +1,121 @@
+"""异步报告任务接口（提交 / 查询进度 / SSE 进度 / 下载 PDF）。"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.routes.reports_common import (
+    build_meta,
+    content_disposition_attachment,
+    filename_from_title,
+    read_screenshot,
+    safe_module,
+)
+from app.services.image_processor import process_image_to_jpeg
+from app.services.jobs import JOB_DONE, JOB_FAILED, Job, JobManager, JobQueueFull, get_job_manager
+from app.services.pdf_delivery import pdf_streaming_response
+from app.services.sse import SSE_HEADERS, format_sse
+from app.settings import get_settings
+
+router = APIRouter()
+
+
+def get_jobs(request: Request) -> JobManager:
+    return getattr(request.app.state, "job_manager", None) or get_job_manager()
+
+
+def _links(job: Job) -> dict[str, str]:
+    base = f"/api/jobs/{job.id}"
+    return {"status_url": base, "events_url": f"{base}/events", "pdf_url": f"{base}/pdf"}
+
+
+def _get_job(manager: JobManager, job_id: str) -> Job:
+    job = manager.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job
+
+
+@router.post("/api/jobs")
+async def submit_job(
+    request: Request,
+    module: str | None = Form(None),
+    payload_json: str | None = Form(None),
+    screenshot: UploadFile | None = File(None),
+    no_cache: bool = Form(False),
+):
+    if request.headers.get("content-type", "").startswith("application/json"):
+        body = await request.json()
+        module = body.get("module")
+        payload = body.get("payload") or {}
+        no_cache = bool(body.get("no_cache"))
+    else:
+        try:
+            payload = json.loads(payload_json or "{}")
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail="payload_json 不是合法 JSON") from e
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="payload 必须是对象")
+    module = safe_module(module or "")
+
+    screenshot_jpeg = None
+    if screenshot is not None:
+        raw = await read_screenshot(screenshot, get_settings().max_upload_mb)
+        if raw:
+            try:
+                screenshot_jpeg = process_image_to_jpeg(raw)
+            except Exception as e:  # noqa: BLE001 - Pillow 异常类型较多
+                raise HTTPException(status_code=400, detail=f"截图处理失败: {e}") from e
+            payload["enableScreenshotAnalysis"] = True
+
+    try:
+        job = await get_jobs(request).submit(
+            module=module, payload=payload, screenshot=screenshot_jpeg, no_cache=no_cache
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"}) from e
+    return JSONResponse({**job.public(), **_links(job)}, status_code=202)
+
+
+@router.get("/api/jobs/{job_id}")
+def get_job_status(request: Request, job_id: str):
+    job = _get_job(get_jobs(request), job_id)
+    return {**job.public(), **_links(job)}
+
+
+@router.get("/api/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """以 SSE 推送任务进度：stage 事件，结束时推送 done（含 pdf_url）或 error。"""
+    manager = get_jobs(request)
+    _get_job(manager, job_id)
+
+    async def events():
+        async for job in manager.watch(job_id):
+            data: dict[str, Any] = {"status": job.status, "stage": job.stage}
+            if job.status == JOB_DONE:
+                yield format_sse("done", {**data, "pdf_url": _links(job)["pdf_url"]})
+            elif job.status == JOB_FAILED:
+                yield format_sse("error", {**data, "detail": job.error})
+            else:
+                yield format_sse("stage", data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/api/jobs/{job_id}/pdf")
+def download_job_pdf(request: Request, job_id: str):
+    manager = get_jobs(request)
+    job = _get_job(manager, job_id)
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"任务失败: {job.error}")
+    spool = manager.store.open_result(job_id) if job.status == JOB_DONE else None
+    if spool is None:
+        raise HTTPException(status_code=409, detail=f"任务尚未完成（{job.status}）")
+    title = build_meta(job.module, job.payload)["title"]
+    return pdf_streaming_response(
+        spool, headers={"Content-Disposition": content_disposition_attachment(filename_from_title(title))}
+    )
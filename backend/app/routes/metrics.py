@@ -0,0 +1,39 @@
+"""运行指标接口（连接池等）。"""
+
+from fastapi import APIRouter, Request
+
+from app.services.admission import get_admission_controller
+from app.services.hedging import get_hedge_policy, get_stream_hedge_policy
+from app.services.http_client import get_upstream_pool
+from app.services.jobs import get_job_manager
+from app.services.json_parser import get_repair_stats
+from app.services.llm_cache import get_llm_cache
+from app.services.outline_generation import get_outline_stats
+from app.services.render_executor import get_render_executor
+from app.services.single_flight import flight_metrics
+from app.services.structured_output import get_parse_failure_tracker
+from app.services.token_estimator import get_output_tracker
+
+router = APIRouter()
+
+
+@router.get("/api/metrics")
+def metrics(request: Request):
+    pool = getattr(request.app.state, "upstream_pool", None) or get_upstream_pool()
+    cache = get_llm_cache()
+    renderer = getattr(request.app.state, "template_renderer", None)
+    return {
+        "upstream_pool": pool.metrics(),
+        "llm_cache": cache.metrics() if cache is not None else None,
+        "single_flight": flight_metrics(),
+        "hedging": get_hedge_policy().metrics(),
+        "hedging_stream": get_stream_hedge_policy().metrics(),
+        "admission": get_admission_controller().metrics(),
+        "output_tokens": get_output_tracker().metrics(),
+        "json_repair": get_repair_stats().metrics(),
+        "outline": get_outline_stats().metrics(),
+        "json_parse": get_parse_failure_tracker().metrics(),
+        "render": (getattr(request.app.state, "render_executor", None) or get_render_executor()).metrics(),
+        "jobs": (getattr(request.app.state, "job_manager", None) or get_job_manager()).metrics(),
+        "font_assets": renderer.font_assets.metrics() if renderer is not None else None,
+    }
@@ -6,8 +6,11 @@ from datetime import datetime
 from typing import Any
 from urllib.parse import quote
 
-from fastapi import HTTPException, Request
+import httpx
+from fastapi import HTTPException, Request, UploadFile
 
+from app.services.admission import AdmissionRejected
+from app.services.http_client import get_upstream_pool
 from app.services.report_store import InMemoryReportStore
 from app.services.template_renderer import MODULE_THEMES, ReportTemplateRenderer
 
@@ -56,6 +59,22 @@ def now_text() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def admission_rejected_error(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(exc),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def read_screenshot(screenshot: UploadFile, max_upload_mb: int) -> bytes:
+    """读取上传的截图，超过 max_upload_mb 时返回 413。"""
+    raw = await screenshot.read()
+    if len(raw) > max_upload_mb * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"截图过大，最大{max_upload_mb}MB")
+    return raw
+
+
 def get_store(request: Request) -> InMemoryReportStore:
     store = getattr(request.app.state, "report_store", None)
     if not store:
@@ -76,3 +95,9 @@ def get_settings(request: Request):
         raise HTTPException(status_code=500, detail="后端未初始化settings")
     return s
 
+
+def get_upstream_client(request: Request) -> httpx.AsyncClient:
+    pool = getattr(request.app.state, "upstream_pool", None)
+    if pool is None or pool.closed:
+        pool = get_upstream_pool()
+    return pool.client
@@ -4,16 +4,43 @@ from __future__ import annotations
 
 import json
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, AsyncIterator
 
-import httpx
 from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.prompts.registry import build_prompt
-from app.routes.reports_common import build_meta, get_settings, get_store, safe_module
-from app.services.image_processor import process_image_to_data_url
-from app.services.upstream_llm import UpstreamConfig, UpstreamError, chat_completions
+from app.routes.reports_common import (
+    admission_rejected_error,
+    build_meta,
+    get_settings,
+    get_store,
+    get_upstream_client,
+    read_screenshot,
+    safe_module,
+)
+from app.services.admission import AdmissionRejected, admission_scope, get_admission_controller
+from app.services.hedging import build_upstream_targets, hedged_call, hedged_stream
+from app.services.body_encoder import InlineImage
+from app.services.image_processor import process_image_to_jpeg
+from app.services.llm_cache import get_llm_cache
+from app.services.single_flight import flight_key, get_flight_group
+from app.services.sse import SSE_HEADERS, error_payload, format_sse
+from app.services.upstream_llm import (
+    ChatResult,
+    UpstreamConfig,
+    UpstreamError,
+    chat_completions,
+    normalize_markdown,
+    stream_chat_completions,
+)
+from app.services.token_estimator import (
+    RequestPlan,
+    estimate_tokens,
+    get_output_tracker,
+    plan_request,
+    repair_max_tokens,
+)
 
 router = APIRouter()
 
@@ -40,13 +67,20 @@ def _select_model(settings: Any, module: str) -> str:
     return default
 
 
-@router.post("/api/reports/generate")
-async def generate_report(
+SYSTEM_PROMPT = (
+    "你是一位资深的餐饮外卖运营与市场分析专家。"
+    "你的目标是输出清晰、可执行、可落地的建议。"
+    "严格输出Markdown正文，不要输出任何问候/开场白；不要输出HTML标签；不要用```包裹全文。"
+)
+
+
+async def _read_generate_form(
     request: Request,
-    module: str = Form(...),
-    payload_json: str = Form(...),
-    screenshot: UploadFile | None = File(None),
-):
+    module: str,
+    payload_json: str,
+    screenshot: UploadFile | None,
+) -> tuple[str, dict[str, Any], InlineImage | None]:
+    """解析表单；截图保留为 JPEG 字节（上游请求体分块编码），只在保存报告时生成 dataURL。"""
     module = safe_module(module)
     settings = get_settings(request)
 
@@ -57,60 +91,81 @@ async def generate_report(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"payload_json解析失败: {e}") from e
 
-    screenshot_data_url: str | None = None
+    image: InlineImage | None = None
     if screenshot is not None:
-        raw = await screenshot.read()
-        if len(raw) > settings.max_upload_mb * 1024 * 1024:
-            raise HTTPException(status_code=413, detail=f"截图过大，最大{settings.max_upload_mb}MB")
-        screenshot_data_url = process_image_to_data_url(raw)
+        raw = await read_screenshot(screenshot, settings.max_upload_mb)
+        image = InlineImage(process_image_to_jpeg(raw))
         payload["enableScreenshotAnalysis"] = True
+    return module, payload, image
 
-    prompt = build_prompt(module, payload)
-    system = (
-        "你是一位资深的餐饮外卖运营与市场分析专家。"
-        "你的目标是输出清晰、可执行、可落地的建议。"
-        "严格输出Markdown正文，不要输出任何问候/开场白；不要输出HTML标签；不要用```包裹全文。"
-    )
 
-    model = _select_model(settings, module)
-    cfg = UpstreamConfig(
+def _build_cfg(settings: Any, module: str) -> UpstreamConfig:
+    return UpstreamConfig(
         base_url=settings.upstream_base_url,
         api_key=settings.upstream_api_key,
-        model=model,
+        model=_select_model(settings, module),
     )
 
-    async with httpx.AsyncClient() as client:
-        try:
-            markdown = await chat_completions(
+
+def _plan_markdown(settings: Any, module: str, prompt: str, image_data_url: InlineImage | None) -> RequestPlan:
+    return plan_request(
+        usage_key=f"markdown:{module}",
+        model=_select_model(settings, module),
+        system=SYSTEM_PROMPT,
+        user_prompt=prompt,
+        has_image=image_data_url is not None,
+        settings=settings,
+    )
+
+
+async def _chat_with_result(client: Any, cfg: UpstreamConfig, **kwargs: Any) -> tuple[str, ChatResult]:
+    """调用 chat_completions 并带回调用结果（是否命中缓存、截断/续写），供对冲耗时与输出量统计判断。"""
+    result = ChatResult()
+    text = await chat_completions(client, cfg=cfg, result=result, **kwargs)
+    return text, result
+
+
+def _from_cache(_cfg: UpstreamConfig, value: tuple[str, ChatResult]) -> bool:
+    return value[1].cached
+
+
+async def _repair_html_markdown(client: Any, targets: list[UpstreamConfig], markdown: str) -> str:
+    """兜底：如果模型仍输出HTML，尝试二次“转Markdown”修复（仅一次）。"""
+    repair_text = markdown[:12000]
+    repair_prompt = (
+        "请将下面内容转换为Markdown正文（只输出Markdown，不要HTML，不要```包裹全文），保持信息完整，不要添加额外内容：\n\n"
+        f"{repair_text}"
+    )
+    try:
+        repaired, _result = await hedged_call(
+            targets,
+            lambda cfg: _chat_with_result(
                 client,
-                cfg=cfg,
-                system=system,
-                user_prompt=prompt,
-                image_data_url=screenshot_data_url if module == "market" else None,
-            )
-        except UpstreamError as e:
-            raise HTTPException(status_code=502, detail=str(e)) from e
+                cfg,
+                system="你是一位专业内容编辑，擅长将文本整理为结构清晰的Markdown。",
+                user_prompt=repair_prompt,
+                temperature=0.2,
+                max_tokens=repair_max_tokens(repair_text, ceiling=16384),
+                image_data_url=None,
+                cache=get_llm_cache(),
+                admission=get_admission_controller(),
+            ),
+            kind="markdown_repair",
+            cached=_from_cache,
+        )
+    except UpstreamError:
+        return markdown
+    return repaired
 
-        # 兜底：如果模型仍输出HTML，尝试二次“转Markdown”修复（仅一次）
-        if _looks_like_html(markdown):
-            repair_text = markdown[:12000]
-            repair_prompt = (
-                "请将下面内容转换为Markdown正文（只输出Markdown，不要HTML，不要```包裹全文），保持信息完整，不要添加额外内容：\n\n"
-                f"{repair_text}"
-            )
-            try:
-                markdown = await chat_completions(
-                    client,
-                    cfg=cfg,
-                    system="你是一位专业内容编辑，擅长将文本整理为结构清晰的Markdown。",
-                    user_prompt=repair_prompt,
-                    temperature=0.2,
-                    max_tokens=16384,
-                    image_data_url=None,
-                )
-            except UpstreamError:
-                pass
 
+def _save_report(
+    request: Request,
+    module: str,
+    payload: dict[str, Any],
+    markdown: str,
+    screenshot: InlineImage | None,
+) -> dict[str, Any]:
+    settings = get_settings(request)
     meta = build_meta(module, payload)
     now = datetime.now()
     expires_at = now + timedelta(seconds=int(settings.report_ttl_seconds))
@@ -119,7 +174,7 @@ async def generate_report(
         "module": module,
         "markdown": markdown,
         "meta": meta,
-        "screenshot_data_url": screenshot_data_url,
+        "screenshot_data_url": screenshot.data_url() if screenshot is not None else None,
         "created_at": now.isoformat(),
         "expires_at": expires_at.isoformat(),
     }
@@ -127,15 +182,131 @@ async def generate_report(
     store = get_store(request)
     report_id = store.save(report_data)
 
-    return JSONResponse(
-        {
-            "report_id": report_id,
-            "markdown": markdown,
-            "preview_url": f"/api/reports/{report_id}/preview",
-            "pdf_url": f"/api/reports/{report_id}/pdf",
-            "expires_at": expires_at.isoformat(),
-        }
-    )
+    return {
+        "report_id": report_id,
+        "markdown": markdown,
+        "preview_url": f"/api/reports/{report_id}/preview",
+        "pdf_url": f"/api/reports/{report_id}/pdf",
+        "expires_at": expires_at.isoformat(),
+    }
+
+
+@router.post("/api/reports/generate")
+async def generate_report(
+    request: Request,
+    module: str = Form(...),
+    payload_json: str = Form(...),
+    screenshot: UploadFile | None = File(None),
+    no_cache: bool = Form(False),
+):
+    module, payload, image = await _read_generate_form(request, module, payload_json, screenshot)
+    prompt = build_prompt(module, payload)
+    settings = get_settings(request)
+    targets = build_upstream_targets(settings, module, _build_cfg(settings, module))
+    image_data_url = image if module == "market" else None
+    plan = _plan_markdown(settings, module, prompt, image_data_url)
+
+    client = get_upstream_client(request)
+
+    async def generate_markdown() -> str:
+        markdown, result = await hedged_call(
+            targets,
+            lambda cfg: _chat_with_result(
+                client,
+                cfg,
+                system=SYSTEM_PROMPT,
+                user_prompt=plan.user_prompt,
+                max_tokens=plan.max_tokens,
+                image_data_url=image_data_url,
+                cache=get_llm_cache(),
+                admission=get_admission_controller(),
+                bypass_cache=no_cache,
+                max_continuations=settings.upstream_max_continuations,
+            ),
+            kind="markdown",
+            cached=_from_cache,
+        )
+        get_output_tracker().record_completion(f"markdown:{module}", result, estimate_tokens(markdown))
+        if _looks_like_html(markdown):
+            markdown = await _repair_html_markdown(client, targets, markdown)
+        return markdown
+
+    # 相同模块/模型/提示词/截图的并发请求只调用一次上游
+    key = flight_key(module, targets[0].model, prompt, image, no_cache)
+    try:
+        with admission_scope(deadline_seconds=settings.upstream_request_deadline_seconds):
+            markdown = await get_flight_group("generate_markdown").do(key, generate_markdown)
+    except AdmissionRejected as e:
+        raise admission_rejected_error(e) from e
+    except UpstreamError as e:
+        raise HTTPException(status_code=502, detail=str(e)) from e
+
+    return JSONResponse(_save_report(request, module, payload, markdown, image))
+
+
+@router.post("/api/reports/generate/stream")
+async def generate_report_stream(
+    request: Request,
+    module: str = Form(...),
+    payload_json: str = Form(...),
+    screenshot: UploadFile | None = File(None),
+    no_cache: bool = Form(False),
+):
+    """流式生成：以 SSE 推送阶段事件与 Markdown 增量，完成后推送 done（含 report_id）。"""
+    module, payload, image = await _read_generate_form(request, module, payload_json, screenshot)
+    prompt = build_prompt(module, payload)
+    settings = get_settings(request)
+    targets = build_upstream_targets(settings, module, _build_cfg(settings, module))
+    image_data_url = image if module == "market" else None
+    plan = _plan_markdown(settings, module, prompt, image_data_url)
+    client = get_upstream_client(request)
+    results: dict[UpstreamConfig, ChatResult] = {}
+
+    def open_stream(cfg: UpstreamConfig) -> AsyncIterator[str]:
+        return stream_chat_completions(
+            client,
+            cfg=cfg,
+            system=SYSTEM_PROMPT,
+            user_prompt=plan.user_prompt,
+            max_tokens=plan.max_tokens,
+            image_data_url=image_data_url,
+            cache=get_llm_cache(),
+            admission=get_admission_controller(),
+            bypass_cache=no_cache,
+            max_continuations=settings.upstream_max_continuations,
+            result=results.setdefault(cfg, ChatResult()),
+        )
+
+    async def events():
+        parts: list[str] = []
+        try:
+            with admission_scope(deadline_seconds=settings.upstream_request_deadline_seconds):
+                yield format_sse("stage", {"stage": "upstream", "model": targets[0].model})
+                cfg, deltas = await hedged_stream(
+                    targets, open_stream, kind="markdown", cached=lambda cfg: results[cfg].cached
+                )
+                if cfg is not targets[0]:
+                    yield format_sse("stage", {"stage": "upstream", "model": cfg.model})
+                async for delta in deltas:
+                    parts.append(delta)
+                    yield format_sse("delta", {"text": delta})
+
+            markdown = normalize_markdown("".join(parts))
+            get_output_tracker().record_completion(f"markdown:{module}", results[cfg], estimate_tokens(markdown))
+            if _looks_like_html(markdown):
+                yield format_sse("stage", {"stage": "repair"})
+                markdown = await _repair_html_markdown(client, targets, markdown)
+
+            yield format_sse("done", _save_report(request, module, payload, markdown, image))
+        except UpstreamError as e:
+            error: dict[str, Any] = {"detail": str(e)}
+            if isinstance(e, AdmissionRejected):
+                error["retry_after"] = e.retry_after
+            yield format_sse("error", error)
+        except Exception as e:  # noqa: BLE001 - 流已开始，只能以事件形式返回错误
+            yield format_sse("error", error_payload(e))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.get("/api/reports/{report_id}")
@@ -2,27 +2,49 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse
 
 from app.routes.reports_common import (
     content_disposition_attachment,
     filename_from_title,
     get_renderer,
+    get_settings,
     get_store,
     now_text,
     safe_module,
 )
 from app.services.markdown_renderer import render_markdown_to_html
-from app.services.pdf_renderer import PdfRenderError, render_long_pdf
+from app.services.pdf_delivery import PdfSpool, new_spool, pdf_streaming_response
+from app.services.pdf_renderer import PdfRenderError, write_long_pdf
 from app.services.template_renderer import MODULE_THEMES
 
 router = APIRouter()
 
 
+async def _render_spooled(html: str) -> PdfSpool:
+    spool = new_spool()
+    try:
+        await asyncio.to_thread(write_long_pdf, html, spool.file)
+    except PdfRenderError as e:
+        spool.close()
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def _asset_base_url(request: Request) -> str:
+    # 不用 request.base_url：反向代理/Vercel 后它是内部协议与主机名，会导致混合内容或请求失败；
+    # 未配置 PUBLIC_BASE_URL 时输出站内根路径
+    return (get_settings(request).public_base_url or "").strip().rstrip("/")
+
+
 @router.get("/api/reports/{report_id}/preview")
 def preview_report(request: Request, report_id: str):
     store = get_store(request)
@@ -46,6 +68,7 @@ def preview_report(request: Request, report_id: str):
         screenshot_data_url=screenshot_data_url,
         content_html=content_html,
         raw_markdown=markdown,
+        asset_base_url=_asset_base_url(request),
     )
     return HTMLResponse(html)
 
@@ -67,6 +90,7 @@ def preview_stateless(request: Request, payload: dict[str, Any]):
         screenshot_data_url=screenshot_data_url,
         content_html=content_html,
         raw_markdown=markdown,
+        asset_base_url=_asset_base_url(request),
     )
     return HTMLResponse(html)
 
@@ -94,19 +118,12 @@ async def pdf_report(request: Request, report_id: str):
         screenshot_data_url=screenshot_data_url,
         content_html=content_html,
         raw_markdown=markdown,
+        subset_fonts=False,
     )
 
-    try:
-        pdf_bytes = await render_long_pdf(html)
-    except PdfRenderError as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
-
+    spool = await _render_spooled(html)
     filename = filename_from_title(meta.get("title") or MODULE_THEMES[module]["name"])
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": content_disposition_attachment(filename)},
-    )
+    return pdf_streaming_response(spool, headers={"Content-Disposition": content_disposition_attachment(filename)})
 
 
 @router.post("/api/reports/pdf")
@@ -126,17 +143,10 @@ async def pdf_stateless(request: Request, payload: dict[str, Any]):
         screenshot_data_url=screenshot_data_url,
         content_html=content_html,
         raw_markdown=markdown,
+        subset_fonts=False,
     )
 
-    try:
-        pdf_bytes = await render_long_pdf(html)
-    except PdfRenderError as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
-
+    spool = await _render_spooled(html)
     filename = filename_from_title(meta.get("title") or MODULE_THEMES[module]["name"])
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": content_disposition_attachment(filename)},
-    )
+    return pdf_streaming_response(spool, headers={"Content-Disposition": content_disposition_attachment(filename)})
 
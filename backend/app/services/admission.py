@@ -0,0 +1,221 @@
+"""
+上游准入控制（按模型的 RPM/TPM 令牌桶 + 优先级等待队列）。
+
+说明：
+- 每个模型一组令牌桶：每分钟请求数（RPM）与每分钟 token 数（TPM，按“输入 token 估算 + max_tokens”计）。
+- 桶不足时进入有界等待队列，交互式请求优先于批量任务；同优先级先到先得。
+- 预计等待时间超过请求截止时间或队列已满时直接拒绝（AdmissionRejected，路由层返回 503 + Retry-After）。
+- 请求优先级与截止时间通过 contextvars 在路由层设置，沿调用链传递到上游调用。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from app.services.token_estimator import estimate_messages_tokens
+from app.services.upstream_llm import UpstreamError
+from app.settings import get_settings
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=PRIORITY_INTERACTIVE)
+_deadline: ContextVar[float | None] = ContextVar("upstream_deadline", default=None)
+
+
+class AdmissionRejected(UpstreamError):
+    def __init__(self, message: str, *, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+@contextmanager
+def admission_scope(*, priority: int = PRIORITY_INTERACTIVE, deadline_seconds: float | None = None) -> Iterator[None]:
+    """在当前上下文内设置上游调用的优先级与截止时间（相对当前时刻的秒数）。"""
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds and deadline_seconds > 0 else None
+    priority_token = _priority.set(priority)
+    deadline_token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _priority.reset(priority_token)
+        _deadline.reset(deadline_token)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+
+@dataclass
+class _ModelLimiter:
+    rpm: TokenBucket | None
+    tpm: TokenBucket | None
+
+    def time_until(self, tokens: int, now: float, *, ahead_requests: int = 0, ahead_tokens: int = 0) -> float:
+        wait = 0.0
+        if self.rpm is not None:
+            wait = max(wait, self.rpm.time_until(1 + ahead_requests, now))
+        if self.tpm is not None:
+            wait = max(wait, self.tpm.time_until(tokens + ahead_tokens, now))
+        return wait
+
+    def take(self, tokens: int, now: float) -> None:
+        if self.rpm is not None:
+            self.rpm.take(1, now)
+        if self.tpm is not None:
+            self.tpm.take(tokens, now)
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    seq: int
+    model: str = field(compare=False)
+    tokens: int = field(compare=False)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        default_rpm: int = 0,
+        default_tpm: int = 0,
+        model_limits: dict[str, dict[str, int]] | None = None,
+        max_queue: int = 64,
+        poll_seconds: float = 0.05,
+    ):
+        self.default_rpm = max(0, int(default_rpm))
+        self.default_tpm = max(0, int(default_tpm))
+        self.model_limits = dict(model_limits or {})
+        self.max_queue = max(0, int(max_queue))
+        self.poll_seconds = poll_seconds
+        self._limiters: dict[str, _ModelLimiter] = {}
+        self._waiting: list[_Ticket] = []
+        self._seq = itertools.count()
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+
+    def _limiter(self, model: str) -> _ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limits = self.model_limits.get(model) or {}
+            rpm = int(limits.get("rpm", self.default_rpm) or 0)
+            tpm = int(limits.get("tpm", self.default_tpm) or 0)
+            limiter = _ModelLimiter(
+                rpm=TokenBucket(rpm) if rpm > 0 else None,
+                tpm=TokenBucket(tpm) if tpm > 0 else None,
+            )
+            self._limiters[model] = limiter
+        return limiter
+
+    def _ahead_of(self, ticket: _Ticket) -> list[_Ticket]:
+        return [t for t in self._waiting if t.model == ticket.model and t < ticket]
+
+    def _reject(self, message: str, retry_after: float) -> AdmissionRejected:
+        self.rejected_total += 1
+        return AdmissionRejected(message, retry_after=retry_after)
+
+    async def acquire(self, model: str, *, tokens: int) -> None:
+        limiter = self._limiter(model)
+        if limiter.rpm is None and limiter.tpm is None:
+            self.admitted_total += 1
+            return
+
+        priority = _priority.get()
+        deadline = _deadline.get()
+        ticket = _Ticket(priority=priority, seq=next(self._seq), model=model, tokens=max(1, int(tokens)))
+        started = time.monotonic()
+
+        ahead = self._ahead_of(ticket)
+        estimate = limiter.time_until(
+            ticket.tokens,
+            started,
+            ahead_requests=len(ahead),
+            ahead_tokens=sum(t.tokens for t in ahead),
+        )
+        if estimate > 0:
+            if len(self._waiting) >= self.max_queue:
+                raise self._reject("上游请求排队已满，请稍后重试", estimate)
+            if deadline is not None and started + estimate > deadline:
+                raise self._reject("上游限流，预计等待超过请求时限，请稍后重试", estimate)
+            self.queued_total += 1
+
+        self._waiting.append(ticket)
+        try:
+            while True:
+                now = time.monotonic()
+                is_head = not self._ahead_of(ticket)
+                wait = limiter.time_until(ticket.tokens, now) if is_head else self.poll_seconds
+                if is_head and wait <= 0:
+                    limiter.take(ticket.tokens, now)
+                    self.admitted_total += 1
+                    self.wait_seconds_total += now - started
+                    return
+                if deadline is not None and now + wait > deadline:
+                    raise self._reject("上游限流，等待超过请求时限，请稍后重试", wait)
+                await asyncio.sleep(min(max(wait, 0.01), 1.0))
+        finally:
+            self._waiting.remove(ticket)
+
+    async def admit(self, body: dict[str, Any]) -> None:
+        await self.acquire(str(body.get("model") or ""), tokens=estimate_request_tokens(body))
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "queue_depth": len(self._waiting),
+            "max_queue": self.max_queue,
+            "admitted_total": self.admitted_total,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+        }
+
+
+def estimate_request_tokens(body: dict[str, Any]) -> int:
+    """估算一次请求占用的 token：消息估算 + max_tokens（上游按此计入 TPM）。"""
+    return estimate_messages_tokens(body.get("messages") or []) + int(body.get("max_tokens") or 0)
+
+
+_CONTROLLER: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _CONTROLLER
+    if _CONTROLLER is None:
+        settings = get_settings()
+        _CONTROLLER = AdmissionController(
+            default_rpm=getattr(settings, "upstream_rpm_limit", 0),
+            default_tpm=getattr(settings, "upstream_tpm_limit", 0),
+            model_limits=getattr(settings, "upstream_rate_limits", {}) or {},
+            max_queue=getattr(settings, "upstream_admission_queue_size", 64),
+        )
+    return _CONTROLLER
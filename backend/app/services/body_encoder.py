@@ -0,0 +1,137 @@
+"""
+上游请求体流式编码（JSON 信封 + base64 图片分块）。
+
+说明：
+- 请求体中的图片可用 `InlineImage`（原始 JPEG 字节）代替 dataURL 字符串，编码时按块 base64，不生成完整字符串。
+- 其余字段逐段编码为 UTF-8（长字符串按片转义），不再对整个请求体 `json.dumps` + `encode` 各复制一次。
+- 预先算出 Content-Length，上游仍收到定长请求体（非 chunked）。
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator
+
+import httpx
+
+CHUNK_SIZE = 64 * 1024
+# 3 的倍数，保证分块 base64 拼接后与整体编码一致
+_IMAGE_CHUNK = (CHUNK_SIZE // 4) * 3
+
+
+@dataclass(frozen=True, eq=False)
+class InlineImage:
+    data: bytes = field(repr=False)
+    mime: str = "image/jpeg"
+
+    @property
+    def prefix(self) -> str:
+        return f"data:{self.mime};base64,"
+
+    @property
+    def encoded_size(self) -> int:
+        return len(self.prefix) + 4 * ((len(self.data) + 2) // 3)
+
+    @property
+    def digest(self) -> str:
+        cached = self.__dict__.get("_digest")
+        if cached is None:
+            cached = hashlib.sha256(self.data).hexdigest()
+            object.__setattr__(self, "_digest", cached)
+        return cached
+
+    def data_url(self) -> str:
+        """需要完整字符串时（如模板渲染）才生成 dataURL。"""
+        return self.prefix + base64.b64encode(self.data).decode("ascii")
+
+    def iter_base64(self) -> Iterator[bytes]:
+        view = memoryview(self.data)
+        for start in range(0, len(view), _IMAGE_CHUNK):
+            yield base64.b64encode(view[start : start + _IMAGE_CHUNK])
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, InlineImage) and self.mime == other.mime and self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash((self.mime, self.digest))
+
+    def __str__(self) -> str:
+        return f"InlineImage({self.mime}, sha256={self.digest})"
+
+
+def json_default(value: Any) -> Any:
+    """`json.dumps(default=...)`：图片以摘要代替内容，用于缓存键/合并键。"""
+    if isinstance(value, InlineImage):
+        return {"inline_image": value.mime, "sha256": value.digest}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dump(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _iter_parts(value: Any) -> Iterator[bytes | InlineImage]:
+    if isinstance(value, InlineImage):
+        yield value
+    elif isinstance(value, dict):
+        yield b"{"
+        for idx, (key, item) in enumerate(value.items()):
+            yield (b", " if idx else b"") + _dump(str(key)) + b": "
+            yield from _iter_parts(item)
+        yield b"}"
+    elif isinstance(value, (list, tuple)):
+        yield b"["
+        for idx, item in enumerate(value):
+            if idx:
+                yield b", "
+            yield from _iter_parts(item)
+        yield b"]"
+    elif isinstance(value, str) and len(value) > CHUNK_SIZE:
+        # 按片转义：JSON 转义按字符进行，分片不会破坏转义序列
+        yield b'"'
+        for start in range(0, len(value), CHUNK_SIZE):
+            yield _dump(value[start : start + CHUNK_SIZE])[1:-1]
+        yield b'"'
+    else:
+        yield _dump(value)
+
+
+def iter_json_bytes(body: Any) -> Iterator[bytes]:
+    """逐块产出请求体字节；小片段合并到约 CHUNK_SIZE 再产出，减少写次数。"""
+    buf = bytearray()
+    for part in _iter_parts(body):
+        if isinstance(part, InlineImage):
+            buf += b'"' + part.prefix.encode("ascii")
+            yield bytes(buf)
+            buf.clear()
+            yield from part.iter_base64()
+            buf += b'"'
+            continue
+        buf += part
+        if len(buf) >= CHUNK_SIZE:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def json_content_length(body: Any) -> int:
+    total = 0
+    for part in _iter_parts(body):
+        total += (part.encoded_size + 2) if isinstance(part, InlineImage) else len(part)
+    return total
+
+
+class JsonBodyStream(httpx.AsyncByteStream):
+    """可重复迭代的请求体流；配合 `content_length` 作为定长请求体发送。"""
+
+    def __init__(self, body: Any):
+        self.body = body
+        self.content_length = json_content_length(body)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for chunk in iter_json_bytes(self.body):
+            yield chunk
@@ -0,0 +1,166 @@
+"""
+预览页字体资源：以内容哈希命名的静态 URL 提供字体，替代在每份 HTML 中内联 base64。
+
+说明：
+- 完整字体 URL 形如 `/api/assets/fonts/NotoSansSC-Regular.<sha256前16位>.otf`，内容不变 URL 不变，响应带一年 immutable 缓存；
+- 可选按报告子集化（`PREVIEW_FONT_SUBSETS=1`）：预览时只登记页面用到的字符并返回子集 URL，
+  浏览器首次请求时才用 fontTools 生成 WOFF2（未安装 brotli 时为 WOFF），结果按 LRU 缓存；
+- 子集 URL 失效（缓存淘汰、请求落到其它实例）时返回 404，@font-face 中其后的完整字体 URL 兜底。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+try:
+    import brotli  # noqa: F401 - fontTools 写 WOFF2 时需要
+except ImportError:  # pragma: no cover - 取决于部署环境
+    brotli = None
+
+URL_PREFIX = "/api/assets/fonts"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+PREVIEW_FONTS = {"regular": "NotoSansSC-Regular.otf", "bold": "NotoSansSC-Bold.otf"}
+FONT_WEIGHTS = {"regular": 400, "bold": 700}
+SUBSET_FLAVOR = "woff2" if brotli is not None else "woff"
+MEDIA_TYPES = {"otf": "font/otf", "ttf": "font/ttf", "woff": "font/woff", "woff2": "font/woff2"}
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class FontFile:
+    weight: str
+    path: Path
+    digest: str
+
+    @property
+    def filename(self) -> str:
+        return f"{self.path.stem}.{self.digest}{self.path.suffix}"
+
+    @property
+    def url(self) -> str:
+        return f"{URL_PREFIX}/{self.filename}"
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES.get(self.path.suffix.lstrip(".").lower(), "application/octet-stream")
+
+
+@dataclass(frozen=True)
+class FontFace:
+    """模板中的一条 @font-face。"""
+
+    weight: int
+    url: str
+    subset_url: str | None = None
+
+
+def subset_font(data: bytes, text: str, flavor: str = SUBSET_FLAVOR) -> bytes:
+    """只保留 text 中出现的字形，输出 WOFF2/WOFF。"""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.flavor = flavor
+    options.layout_features = ["*"]
+    options.notdef_outline = True
+    font = TTFont(BytesIO(data))
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    out = BytesIO()
+    font.save(out)
+    return out.getvalue()
+
+
+class FontAssets:
+    def __init__(self, fonts_dir: Path, *, subset_cache_size: int = 32):
+        self.files: dict[str, FontFile] = {}
+        for weight, name in PREVIEW_FONTS.items():
+            path = fonts_dir / name
+            if path.exists():
+                self.files[weight] = FontFile(weight, path, _file_digest(path))
+        self._by_name = {f.filename: f for f in self.files.values()}
+        self._cache_size = max(1, subset_cache_size)
+        self._texts: OrderedDict[str, str] = OrderedDict()
+        self._subsets: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._sources: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.subsets_built = 0
+        self.subset_misses = 0
+
+    def find(self, filename: str) -> FontFile | None:
+        return self._by_name.get(filename)
+
+    def faces(self, *, subset_key: str | None = None, base_url: str = "") -> list[FontFace]:
+        """返回各字重的 @font-face；给出 subset_key 时附带子集 URL（见 register_subset）。"""
+        regular = self.files.get("regular")
+        if regular is None:
+            return []
+        faces = []
+        for weight, size in FONT_WEIGHTS.items():
+            font = self.files.get(weight, regular)
+            subset_url = None
+            if subset_key:
+                subset_url = f"{base_url}{URL_PREFIX}/subset/{subset_key}-{font.weight}.{SUBSET_FLAVOR}"
+            faces.append(FontFace(size, f"{base_url}{font.url}", subset_url))
+        return faces
+
+    def register_subset(self, text: str) -> str:
+        """登记页面用到的字符，返回子集 key（相同字符集与字体得到相同 key）。"""
+        chars = "".join(sorted(set(text) - {"\n", "\r", "\t"}))
+        source = ",".join(f.digest for f in self.files.values())
+        key = hashlib.sha1(f"{source}:{chars}".encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._texts[key] = chars
+            self._texts.move_to_end(key)
+            while len(self._texts) > self._cache_size:
+                self._texts.popitem(last=False)
+        return key
+
+    def subset_bytes(self, key: str, weight: str) -> bytes | None:
+        """生成（或取缓存的）子集字体；key 未登记或已淘汰时返回 None。"""
+        font = self.files.get(weight)
+        with self._lock:
+            chars = self._texts.get(key)
+            cached = self._subsets.get((key, weight))
+            if cached is not None:
+                self._subsets.move_to_end((key, weight))
+                return cached
+        if font is None or chars is None:
+            self.subset_misses += 1
+            return None
+
+        source = self._sources.get(weight)
+        if source is None:
+            source = self._sources[weight] = font.path.read_bytes()
+        data = subset_font(source, chars)
+        with self._lock:
+            self._subsets[(key, weight)] = data
+            while len(self._subsets) > self._cache_size:
+                self._subsets.popitem(last=False)
+            self.subsets_built += 1
+        return data
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "fonts": {f.weight: f.filename for f in self.files.values()},
+                "subset_flavor": SUBSET_FLAVOR,
+                "registered_subsets": len(self._texts),
+                "cached_subsets": len(self._subsets),
+                "subset_cache_bytes": sum(map(len, self._subsets.values())),
+                "subsets_built": self.subsets_built,
+                "subset_misses": self.subset_misses,
+            }
@@ -0,0 +1,273 @@
+"""
+上游对冲请求（hedged requests）与多模型故障转移。
+
+说明：
+- 主目标在“历史耗时分位数”内未返回时，向备用模型/地址再发一次请求，取先返回者并取消其余请求。
+- 任一目标返回 UpstreamError 时立即切换到下一个备用目标。
+- 流式调用（`hedged_stream`）按首个增量到达竞速与切换，首个增量之后的失败不再切换；首包耗时单独统计。
+- 耗时按“模型 + 调用类型”（整篇报告、JSON 修复、大纲、章节等）分别统计，命中 LLM 缓存的结果不计入。
+- 备用目标来自 Settings：`upstream_hedge_model_<module>`（逗号分隔可配多个），未配置时回退 `upstream_hedge_model_default`。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence, TypeVar
+
+from app.services.upstream_llm import ChatResult, UpstreamConfig, UpstreamError
+from app.settings import get_settings
+
+T = TypeVar("T")
+
+_MODULE_FIELDS = {
+    "brand": "upstream_hedge_model_brand",
+    "market": "upstream_hedge_model_market",
+    "store-activity": "upstream_hedge_model_store_activity",
+    "data-statistics": "upstream_hedge_model_data_statistics",
+}
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=max(1, window))
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+        return ordered[idx]
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        default_delay_seconds: float = 45.0,
+    ):
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 0.5), 0.999)
+        self.min_samples = max(1, min_samples)
+        self.default_delay_seconds = max(0.0, default_delay_seconds)
+        self._trackers: dict[str, LatencyTracker] = {}
+        self.calls_total = 0
+        self.hedges_total = 0
+        self.hedge_wins = 0
+        self.failovers_total = 0
+
+    def record(self, model: str, seconds: float) -> None:
+        self._trackers.setdefault(model, LatencyTracker()).record(seconds)
+
+    def delay_for(self, model: str) -> float | None:
+        """主目标等待多久后发出对冲请求；未启用对冲时返回 None（仅失败转移）。"""
+        if not self.enabled:
+            return None
+        tracker = self._trackers.get(model)
+        if tracker is None or len(tracker) < self.min_samples:
+            return self.default_delay_seconds
+        return tracker.percentile(self.percentile)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "calls_total": self.calls_total,
+            "hedges_total": self.hedges_total,
+            "hedge_wins": self.hedge_wins,
+            "failovers_total": self.failovers_total,
+            "delays": {model: self.delay_for(model) for model in self._trackers},
+        }
+
+
+def _split_models(value: str) -> list[str]:
+    return [m.strip() for m in (value or "").split(",") if m.strip()]
+
+
+def select_hedge_models(settings: Any, module: str) -> list[str]:
+    field = _MODULE_FIELDS.get(module)
+    models = _split_models(getattr(settings, field, "") if field else "")
+    return models or _split_models(getattr(settings, "upstream_hedge_model_default", ""))
+
+
+def build_upstream_targets(settings: Any, module: str, primary: UpstreamConfig) -> list[UpstreamConfig]:
+    """主目标 + 备用目标列表（去重，保持顺序）。"""
+    base_url = (getattr(settings, "upstream_hedge_base_url", "") or "").strip() or primary.base_url
+    api_key = (getattr(settings, "upstream_hedge_api_key", "") or "").strip() or primary.api_key
+    targets = [primary]
+    for model in select_hedge_models(settings, module):
+        cfg = replace(primary, base_url=base_url, api_key=api_key, model=model)
+        if cfg not in targets:
+            targets.append(cfg)
+    return targets
+
+
+def tracker_key(model: str, kind: str = "") -> str:
+    return f"{model}:{kind}" if kind else model
+
+
+def _from_cache(cfg: UpstreamConfig, value: Any) -> bool:
+    return isinstance(value, ChatResult) and value.cached
+
+
+async def hedged_call(
+    targets: Sequence[UpstreamConfig],
+    call: Callable[[UpstreamConfig], Awaitable[T]],
+    *,
+    policy: HedgePolicy | None = None,
+    kind: str = "",
+    cached: Callable[[UpstreamConfig, T], bool] = _from_cache,
+    discard: Callable[[T], Awaitable[None]] | None = None,
+) -> T:
+    """对冲调用 targets，返回最先成功的结果。
+
+    kind 区分调用类型（耗时分开统计）；cached(cfg, 结果) 判断结果是否来自缓存（不计入耗时）；
+    discard 用于释放落选请求已成功返回的结果（如未读完的流）。
+    """
+    if not targets:
+        raise ValueError("至少需要一个上游目标")
+    policy = policy or get_hedge_policy()
+    policy.calls_total += 1
+    primary = targets[0]
+    remaining = list(targets)
+    pending: dict[asyncio.Future, tuple[UpstreamConfig, float]] = {}
+    last_error: UpstreamError | None = None
+
+    def launch() -> float:
+        cfg = remaining.pop(0)
+        now = time.monotonic()
+        pending[asyncio.ensure_future(call(cfg))] = (cfg, now)
+        return now
+
+    delay = policy.delay_for(tracker_key(primary.model, kind))
+    # 对冲时间点按发出时刻累计：备用请求失败后，下一次对冲只等剩余时间而不是重新等一整个延迟
+    launched = launch()
+    hedge_at = launched + delay if delay is not None else None
+    try:
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if remaining and hedge_at is not None else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                policy.hedges_total += 1
+                launch()
+                hedge_at += delay
+                continue
+            for task in done:
+                cfg, started = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    result = task.result()
+                    if not cached(cfg, result):
+                        policy.record(tracker_key(cfg.model, kind), time.monotonic() - started)
+                    if cfg is not primary:
+                        policy.hedge_wins += 1
+                    return result
+                if not isinstance(error, UpstreamError):
+                    raise error
+                last_error = error
+            if not pending and remaining:
+                policy.failovers_total += 1
+                launched = launch()
+                if delay is not None:
+                    hedge_at = launched + delay
+        assert last_error is not None
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+        # 等待被取消的请求真正结束（释放准入名额与连接），避免 "Task was destroyed but it is pending"；
+        # 同一轮一起完成、或取消前已完成的落选请求带着成功结果，交给 discard 释放
+        if pending:
+            outcomes = await asyncio.gather(*pending, return_exceptions=True)
+            if discard is not None:
+                for outcome in outcomes:
+                    if not isinstance(outcome, BaseException):
+                        await discard(outcome)
+
+
+async def hedged_stream(
+    targets: Sequence[UpstreamConfig],
+    open_stream: Callable[[UpstreamConfig], AsyncIterator[str]],
+    *,
+    policy: HedgePolicy | None = None,
+    kind: str = "",
+    cached: Callable[[UpstreamConfig], bool] | None = None,
+) -> tuple[UpstreamConfig, AsyncIterator[str]]:
+    """流式版 hedged_call：以首个增量到达为准对冲/切换，返回胜出目标及其完整增量流（调用方需读完或关闭）。
+
+    cached(cfg) 判断该目标的流是否由缓存回放（不计入首包耗时）。
+    """
+
+    async def first_delta(cfg: UpstreamConfig) -> tuple[UpstreamConfig, str | None, AsyncIterator[str]]:
+        stream = open_stream(cfg)
+        try:
+            head = await anext(stream)
+        except StopAsyncIteration:
+            head = None
+        except BaseException:
+            await stream.aclose()
+            raise
+        return cfg, head, stream
+
+    async def close_stream(value: tuple[UpstreamConfig, str | None, AsyncIterator[str]]) -> None:
+        await value[2].aclose()
+
+    cfg, head, stream = await hedged_call(
+        targets,
+        first_delta,
+        policy=policy or get_stream_hedge_policy(),
+        kind=kind,
+        cached=lambda cfg, _value: cached is not None and cached(cfg),
+        discard=close_stream,
+    )
+
+    async def deltas() -> AsyncIterator[str]:
+        try:
+            if head is not None:
+                yield head
+                async for delta in stream:
+                    yield delta
+        finally:
+            await stream.aclose()
+
+    return cfg, deltas()
+
+
+def _build_policy() -> HedgePolicy:
+    settings = get_settings()
+    return HedgePolicy(
+        enabled=bool(getattr(settings, "upstream_hedge_enabled", True)),
+        percentile=float(getattr(settings, "upstream_hedge_percentile", 0.95)),
+        min_samples=int(getattr(settings, "upstream_hedge_min_samples", 20)),
+        default_delay_seconds=float(getattr(settings, "upstream_hedge_delay_seconds", 45.0)),
+    )
+
+
+_POLICY: HedgePolicy | None = None
+_STREAM_POLICY: HedgePolicy | None = None
+
+
+def get_hedge_policy() -> HedgePolicy:
+    global _POLICY
+    if _POLICY is None:
+        _POLICY = _build_policy()
+    return _POLICY
+
+
+def get_stream_hedge_policy() -> HedgePolicy:
+    """流式调用的对冲策略：记录首包耗时，与完整调用耗时分开统计。"""
+    global _STREAM_POLICY
+    if _STREAM_POLICY is None:
+        _STREAM_POLICY = _build_policy()
+    return _STREAM_POLICY
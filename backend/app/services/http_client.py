@@ -0,0 +1,242 @@
+"""
+上游 HTTP 连接池（进程级共享 httpx.AsyncClient）。
+
+说明：
+- 每个进程只维护一个长连接客户端，复用 TCP/TLS 连接（keep-alive），可选 HTTP/2 多路复用。
+- 上游主机（主上游与对冲上游 `UPSTREAM_HEDGE_BASE_URL`）各自使用独立连接池，便于按主机限制连接数。
+- 事件循环变化时重建客户端，旧客户端在其所属（或当前）事件循环中关闭，不泄漏连接。
+- 通过传输层包装统计在途请求与连接池饱和情况，供 `/api/metrics` 查看。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import importlib.util
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+import httpx
+
+from app.settings import get_settings
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class PoolStats:
+    max_connections: int
+    requests_total: int = 0
+    errors_total: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    saturated_total: int = 0
+
+    def on_start(self) -> None:
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight > self.max_connections:
+            self.saturated_total += 1
+
+    def on_finish(self, *, error: bool = False) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        if error:
+            self.errors_total += 1
+
+
+class _MeteredStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, stats: PoolStats):
+        self._stream = stream
+        self._stats = stats
+        self._finished = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._finished:
+                self._finished = True
+                self._stats.on_finish()
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncHTTPTransport, stats: PoolStats):
+        self._transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.on_start()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.stats.on_finish(error=True)
+            raise
+        response.stream = _MeteredStream(response.stream, self.stats)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def connection_counts(self) -> dict[str, int]:
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", None) or [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    http2: bool = True
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    max_connections_per_host: int = 20
+    keepalive_expiry_seconds: float = 30.0
+    hosts: tuple[str, ...] = field(default_factory=tuple)
+
+
+def upstream_origin(url: str) -> str | None:
+    """规范化为 httpx mounts 可匹配的 `scheme://host[:port]`（主机小写、省略默认端口）。"""
+    try:
+        parsed = httpx.URL((url or "").strip())
+    except httpx.InvalidURL:
+        return None
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        return None
+    port = f":{parsed.port}" if parsed.port is not None else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+def pool_config_from_settings(settings: Any) -> PoolConfig:
+    hosts: list[str] = []
+    for url in (
+        getattr(settings, "upstream_base_url", "") or "",
+        getattr(settings, "upstream_hedge_base_url", "") or "",
+    ):
+        origin = upstream_origin(url)
+        if origin and origin not in hosts:
+            hosts.append(origin)
+    return PoolConfig(
+        http2=bool(getattr(settings, "upstream_http2", True)),
+        max_connections=int(getattr(settings, "upstream_max_connections", 100)),
+        max_keepalive_connections=int(getattr(settings, "upstream_max_keepalive_connections", 20)),
+        max_connections_per_host=int(getattr(settings, "upstream_max_connections_per_host", 20)),
+        keepalive_expiry_seconds=float(getattr(settings, "upstream_keepalive_expiry_seconds", 30.0)),
+        hosts=tuple(hosts),
+    )
+
+
+class UpstreamClientPool:
+    """进程级上游客户端：一个 httpx.AsyncClient + 按主机划分的连接池与统计。"""
+
+    def __init__(self, config: PoolConfig):
+        self.config = config
+        self.http2 = config.http2 and http2_available()
+        self._transports: dict[str, _MeteredTransport] = {}
+
+        default = self._build_transport(config.max_connections, config.max_keepalive_connections)
+        mounts: dict[str, httpx.AsyncBaseTransport] = {}
+        for origin in config.hosts:
+            per_host = max(1, config.max_connections_per_host)
+            transport = self._build_transport(per_host, min(per_host, config.max_keepalive_connections))
+            self._transports[origin] = transport
+            mounts[origin] = transport
+        self._transports["*"] = default
+
+        self.client = httpx.AsyncClient(transport=default, mounts=mounts)
+        try:
+            self.loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+
+    def _build_transport(self, max_connections: int, max_keepalive: int) -> _MeteredTransport:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=self.config.keepalive_expiry_seconds,
+        )
+        transport = httpx.AsyncHTTPTransport(http2=self.http2, limits=limits)
+        return _MeteredTransport(transport, PoolStats(max_connections=max_connections))
+
+    @property
+    def closed(self) -> bool:
+        return self.client.is_closed
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def aclose_quietly(self) -> None:
+        # 旧事件循环已关闭时，连接的底层传输可能无法正常关闭
+        with contextlib.suppress(Exception):
+            await self.aclose()
+
+    def metrics(self) -> dict[str, Any]:
+        hosts: dict[str, Any] = {}
+        for origin, transport in self._transports.items():
+            stats = transport.stats
+            hosts[origin] = {
+                "max_connections": stats.max_connections,
+                "requests_total": stats.requests_total,
+                "errors_total": stats.errors_total,
+                "in_flight": stats.in_flight,
+                "peak_in_flight": stats.peak_in_flight,
+                "saturated_total": stats.saturated_total,
+                "saturation": round(stats.in_flight / max(1, stats.max_connections), 3),
+                "connections": transport.connection_counts(),
+            }
+        return {"http2": self.http2, "closed": self.closed, "hosts": hosts}
+
+
+_POOL: UpstreamClientPool | None = None
+_RETIRING: set[asyncio.Future] = set()
+
+
+def _retire(pool: UpstreamClientPool, loop: asyncio.AbstractEventLoop | None) -> None:
+    """关闭被替换的旧连接池：优先交给其所属且仍在运行的事件循环，否则在当前循环中关闭。"""
+    if pool.closed:
+        return
+    old = pool.loop
+    if old is not None and old is not loop and old.is_running() and not old.is_closed():
+        asyncio.run_coroutine_threadsafe(pool.aclose_quietly(), old)
+        return
+    if loop is not None:
+        task = loop.create_task(pool.aclose_quietly())
+        _RETIRING.add(task)
+        task.add_done_callback(_RETIRING.discard)
+
+
+def get_upstream_pool() -> UpstreamClientPool:
+    """返回当前事件循环下的共享连接池；事件循环变化或已关闭时重建（并关闭旧池）。"""
+    global _POOL
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _POOL is None or _POOL.closed or (loop is not None and _POOL.loop is not loop):
+        if _POOL is not None:
+            _retire(_POOL, loop)
+        _POOL = UpstreamClientPool(pool_config_from_settings(get_settings()))
+    return _POOL
+
+
+async def close_upstream_pool() -> None:
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is not None and not pool.closed:
+        await pool.aclose()
+
+
+@asynccontextmanager
+async def upstream_pool_lifespan(app: Any) -> AsyncIterator[None]:
+    app.state.upstream_pool = get_upstream_pool()
+    try:
+        yield
+    finally:
+        await close_upstream_pool()
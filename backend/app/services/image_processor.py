@@ -1,7 +1,7 @@
 """
 截图处理：
 
-将上传图片缩放/压缩为 JPEG，并返回 dataURL（供上游多模态与模板渲染使用）。
+将上传图片缩放/压缩为 JPEG，返回 JPEG 字节（供上游多模态流式编码）或 dataURL（供模板渲染使用）。
 """
 
 from __future__ import annotations
@@ -12,12 +12,12 @@ from io import BytesIO
 from PIL import Image
 
 
-def process_image_to_data_url(
+def process_image_to_jpeg(
     image_bytes: bytes,
     *,
     max_width: int = 1280,
     max_size_bytes: int = 800_000,
-) -> str:
+) -> bytes:
     if not image_bytes:
         raise ValueError("图片内容为空")
 
@@ -36,8 +36,17 @@ def process_image_to_data_url(
             data = buf.getvalue()
 
             if len(data) <= max_size_bytes or quality <= 60:
-                b64 = base64.b64encode(data).decode("ascii")
-                return f"data:image/jpeg;base64,{b64}"
+                return data
 
             quality -= 5
 
+
+def process_image_to_data_url(
+    image_bytes: bytes,
+    *,
+    max_width: int = 1280,
+    max_size_bytes: int = 800_000,
+) -> str:
+    data = process_image_to_jpeg(image_bytes, max_width=max_width, max_size_bytes=max_size_bytes)
+    b64 = base64.b64encode(data).decode("ascii")
+    return f"data:image/jpeg;base64,{b64}"
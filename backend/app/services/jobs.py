@@ -0,0 +1,431 @@
+"""
+异步报告任务（提交后立即返回任务 ID，由后台有界工作池执行 PDF 生成）。
+
+说明：
+- 固定数量的工作协程从有界队列取任务执行 `generate_pdf_file`；队列已满时拒绝提交（路由层返回 503）。
+- 任务进度按生成阶段（prompt/upstream/parse/repair/validate/render）更新，完成后把 PDF 写入结果目录
+  （`JOB_RESULT_DIR`，每个任务一个文件），存储中不保存 PDF 内容，任务过期时一并删除文件。
+- 存储可插拔：内存（默认）或 SQLite（`JOB_STORE_SQLITE_PATH`），SQLite 下重启后未完成的任务会重新入队。
+- 任务以批量优先级调用上游，交互式请求优先获得限流配额。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Protocol
+
+from app.services.admission import PRIORITY_BATCH, admission_scope
+from app.services.body_encoder import InlineImage
+from app.services.pdf_delivery import PdfSpool
+from app.services.report_service import generate_pdf_file
+from app.settings import get_settings
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = {JOB_DONE, JOB_FAILED}
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    module: str
+    payload: dict[str, Any]
+    screenshot: bytes | None = field(default=None, repr=False)
+    no_cache: bool = False
+    status: str = JOB_QUEUED
+    stage: str = ""
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def public(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "module": self.module,
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error or None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobStore(Protocol):
+    def create(self, job: Job) -> None: ...
+
+    def get(self, job_id: str) -> Job | None: ...
+
+    def update(self, job_id: str, **fields: Any) -> Job | None: ...
+
+    def set_result(self, job_id: str, spool: PdfSpool) -> None: ...
+
+    def open_result(self, job_id: str) -> PdfSpool | None: ...
+
+    def unfinished(self) -> list[Job]: ...
+
+    def close(self) -> None: ...
+
+
+class ResultFiles:
+    """已完成任务的 PDF 文件，按任务 ID 命名保存在同一目录下。"""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.pdf"
+
+    def save(self, job_id: str, spool: PdfSpool) -> None:
+        # 先写临时文件再改名，下载方不会读到写了一半的 PDF
+        fd, tmp = tempfile.mkstemp(prefix=f".{job_id}-", suffix=".pdf", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                spool.file.seek(0)
+                shutil.copyfileobj(spool.file, out)
+            os.replace(tmp, self.path(job_id))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    def open(self, job_id: str) -> PdfSpool | None:
+        """每次下载单独打开文件；不带 path，响应结束关闭句柄时不会删除结果文件。"""
+        try:
+            return PdfSpool(open(self.path(job_id), "rb"))
+        except FileNotFoundError:
+            return None
+
+    def remove(self, job_ids: list[str]) -> None:
+        for job_id in job_ids:
+            with contextlib.suppress(OSError):
+                os.unlink(self.path(job_id))
+
+
+class InMemoryJobStore:
+    def __init__(self, ttl_seconds: int = 86400, *, result_dir: str | Path | None = None):
+        self._ttl_seconds = max(1, int(ttl_seconds))
+        self._jobs: dict[str, Job] = {}
+        # 未指定目录时使用临时目录：close() 或进程退出时连同结果文件一起删除
+        self._tmpdir = None if result_dir else tempfile.TemporaryDirectory(prefix="report-jobs-")
+        self.results = ResultFiles(result_dir or self._tmpdir.name)
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self._ttl_seconds
+        expired = [k for k, v in self._jobs.items() if v.status in FINISHED_STATUSES and v.updated_at <= cutoff]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+        self.results.remove(expired)
+
+    def create(self, job: Job) -> None:
+        self._purge_expired()
+        self._jobs[job.id] = job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def update(self, job_id: str, **fields: Any) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_at = time.time()
+        return job
+
+    def set_result(self, job_id: str, spool: PdfSpool) -> None:
+        self.results.save(job_id, spool)
+
+    def open_result(self, job_id: str) -> PdfSpool | None:
+        return self.results.open(job_id) if job_id in self._jobs else None
+
+    def unfinished(self) -> list[Job]:
+        jobs = [job for job in self._jobs.values() if job.status not in FINISHED_STATUSES]
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def close(self) -> None:
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+
+_JOB_COLUMNS = ["id", "module", "payload", "screenshot", "no_cache", "status", "stage", "error", "created_at", "updated_at"]
+
+
+class SQLiteJobStore:
+    def __init__(self, path: str | Path, *, ttl_seconds: int = 86400, result_dir: str | Path | None = None):
+        self._ttl_seconds = max(1, int(ttl_seconds))
+        self._lock = threading.Lock()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 结果文件默认放在数据库旁，服务重启后仍可下载
+        self.results = ResultFiles(result_dir or path.with_name(f"{path.stem}-results"))
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS report_jobs ("
+            "id TEXT PRIMARY KEY, module TEXT NOT NULL, payload TEXT NOT NULL, screenshot BLOB, "
+            "no_cache INTEGER NOT NULL, status TEXT NOT NULL, stage TEXT NOT NULL, error TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        # 旧库中保存 PDF 内容的 pdf 列已不再使用（结果在 ResultFiles 中）
+        if "pdf" in {row[1] for row in self._conn.execute("PRAGMA table_info(report_jobs)")}:
+            with contextlib.suppress(sqlite3.OperationalError):  # SQLite < 3.35 不支持 DROP COLUMN
+                self._conn.execute("ALTER TABLE report_jobs DROP COLUMN pdf")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs(status)")
+        self._conn.commit()
+
+    @staticmethod
+    def _row_to_job(row: tuple) -> Job:
+        values = dict(zip(_JOB_COLUMNS, row))
+        values["payload"] = json.loads(values["payload"])
+        values["no_cache"] = bool(values["no_cache"])
+        return Job(**values)
+
+    def create(self, job: Job) -> None:
+        values = asdict(job)
+        values["payload"] = json.dumps(job.payload, ensure_ascii=False)
+        values["no_cache"] = int(job.no_cache)
+        params = (JOB_DONE, JOB_FAILED, time.time() - self._ttl_seconds)
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT id FROM report_jobs WHERE status IN (?, ?) AND updated_at <= ?", params
+                )
+            ]
+            self._conn.execute("DELETE FROM report_jobs WHERE status IN (?, ?) AND updated_at <= ?", params)
+            self._conn.execute(
+                f"INSERT INTO report_jobs ({', '.join(_JOB_COLUMNS)}) VALUES ({', '.join('?' * len(_JOB_COLUMNS))})",
+                [values[c] for c in _JOB_COLUMNS],
+            )
+            self._conn.commit()
+        self.results.remove(expired)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM report_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id: str, **fields: Any) -> Job | None:
+        fields["updated_at"] = time.time()
+        columns = [c for c in fields if c in _JOB_COLUMNS and c not in {"id", "payload"}]
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE report_jobs SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+                [fields[c] for c in columns] + [job_id],
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def set_result(self, job_id: str, spool: PdfSpool) -> None:
+        self.results.save(job_id, spool)
+
+    def open_result(self, job_id: str) -> PdfSpool | None:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.results.open(job_id) if row else None
+
+    def unfinished(self) -> list[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM report_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+Runner = Callable[..., Awaitable[PdfSpool]]
+
+
+class JobManager:
+    def __init__(self, store: JobStore, *, workers: int = 2, queue_size: int = 32, runner: Runner | None = None):
+        self.store = store
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self._runner = runner or generate_pdf_file
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._changed: asyncio.Event | None = None
+        self.running = 0
+        self.submitted_total = 0
+        self.completed_total = 0
+        self.failed_total = 0
+        self.rejected_total = 0
+
+    def start(self) -> asyncio.Queue[str]:
+        """在当前事件循环中启动工作协程；首次启动时把存储中未完成的任务重新入队。"""
+        loop = asyncio.get_running_loop()
+        if self._queue is not None and self._loop is loop:
+            return self._queue
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._changed = asyncio.Event()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        for job in self.store.unfinished():
+            self.store.update(job.id, status=JOB_QUEUED)
+            self._queue.put_nowait(job.id)
+        return self._queue
+
+    def _notify(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    async def submit(
+        self,
+        *,
+        module: str,
+        payload: dict[str, Any],
+        screenshot: bytes | None = None,
+        no_cache: bool = False,
+    ) -> Job:
+        queue = self.start()
+        if queue.qsize() >= self.queue_size:
+            self.rejected_total += 1
+            raise JobQueueFull("任务队列已满，请稍后重试")
+        job = Job(id=uuid.uuid4().hex, module=module, payload=payload, screenshot=screenshot, no_cache=no_cache)
+        self.store.create(job)
+        queue.put_nowait(job.id)
+        self.submitted_total += 1
+        return job
+
+    def _set(self, job_id: str, **fields: Any) -> None:
+        self.store.update(job_id, **fields)
+        self._notify()
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is not None and job.status not in FINISHED_STATUSES:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        self.running += 1
+        self._set(job.id, status=JOB_RUNNING, stage="", error="")
+        try:
+            with admission_scope(priority=PRIORITY_BATCH):
+                spool = await self._runner(
+                    module=job.module,
+                    payload=job.payload,
+                    screenshot_data_url=InlineImage(job.screenshot) if job.screenshot else None,
+                    bypass_cache=job.no_cache,
+                    on_stage=lambda stage: self._set(job.id, stage=stage),
+                )
+            try:
+                await asyncio.to_thread(self.store.set_result, job.id, spool)
+            finally:
+                spool.close()
+        except asyncio.CancelledError:
+            # 服务关闭：保留未完成状态，SQLite 存储下次启动时重新入队
+            raise
+        except Exception as e:  # noqa: BLE001 - 任务失败原因原样回传给查询方
+            self.failed_total += 1
+            self._set(job.id, status=JOB_FAILED, error=str(e) or e.__class__.__name__)
+        else:
+            self.completed_total += 1
+            self._set(job.id, status=JOB_DONE)
+        finally:
+            self.running -= 1
+
+    async def watch(self, job_id: str, *, poll_seconds: float = 1.0) -> AsyncIterator[Job]:
+        """状态或阶段变化时产出任务快照，任务结束后停止。"""
+        self.start()
+        last: tuple[str, str] | None = None
+        while True:
+            changed = self._changed
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            if (job.status, job.stage) != last:
+                last = (job.status, job.stage)
+                yield job
+            if job.status in FINISHED_STATUSES:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def aclose(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "running": self.running,
+            "submitted_total": self.submitted_total,
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+def build_job_store(settings: Any) -> JobStore:
+    ttl_seconds = getattr(settings, "job_ttl_seconds", 86400)
+    result_dir = (getattr(settings, "job_result_dir", "") or "").strip() or None
+    sqlite_path = (getattr(settings, "job_store_sqlite_path", "") or "").strip()
+    if sqlite_path:
+        return SQLiteJobStore(sqlite_path, ttl_seconds=ttl_seconds, result_dir=result_dir)
+    return InMemoryJobStore(ttl_seconds=ttl_seconds, result_dir=result_dir)
+
+
+_MANAGER: JobManager | None = None
+
+
+def get_job_manager() -> JobManager:
+    global _MANAGER
+    if _MANAGER is None:
+        settings = get_settings()
+        _MANAGER = JobManager(
+            build_job_store(settings),
+            workers=getattr(settings, "job_workers", 2),
+            queue_size=getattr(settings, "job_queue_size", 32),
+        )
+    return _MANAGER
+
+
+@asynccontextmanager
+async def job_manager_lifespan(app: Any) -> AsyncIterator[None]:
+    manager = get_job_manager()
+    app.state.job_manager = manager
+    manager.start()
+    try:
+        yield
+    finally:
+        await manager.aclose()
@@ -0,0 +1,24 @@
+"""JSON 解码：优先使用 orjson（可选依赖），未安装或其拒绝的输入回退标准库 json。"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于部署环境
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: str | bytes | bytearray) -> Any:
+    """解析 JSON；失败时抛出 json.JSONDecodeError（orjson 的异常是其子类）。"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson 更严格（如 NaN/Infinity、孤立代理字符），交给标准库判定
+            pass
+    return json.loads(data)
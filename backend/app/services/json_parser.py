@@ -1,11 +1,31 @@
-"""JSON 文本解析与清洗。"""
+"""JSON 文本解析与清洗（含本地容错修复）。"""
 
 from __future__ import annotations
 
 import json
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.services.json_codec import loads
+
+_FULLWIDTH_DELIMITERS = {"，": ",", "：": ":", "｛": "{", "｝": "}", "［": "[", "］": "]"}
+_CURLY_QUOTES = {"“", "”"}
+_VALUE_START = set('"{[｛［-0123456789tfn') | _CURLY_QUOTES
+_WHITESPACE = " \t\r\n"
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_HEX = set("0123456789abcdefABCDEF")
 
 
 def parse_json_text(text: str) -> dict:
+    return loads(extract_json_text(text))
+
+
+def extract_json_text(text: str) -> str:
+    """去掉模型输出外层的 ``` 代码块与 json 标签，返回待解析的 JSON 文本。"""
+    return _strip_code_fence(text)
+
+
+def _strip_code_fence(text: str) -> str:
     s = (text or "").strip()
     if s.startswith("```"):
         parts = s.split("```")
@@ -15,8 +35,7 @@ def parse_json_text(text: str) -> dict:
                 first_line, rest = s.split("\n", 1)
                 if first_line.strip().lower().startswith("json"):
                     s = rest.strip()
-    s = _strip_plain_json_label(s)
-    return json.loads(s)
+    return _strip_plain_json_label(s)
 
 
 def _strip_plain_json_label(text: str) -> str:
@@ -33,3 +52,160 @@ def _strip_plain_json_label(text: str) -> str:
             _, rest = s.split("\n", 1)
             return rest.strip()
     return s
+
+
+def _skip_ws(text: str, i: int) -> int:
+    while i < len(text) and text[i] in _WHITESPACE:
+        i += 1
+    return i
+
+
+def _is_closing_quote(text: str, i: int) -> bool:
+    """字符串内的引号 text[i] 是否为结束引号：其后（跳过空白）为分隔符或文本结束。"""
+    j = _skip_ws(text, i + 1)
+    if j >= len(text) or text[j] in ",:}]":
+        return True
+    if text[j] in "，：｝］":
+        k = _skip_ws(text, j + 1)
+        return k >= len(text) or text[k] in _VALUE_START or text[k] in "}]｝］"
+    return False
+
+
+def _drop_trailing_comma(out: list[str]) -> None:
+    for idx in range(len(out) - 1, -1, -1):
+        if out[idx].strip() == "":
+            continue
+        if out[idx] == ",":
+            del out[idx]
+        return
+
+
+def _last_significant(out: list[str]) -> str:
+    for piece in reversed(out):
+        if piece.strip():
+            return piece
+    return ""
+
+
+def repair_json_text(text: str, *, salvage_depth: int = 2) -> Any:
+    """
+    本地容错解析模型输出的 JSON，修复常见问题后再 `json.loads`：
+    - 尾随逗号、重复逗号、括号错配；
+    - 字符串内未转义的引号与换行/制表符、非法反斜杠转义；
+    - 用作分隔符的中文全角标点（，：｛｝［］“”）；
+    - 输出被截断：回退到最后一个层级不超过 salvage_depth 的完整值并补齐括号
+      （默认 2，即保留完整的顶层字段与顶层数组中的完整元素，如完整的 sections）。
+    仍无法解析时抛出 json.JSONDecodeError。
+    """
+    s = _strip_code_fence(text)
+    starts = [i for i in (s.find(opener) for opener in "{[｛［") if i >= 0]
+    if not starts:
+        raise json.JSONDecodeError("未找到 JSON 对象或数组", s, 0)
+    start = min(starts)
+
+    out: list[str] = []
+    stack: list[list[str]] = []  # [括号, 对象内期望 key/value]
+    safe: tuple[int, tuple[str, ...]] | None = None
+    in_string = curly = is_key = closed = False
+    n = len(s)
+    i = start
+
+    def mark() -> None:
+        nonlocal safe
+        if stack and len(stack) <= salvage_depth:
+            safe = (len(out), tuple(entry[0] for entry in stack))
+
+    while i < n:
+        ch = s[i]
+        if in_string:
+            if ch == "\\":
+                nxt = s[i + 1] if i + 1 < n else ""
+                if nxt == "u" and len(s[i + 2 : i + 6]) == 4 and set(s[i + 2 : i + 6]) <= _HEX:
+                    out.append(s[i : i + 6])
+                    i += 6
+                    continue
+                if nxt and nxt in '"\\/bfnrt':
+                    out.append(ch + nxt)
+                    i += 2
+                    continue
+                out.append("\\\\")
+            elif ch == '"' or (curly and ch in _CURLY_QUOTES):
+                if _is_closing_quote(s, i):
+                    out.append('"')
+                    in_string = False
+                    if not is_key:
+                        mark()
+                elif ch == '"':
+                    out.append('\\"')
+                else:
+                    out.append(ch)
+            elif ch in _CONTROL_ESCAPES:
+                out.append(_CONTROL_ESCAPES[ch])
+            elif ord(ch) < 0x20:
+                out.append(f"\\u{ord(ch):04x}")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        ch = _FULLWIDTH_DELIMITERS.get(ch, ch)
+        if ch == '"' or ch in _CURLY_QUOTES:
+            in_string = True
+            curly = ch in _CURLY_QUOTES
+            is_key = bool(stack) and stack[-1] == ["{", "key"]
+            out.append('"')
+        elif ch in "{[":
+            stack.append([ch, "key" if ch == "{" else "value"])
+            out.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            _drop_trailing_comma(out)
+            opener = stack.pop()[0]
+            out.append("}" if opener == "{" else "]")
+            if not stack:
+                closed = True
+                break
+            mark()
+        elif ch == ",":
+            if _last_significant(out) not in {",", "{", "["}:
+                mark()
+                out.append(",")
+            if stack and stack[-1][0] == "{":
+                stack[-1][1] = "key"
+        elif ch == ":":
+            if stack and stack[-1][0] == "{":
+                stack[-1][1] = "value"
+            out.append(":")
+        else:
+            out.append(ch)
+        i += 1
+
+    if not closed:
+        if safe is not None:
+            del out[safe[0] :]
+            openers = safe[1]
+        else:
+            out = [_FULLWIDTH_DELIMITERS.get(s[start], s[start])]
+            openers = (out[0],)
+        _drop_trailing_comma(out)
+        out.extend("}" if opener == "{" else "]" for opener in reversed(openers))
+    return loads("".join(out))
+
+
+@dataclass
+class RepairStats:
+    local_hits: int = 0
+    local_misses: int = 0
+    llm_hits: int = 0
+    llm_misses: int = 0
+
+    def metrics(self) -> dict[str, int]:
+        return asdict(self)
+
+
+_STATS = RepairStats()
+
+
+def get_repair_stats() -> RepairStats:
+    return _STATS
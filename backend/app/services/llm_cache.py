@@ -0,0 +1,185 @@
+"""
+上游大模型响应缓存（内存 LRU + 可选 SQLite 持久层）。
+
+说明：
+- 缓存键为请求体（模型、消息、温度等）的稳定哈希，不含 `stream` 与 `max_tokens`（后者随历史输出规模自适应），流式与非流式共用；内联图片按内容摘要参与计算。
+- 两层各自有条目上限与 TTL；内存层未命中时回查磁盘层并回填。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from app.services.body_encoder import json_default
+from app.settings import get_settings
+
+
+_UNKEYED_FIELDS = {"stream", "max_tokens"}
+
+
+def cache_key(body: dict[str, Any]) -> str:
+    keyed = {k: v for k, v in body.items() if k not in _UNKEYED_FIELDS}
+    text = json.dumps(keyed, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=json_default)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUCache:
+    def __init__(self, *, max_entries: int, ttl_seconds: int):
+        self._max_entries = max(1, int(max_entries))
+        self._ttl_seconds = max(1, int(ttl_seconds))
+        self._items: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                self._items.pop(key, None)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = (time.time() + self._ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteCache:
+    def __init__(self, path: str | Path, *, max_entries: int, ttl_seconds: int):
+        self._max_entries = max(1, int(max_entries))
+        self._ttl_seconds = max(1, int(ttl_seconds))
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self._ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMCache:
+    def __init__(self, memory: MemoryLRUCache, disk: SQLiteCache | None = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key: str) -> str | None:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits_memory += 1
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.hits_disk += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.stores += 1
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "stores": self.stores,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk) if self.disk is not None else None,
+        }
+
+
+def build_llm_cache(settings: Any) -> LLMCache | None:
+    if not getattr(settings, "llm_cache_enabled", True):
+        return None
+    memory = MemoryLRUCache(
+        max_entries=getattr(settings, "llm_cache_max_entries", 256),
+        ttl_seconds=getattr(settings, "llm_cache_ttl_seconds", 3600),
+    )
+    disk = None
+    sqlite_path = (getattr(settings, "llm_cache_sqlite_path", "") or "").strip()
+    if sqlite_path:
+        disk = SQLiteCache(
+            sqlite_path,
+            max_entries=getattr(settings, "llm_cache_sqlite_max_entries", 2000),
+            ttl_seconds=getattr(settings, "llm_cache_sqlite_ttl_seconds", 86400),
+        )
+    return LLMCache(memory, disk)
+
+
+_CACHE: LLMCache | None = None
+_CACHE_BUILT = False
+
+
+def get_llm_cache() -> LLMCache | None:
+    """进程级缓存实例；未启用时返回 None。"""
+    global _CACHE, _CACHE_BUILT
+    if not _CACHE_BUILT:
+        _CACHE = build_llm_cache(get_settings())
+        _CACHE_BUILT = True
+    return _CACHE
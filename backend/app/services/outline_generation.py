@@ -0,0 +1,137 @@
+"""
+大纲模式生成：先生成封面与章节大纲，再并发生成各章节内容块并合并。
+
+说明：
+- 第一阶段调用一次上游，只输出 cover 与 sections（title/summary），输出短、返回快；
+- 第二阶段按章节并发调用（受 concurrency 限制），每章单独校验，失败时只重试该章（重试绕过缓存）；
+- 整体耗时取决于最慢的章节，而不是全部章节输出之和。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable
+
+from pydantic import ValidationError
+
+from app.domain.report_schema import CoverInfo, Section
+from app.prompts.outline import build_outline_prompt, build_section_prompt
+from app.services.admission import AdmissionRejected
+from app.services.json_parser import parse_json_text, repair_json_text
+from app.services.upstream_llm import UpstreamError
+
+OUTLINE_MAX_TOKENS = 2048
+SECTION_MAX_TOKENS = 6144
+
+PHASE_OUTLINE = "outline"
+PHASE_SECTION = "section"
+
+# (user_prompt, phase, is_retry) -> 模型原始输出
+LLMCall = Callable[[str, str, bool], Awaitable[str]]
+
+
+class OutlineGenerationError(RuntimeError):
+    pass
+
+
+@dataclass
+class OutlineStats:
+    reports_total: int = 0
+    sections_total: int = 0
+    section_retries: int = 0
+    section_failures: int = 0
+
+    def metrics(self) -> dict[str, int]:
+        return asdict(self)
+
+
+_STATS = OutlineStats()
+
+
+def get_outline_stats() -> OutlineStats:
+    return _STATS
+
+
+def _parse_object(raw: str) -> Any:
+    try:
+        return parse_json_text(raw)
+    except json.JSONDecodeError:
+        return repair_json_text(raw)
+
+
+def parse_outline(raw: str) -> dict[str, Any]:
+    """解析大纲：cover 需完整，sections 至少一项且包含 title/summary；忽略模型多给的 blocks。"""
+    try:
+        data = _parse_object(raw)
+        if not isinstance(data, dict):
+            raise ValueError("大纲不是 JSON 对象")
+        cover = CoverInfo.model_validate(data.get("cover") or {})
+        sections = [
+            {"title": str(s["title"]), "summary": str(s.get("summary") or "")}
+            for s in data.get("sections") or []
+            if isinstance(s, dict) and s.get("title")
+        ]
+    except (json.JSONDecodeError, ValidationError, ValueError) as e:
+        raise OutlineGenerationError(f"大纲解析失败: {e}") from e
+    if not sections:
+        raise OutlineGenerationError("大纲缺少章节")
+    return {"cover": cover.model_dump(), "sections": sections}
+
+
+def parse_section(raw: str, *, title: str, summary: str) -> dict[str, Any]:
+    """解析单章内容块（兼容直接输出数组或整章对象），校验失败时抛出 ValueError/ValidationError。"""
+    data = _parse_object(raw)
+    blocks = data.get("blocks") if isinstance(data, dict) else data
+    if not isinstance(blocks, list) or not blocks:
+        raise ValueError("章节缺少 blocks")
+    section = Section.model_validate({"title": title, "summary": summary, "blocks": blocks})
+    return section.model_dump()
+
+
+async def generate_outlined_report(
+    call: LLMCall,
+    *,
+    module: str,
+    payload: dict[str, Any],
+    concurrency: int = 4,
+    retries: int = 1,
+    on_stage: Callable[[str], None] | None = None,
+) -> dict[str, Any]:
+    """两阶段生成 ReportData 字典；任一章节重试后仍失败时抛出 OutlineGenerationError。"""
+    stats = get_outline_stats()
+    outline = parse_outline(await call(build_outline_prompt(module, payload), PHASE_OUTLINE, False))
+    if on_stage is not None:
+        on_stage("sections")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def generate_section(index: int) -> dict[str, Any]:
+        head = outline["sections"][index]
+        prompt = build_section_prompt(module, payload, outline, index)
+        error: Exception | None = None
+        async with semaphore:
+            for attempt in range(max(0, retries) + 1):
+                if attempt:
+                    stats.section_retries += 1
+                try:
+                    raw = await call(prompt, PHASE_SECTION, attempt > 0)
+                    return parse_section(raw, title=head["title"], summary=head["summary"])
+                except AdmissionRejected:
+                    raise
+                except (UpstreamError, json.JSONDecodeError, ValidationError, ValueError) as e:
+                    error = e
+        stats.section_failures += 1
+        raise OutlineGenerationError(f"第{index + 1}章生成失败: {error}") from error
+
+    tasks = [asyncio.ensure_future(generate_section(i)) for i in range(len(outline["sections"]))]
+    try:
+        sections = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    stats.reports_total += 1
+    stats.sections_total += len(sections)
+    return {"cover": outline["cover"], "sections": list(sections)}
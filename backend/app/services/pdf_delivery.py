@@ -0,0 +1,104 @@
+"""
+PDF 交付：渲染到临时文件并分块流式返回，避免整份 PDF 在内存中多次复制。
+
+说明：
+- `new_spool()` 使用 SpooledTemporaryFile，小于 `pdf_spool_max_memory_bytes` 的 PDF 留在内存，超过后自动落盘；
+- 渲染进程写入的是主进程预先分配的临时文件路径（`spool_for_path`），关闭时一并删除；
+- `pdf_streaming_response()` 以 `pdf_stream_chunk_bytes` 分块读取发送，发送结束或客户端中途断开时在响应体迭代器中关闭并清理文件
+  （Starlette 在断开时不会执行 BackgroundTask），响应处理结束时再兜底关闭一次。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+from typing import BinaryIO, Iterator
+
+from fastapi.responses import StreamingResponse
+
+from app.settings import get_settings
+
+
+class PdfSpool:
+    """一份已渲染 PDF 的临时文件句柄；调用方（或流式响应）负责 close()。"""
+
+    def __init__(self, file: BinaryIO, path: str | None = None):
+        self.file = file
+        self.path = path
+        self.closed = False
+
+    @property
+    def size(self) -> int:
+        pos = self.file.tell()
+        end = self.file.seek(0, os.SEEK_END)
+        self.file.seek(pos)
+        return end
+
+    def chunks(self, chunk_size: int) -> Iterator[bytes]:
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read_bytes(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        with contextlib.suppress(OSError):
+            self.file.close()
+        if self.path:
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+
+
+def new_spool() -> PdfSpool:
+    return PdfSpool(tempfile.SpooledTemporaryFile(max_size=get_settings().pdf_spool_max_memory_bytes, mode="w+b"))
+
+
+def reserve_spool_path() -> str:
+    """为渲染进程预留一个临时文件路径（已创建的空文件）。"""
+    fd, path = tempfile.mkstemp(prefix="report-", suffix=".pdf")
+    os.close(fd)
+    return path
+
+
+def spool_for_path(path: str) -> PdfSpool:
+    return PdfSpool(open(path, "rb"), path)
+
+
+def _stream_and_close(spool: PdfSpool, chunk_size: int) -> Iterator[bytes]:
+    try:
+        yield from spool.chunks(chunk_size)
+    finally:
+        spool.close()
+
+
+class _SpoolStreamingResponse(StreamingResponse):
+    def __init__(self, spool: PdfSpool, headers: dict[str, str]):
+        super().__init__(
+            _stream_and_close(spool, get_settings().pdf_stream_chunk_bytes),
+            media_type="application/pdf",
+            headers=headers,
+        )
+        self.spool = spool
+
+    async def __call__(self, scope, receive, send) -> None:
+        # 断开或发送出错时迭代器可能尚未开始或停在中途（其 finally 要等回收才执行），这里确定性地关闭
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.spool.close()
+
+
+def pdf_streaming_response(spool: PdfSpool, *, headers: dict[str, str] | None = None) -> StreamingResponse:
+    """分块发送 PDF，发送结束（含客户端中途断开）后关闭并删除临时文件。"""
+    merged = dict(headers or {})
+    merged["Content-Length"] = str(spool.size)
+    return _SpoolStreamingResponse(spool, merged)
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import re
 from io import BytesIO
+from typing import BinaryIO
 
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
@@ -14,6 +15,12 @@ class PdfRenderError(RuntimeError):
 
 
 async def render_long_pdf(html: str) -> bytes:
+    buffer = BytesIO()
+    write_long_pdf(html, buffer)
+    return buffer.getvalue()
+
+
+def write_long_pdf(html: str, out: BinaryIO) -> None:
     if not html:
         raise PdfRenderError("HTML内容为空")
 
@@ -24,12 +31,10 @@ async def render_long_pdf(html: str) -> bytes:
     if not text:
         raise PdfRenderError("HTML内容解析为空")
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer)
+    doc = SimpleDocTemplate(out)
     styles = getSampleStyleSheet()
     story = [
         Paragraph(text.replace("\n", "<br/>"), styles["BodyText"]),
         Spacer(1, 12),
     ]
     doc.build(story)
-    return buffer.getvalue()
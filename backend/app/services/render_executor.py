@@ -0,0 +1,231 @@
+"""
+PDF 渲染执行器：把 CPU 密集的 ReportLab 排版移出事件循环。
+
+说明：
+- `render_workers > 0` 时使用进程池（spawn），每个工作进程启动时注册字体并预热样式，
+  以 JSON 序列化的 ReportData 提交任务、返回 PDF 字节；
+- 进程池累计处理 `workers * render_max_tasks_per_worker` 个任务后整体回收重建（旧池处理完在途任务后退出），
+  防止长期运行的内存增长；未使用 `max_tasks_per_child`，其在 3.11 的 spawn 模式下会卡死；
+- `render_workers = 0`（默认，兼容不支持多进程的 Serverless 环境）时在线程中渲染，至少不阻塞事件循环，
+  启动时同样在本进程预热；
+- `render_to_file()` 渲染到临时文件供流式下载：线程模式写入 SpooledTemporaryFile，进程模式由工作进程直接写入
+  主进程预留的临时文件路径；
+- 工作进程异常退出（BrokenProcessPool）时重建进程池并重试一次。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+from app.domain.report_schema import ReportData
+from app.services.pdf_delivery import PdfSpool, new_spool, reserve_spool_path, spool_for_path
+from app.services.reportlab.font_bundle import ensure_font_bundle
+from app.services.reportlab.pdf_builder import build_pdf_bytes, warm_up, write_pdf
+from app.services.reportlab.theme import FONT_BUNDLE_DIR, FONTS_DIR
+from app.settings import get_settings
+
+T = TypeVar("T")
+
+
+def _init_worker() -> None:
+    warm_up()
+
+
+def _render_in_worker(report_json: str, module: str) -> bytes:
+    return build_pdf_bytes(ReportData.model_validate_json(report_json), module=module)
+
+
+def _render_to_path(report_json: str, module: str, path: str) -> int:
+    with open(path, "wb") as fh:
+        write_pdf(ReportData.model_validate_json(report_json), module, fh)
+        return fh.tell()
+
+
+def _ready() -> bool:
+    return True
+
+
+class RenderExecutor:
+    def __init__(self, *, workers: int = 0, max_tasks_per_worker: int = 0):
+        self.workers = max(0, workers)
+        self.max_tasks_per_worker = max(0, max_tasks_per_worker)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_tasks = 0
+        self.submitted_total = 0
+        self.completed_total = 0
+        self.failed_total = 0
+        self.pool_restarts = 0
+        self.pool_recycles = 0
+        self.pending = 0
+        self.peak_pending = 0
+        self.render_seconds_total = 0.0
+        self.pdf_bytes_total = 0
+        self.pdf_bytes_max = 0
+        self.last_pdf_bytes = 0
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            self._pool_tasks = 0
+        return self._pool
+
+    def _acquire_pool(self) -> ProcessPoolExecutor:
+        """取当前进程池并计数；达到回收阈值时换新池，旧池在途任务完成后自行退出。"""
+        limit = self.workers * self.max_tasks_per_worker
+        if limit and self._pool is not None and self._pool_tasks >= limit:
+            pool, self._pool = self._pool, None
+            self.pool_recycles += 1
+            pool.shutdown(wait=False)
+        pool = self._ensure_pool()
+        self._pool_tasks += 1
+        return pool
+
+    async def start(self) -> None:
+        """预先拉起全部工作进程（线程模式下在本进程）完成字体与样式预热，避免首个请求承担启动开销。"""
+        if not self.workers:
+            await asyncio.to_thread(warm_up)
+            return
+        # 字体包只在主进程生成一次，避免多个工作进程同时转换
+        await asyncio.to_thread(ensure_font_bundle, FONTS_DIR, FONT_BUNDLE_DIR)
+        pool = self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(self.workers)))
+
+    async def render(self, report: ReportData, *, module: str) -> bytes:
+        if not self.workers:
+            job = asyncio.to_thread(build_pdf_bytes, report, module)
+        else:
+            job = self._run_in_pool(_render_in_worker, report.model_dump_json(), module)
+        return await self._track(job, len)
+
+    async def render_to_file(self, report: ReportData, *, module: str) -> PdfSpool:
+        """渲染到临时文件（进程模式由工作进程直接写盘，不经主进程内存）；调用方负责 close()。"""
+        if not self.workers:
+            return await self._track(self._render_spooled(report, module), lambda spool: spool.size)
+        path = reserve_spool_path()
+        try:
+            await self._track(
+                self._run_in_pool(_render_to_path, report.model_dump_json(), module, path), lambda size: size
+            )
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+            raise
+        return spool_for_path(path)
+
+    async def _render_spooled(self, report: ReportData, module: str) -> PdfSpool:
+        spool = new_spool()
+        try:
+            await asyncio.to_thread(write_pdf, report, module, spool.file)
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    async def _track(self, job: Awaitable[T], size_of: Callable[[T], int]) -> T:
+        self.submitted_total += 1
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            result = await job
+        except BaseException:
+            self.failed_total += 1
+            raise
+        finally:
+            self.pending -= 1
+        size = size_of(result)
+        self.completed_total += 1
+        self.render_seconds_total += time.perf_counter() - started
+        self.last_pdf_bytes = size
+        self.pdf_bytes_total += size
+        self.pdf_bytes_max = max(self.pdf_bytes_max, size)
+        return result
+
+    async def _run_in_pool(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        pool = self._acquire_pool()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            return await loop.run_in_executor(self._acquire_pool(), fn, *args)
+
+    def _reset_pool(self, broken: ProcessPoolExecutor) -> None:
+        # 同一个池上的并发任务会一起失败，只由第一个重建
+        if self._pool is broken:
+            self._pool = None
+            self.pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def metrics(self) -> dict[str, Any]:
+        busy = min(self.pending, self.workers) if self.workers else self.pending
+        return {
+            "mode": "process" if self.workers else "thread",
+            "workers": self.workers,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "pending": self.pending,
+            "queue_depth": self.pending - busy,
+            "peak_pending": self.peak_pending,
+            "submitted_total": self.submitted_total,
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "pool_restarts": self.pool_restarts,
+            "pool_recycles": self.pool_recycles,
+            "avg_render_seconds": round(self.render_seconds_total / self.completed_total, 4)
+            if self.completed_total
+            else None,
+            "last_pdf_bytes": self.last_pdf_bytes,
+            "avg_pdf_bytes": self.pdf_bytes_total // self.completed_total if self.completed_total else None,
+            "max_pdf_bytes": self.pdf_bytes_max,
+        }
+
+
+_EXECUTOR: RenderExecutor | None = None
+
+
+def get_render_executor() -> RenderExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        settings = get_settings()
+        _EXECUTOR = RenderExecutor(
+            workers=settings.render_workers,
+            max_tasks_per_worker=settings.render_max_tasks_per_worker,
+        )
+    return _EXECUTOR
+
+
+async def close_render_executor() -> None:
+    global _EXECUTOR
+    executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown)
+
+
+@asynccontextmanager
+async def render_executor_lifespan(app: Any) -> AsyncIterator[None]:
+    """FastAPI lifespan：启动时预热渲染进程，退出时关闭进程池。"""
+    executor = get_render_executor()
+    app.state.render_executor = executor
+    await executor.start()
+    try:
+        yield
+    finally:
+        await close_render_executor()
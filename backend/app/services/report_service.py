@@ -2,22 +2,62 @@
 
 from __future__ import annotations
 
+import base64
 import json
 import os
 from datetime import datetime, timedelta, timezone
-import re
-from typing import Any
+from typing import Any, AsyncIterator, Callable
 
 import httpx
+from pydantic import ValidationError
 
 from app.domain.report_schema import ReportData
 from app.prompts.registry import build_prompt
-from app.services.json_parser import parse_json_text
-from app.services.reportlab.pdf_builder import build_pdf_bytes
-from app.services.upstream_llm import UpstreamConfig, UpstreamError, chat_completions
+from app.services.admission import AdmissionRejected, get_admission_controller
+from app.services.body_encoder import InlineImage
+from app.services.hedging import build_upstream_targets, hedged_call, hedged_stream
+from app.services.http_client import get_upstream_pool
+from app.services.json_parser import extract_json_text, get_repair_stats, parse_json_text, repair_json_text
+from app.services.llm_cache import get_llm_cache
+from app.services.outline_generation import (
+    OUTLINE_MAX_TOKENS,
+    PHASE_OUTLINE,
+    SECTION_MAX_TOKENS,
+    OutlineGenerationError,
+    generate_outlined_report,
+)
+from app.services.pdf_delivery import PdfSpool
+from app.services.report_transforms import WHITESPACE, TransformPipeline, date_transform
+from app.services.render_executor import get_render_executor
+from app.services.single_flight import flight_key, get_flight_group
+from app.services.structured_output import (
+    get_parse_failure_tracker,
+    report_response_format,
+    structured_output_mode,
+)
+from app.services.upstream_llm import (
+    UpstreamConfig,
+    ChatResult,
+    UpstreamError,
+    chat_completion_result,
+    normalize_markdown,
+    stream_chat_completions,
+)
+from app.services.token_estimator import (
+    RequestPlan,
+    estimate_tokens,
+    get_output_tracker,
+    plan_request,
+    repair_max_tokens,
+)
 from app.settings import get_settings
 
 
+MODE_SINGLE = "single"
+MODE_OUTLINE = "outline"
+GENERATION_MODES = (MODE_SINGLE, MODE_OUTLINE)
+
+
 class ReportServiceError(RuntimeError):
     pass
 
@@ -32,55 +72,8 @@ def apply_cover_defaults(report: ReportData, *, now: datetime | None = None) ->
     report.cover.plan_date = ts.strftime("%Y-%m-%d")
 
 
-def _replace_date_text(text: str, ts: datetime) -> str:
-    if not text:
-        return ""
-    s = str(text)
-    year = ts.year
-    month = ts.month
-    day = ts.day
-
-    def repl_sep(match: re.Match) -> str:
-        sep = match.group(2)
-        return f"{year}{sep}{month:02d}{sep}{day:02d}"
-
-    def repl_cn(match: re.Match) -> str:
-        return f"{year}年{month:02d}月{day:02d}日"
-
-    def repl_sep_month(match: re.Match) -> str:
-        sep = match.group(2)
-        return f"{year}{sep}{month:02d}"
-
-    def repl_cn_month(match: re.Match) -> str:
-        return f"{year}年{month:02d}月"
-
-    s = re.sub(r"(20\d{2})([-/.])(1[0-2]|0?[1-9])\2([12]\d|3[01]|0?[1-9])", repl_sep, s)
-    s = re.sub(r"(20\d{2})年(1[0-2]|0?[1-9])月([12]\d|3[01]|0?[1-9])日?", repl_cn, s)
-    s = re.sub(r"(20\d{2})([-/.])(1[0-2]|0?[1-9])(?!\2[0-3]?\d)", repl_sep_month, s)
-    s = re.sub(r"(20\d{2})年(1[0-2]|0?[1-9])月", repl_cn_month, s)
-    return s
-
-
 def apply_content_date_defaults(report: ReportData, *, now: datetime | None = None) -> None:
-    ts = now or _china_now()
-    for section in report.sections:
-        section.title = _replace_date_text(section.title, ts)
-        section.summary = _replace_date_text(section.summary, ts)
-        for block in section.blocks:
-            if block.type in {"paragraph", "subtitle"}:
-                block.text = _replace_date_text(block.text, ts)
-            elif block.type == "bullets":
-                block.items = [_replace_date_text(item, ts) for item in block.items]
-            elif block.type == "table":
-                block.headers = [_replace_date_text(item, ts) for item in block.headers]
-                block.rows = [
-                    [_replace_date_text(item, ts) for item in row]
-                    for row in block.rows
-                ]
-            elif block.type == "highlight_cards":
-                for item in block.items:
-                    item.title = _replace_date_text(item.title, ts)
-                    item.text = _replace_date_text(item.text, ts)
+    TransformPipeline([date_transform(now or _china_now())]).apply(report)
 
 
 def _trim_text(text: str, *, limit: int = 2000) -> str:
@@ -100,6 +93,30 @@ def _log_diag(event: str, payload: dict[str, Any]) -> None:
     print("[诊断日志] " + " | ".join(parts))
 
 
+def _log_continuations(module: str, result: ChatResult) -> None:
+    if result.continuations or result.truncated:
+        _log_diag(
+            "upstream_continuation",
+            {
+                "module": module,
+                "continuations": result.continuations,
+                "finish_reason": result.finish_reason or "",
+                "usage": result.usage or {},
+            },
+        )
+
+
+async def _render_pdf(report: ReportData, module: str) -> bytes:
+    pdf_bytes = await get_render_executor().render(report, module=module)
+    _log_diag("pdf_rendered", {"module": module, "bytes": len(pdf_bytes), "sections": len(report.sections)})
+    return pdf_bytes
+
+
+def _record_parse(settings: Any, model: str, *, failed: bool) -> None:
+    mode = structured_output_mode(settings, model)
+    get_parse_failure_tracker().record(model, mode=mode, failed=failed)
+
+
 def _select_model(settings: Any, module: str) -> str:
     default = (getattr(settings, "upstream_model_default", "") or "").strip()
     if module == "brand":
@@ -113,28 +130,41 @@ def _select_model(settings: Any, module: str) -> str:
     return default
 
 
-async def _repair_json(client: httpx.AsyncClient, cfg: UpstreamConfig, raw: str) -> str:
+async def _repair_json(client: httpx.AsyncClient, targets: list[UpstreamConfig], raw: str) -> str:
     repair_text = raw[:12000]
     prompt = (
         "请将以下内容修复为严格 JSON 对象，仅输出 JSON，不要 Markdown/HTML：\n\n"
         f"{repair_text}"
     )
-    return await chat_completions(
-        client,
-        cfg=cfg,
-        system="你是一位严格的JSON修复助手。",
-        user_prompt=prompt,
-        temperature=0.2,
-        max_tokens=12000,
+    result = await hedged_call(
+        targets,
+        lambda cfg: chat_completion_result(
+            client,
+            cfg=cfg,
+            system="你是一位严格的JSON修复助手。",
+            user_prompt=prompt,
+            temperature=0.2,
+            max_tokens=repair_max_tokens(repair_text, ceiling=12000),
+            cache=get_llm_cache(),
+            admission=get_admission_controller(),
+        ),
+        kind="json_repair",
     )
+    return normalize_markdown(result.content)
 
 
-async def generate_pdf_bytes(
-    *,
+SYSTEM_PROMPT = (
+    "你是一位资深的餐饮外卖运营与市场分析专家。"
+    "请严格按照JSON规则输出，不要附加多余文字。"
+)
+
+
+def _prepare_request(
     module: str,
     payload: dict[str, Any],
-    screenshot_data_url: str | None = None,
-) -> bytes:
+    *,
+    has_image: bool,
+) -> tuple[list[UpstreamConfig], RequestPlan]:
     settings = get_settings()
     try:
         prompt = build_prompt(module, payload)
@@ -142,46 +172,389 @@ async def generate_pdf_bytes(
         raise ReportServiceError(str(e)) from e
     model = _select_model(settings, module)
     cfg = UpstreamConfig(base_url=settings.upstream_base_url, api_key=settings.upstream_api_key, model=model)
+    plan = plan_request(
+        usage_key=module,
+        model=model,
+        system=SYSTEM_PROMPT,
+        user_prompt=prompt,
+        has_image=has_image,
+        settings=settings,
+    )
+    if plan.trimmed:
+        _log_diag(
+            "prompt_trimmed",
+            {"module": module, "model": model, "prompt_tokens": plan.prompt_tokens, "window": plan.context_window},
+        )
+    return build_upstream_targets(settings, module, cfg), plan
+
+
+def _parse_raw(settings: Any, model: str, raw: str) -> ReportData | dict | None:
+    """先直接校验为 ReportData，失败再容错解析为 dict；都失败时返回 None，交给 _repair_report_data。"""
+    data: ReportData | dict | None = _validate_fast(raw)
+    if data is None:
+        try:
+            data = parse_json_text(raw)
+        except json.JSONDecodeError:
+            _record_parse(settings, model, failed=True)
+            return None
+    _record_parse(settings, model, failed=False)
+    return data
+
+
+async def _repair_report_data(
+    client: httpx.AsyncClient,
+    targets: list[UpstreamConfig],
+    module: str,
+    raw: str,
+) -> dict:
+    """_parse_raw 失败后的修复：先本地修复，再请上游修复。"""
+    model = targets[0].model
+    _log_diag(
+        "json_parse_failed",
+        {"module": module, "model": model, "raw": raw},
+    )
+    stats = get_repair_stats()
+    data = _repair_locally(raw)
+    if data is not None:
+        stats.local_hits += 1
+        _log_diag("json_local_repair", {"module": module, "model": model, "sections": len(data["sections"])})
+        return data
+    stats.local_misses += 1
+    try:
+        repaired = await _repair_json(client, targets, raw)
+        _log_diag(
+            "json_repair_attempt",
+            {"module": module, "model": model, "repaired": repaired},
+        )
+        data = parse_json_text(repaired)
+    except AdmissionRejected:
+        raise
+    except Exception as err:
+        stats.llm_misses += 1
+        _log_diag(
+            "json_repair_failed",
+            {"module": module, "model": model, "error": str(err)},
+        )
+        raise ReportServiceError("JSON解析失败，且修复无效") from err
+    stats.llm_hits += 1
+    return data
+
+
+def _repair_locally(raw: str) -> dict | None:
+    """本地修复；结果需能通过 ReportData 校验且至少保留一个章节，否则交给上游修复。"""
+    try:
+        data = repair_json_text(raw)
+        if not isinstance(data, dict) or not data.get("sections"):
+            return None
+        ReportData.model_validate(data)
+    except (json.JSONDecodeError, ValidationError):
+        return None
+    return data
+
+
+def _validate_fast(raw: str) -> ReportData | None:
+    """直接从 JSON 文本校验为 ReportData（不先构建 dict）；失败时返回 None，交给容错解析。"""
+    try:
+        return ReportData.model_validate_json(extract_json_text(raw))
+    except ValidationError:
+        return None
+
+
+def _build_report(data: dict | ReportData) -> ReportData:
+    report = data if isinstance(data, ReportData) else ReportData.model_validate(data)
+    ts = _china_now()
+    apply_cover_defaults(report, now=ts)
+    # Markdown 标记留到渲染时由 reportlab/markup.py 转为 Paragraph 标记（保留粗体）
+    TransformPipeline([date_transform(ts), WHITESPACE]).apply(report)
+    return report
+
+
+async def generate_pdf_bytes(
+    *,
+    module: str,
+    payload: dict[str, Any],
+    screenshot_data_url: str | InlineImage | None = None,
+    client: httpx.AsyncClient | None = None,
+    bypass_cache: bool = False,
+    on_stage: Callable[[str], None] | None = None,
+    mode: str | None = None,
+) -> bytes:
+    """生成 PDF；相同模块/表单/截图的并发请求合并为一次生成。
+
+    mode 为 single（一次生成整篇）或 outline（先大纲后并发生成各章节），默认取 REPORT_GENERATION_MODE。
+    on_stage 在各阶段（prompt/upstream/parse/repair/validate/render，大纲模式为
+    prompt/outline/sections/validate/render）开始时回调；合并到他人请求的调用方不会收到阶段回调。
+    """
+    mode = mode or get_settings().report_generation_mode
+    if mode not in GENERATION_MODES:
+        raise ReportServiceError(f"不支持的生成模式: {mode}")
+    key = flight_key(module, payload, screenshot_data_url, bypass_cache, mode)
+    return await get_flight_group("generate_pdf").do(
+        key,
+        lambda: _generate_pdf_bytes(
+            module=module,
+            payload=payload,
+            screenshot_data_url=screenshot_data_url,
+            client=client,
+            bypass_cache=bypass_cache,
+            on_stage=on_stage or _ignore_stage,
+            mode=mode,
+        ),
+    )
+
 
-    system = (
-        "你是一位资深的餐饮外卖运营与市场分析专家。"
-        "请严格按照JSON规则输出，不要附加多余文字。"
+def _ignore_stage(_stage: str) -> None:
+    return None
+
+
+async def generate_pdf_file(
+    *,
+    module: str,
+    payload: dict[str, Any],
+    screenshot_data_url: str | InlineImage | None = None,
+    client: httpx.AsyncClient | None = None,
+    bypass_cache: bool = False,
+    on_stage: Callable[[str], None] | None = None,
+    mode: str | None = None,
+) -> PdfSpool:
+    """与 generate_pdf_bytes 相同，但把 PDF 渲染到临时文件，供路由分块流式返回；调用方负责 close()。
+
+    相同请求的并发调用只合并报告内容的生成，各自渲染到自己的文件。
+    """
+    mode = mode or get_settings().report_generation_mode
+    if mode not in GENERATION_MODES:
+        raise ReportServiceError(f"不支持的生成模式: {mode}")
+    on_stage = on_stage or _ignore_stage
+    key = flight_key(module, payload, screenshot_data_url, bypass_cache, mode)
+    report = await get_flight_group("generate_report").do(
+        key,
+        lambda: _generate_report(
+            module=module,
+            payload=payload,
+            screenshot_data_url=screenshot_data_url,
+            client=client,
+            bypass_cache=bypass_cache,
+            on_stage=on_stage,
+            mode=mode,
+        ),
     )
+    on_stage("render")
+    spool = await get_render_executor().render_to_file(report, module=module)
+    _log_diag("pdf_rendered", {"module": module, "bytes": spool.size, "sections": len(report.sections)})
+    return spool
+
 
-    async with httpx.AsyncClient() as client:
+async def _generate_pdf_bytes(
+    *,
+    module: str,
+    payload: dict[str, Any],
+    screenshot_data_url: str | InlineImage | None,
+    client: httpx.AsyncClient | None,
+    bypass_cache: bool,
+    on_stage: Callable[[str], None],
+    mode: str = MODE_SINGLE,
+) -> bytes:
+    report = await _generate_report(
+        module=module,
+        payload=payload,
+        screenshot_data_url=screenshot_data_url,
+        client=client,
+        bypass_cache=bypass_cache,
+        on_stage=on_stage,
+        mode=mode,
+    )
+    on_stage("render")
+    return await _render_pdf(report, module)
+
+
+async def _generate_report(
+    *,
+    module: str,
+    payload: dict[str, Any],
+    screenshot_data_url: str | InlineImage | None,
+    client: httpx.AsyncClient | None,
+    bypass_cache: bool,
+    on_stage: Callable[[str], None],
+    mode: str = MODE_SINGLE,
+) -> ReportData:
+    on_stage("prompt")
+    settings = get_settings()
+    image_data_url = screenshot_data_url if module == "market" else None
+    targets, plan = _prepare_request(module, payload, has_image=image_data_url is not None)
+    if client is None:
+        client = get_upstream_pool().client
+
+    if mode == MODE_OUTLINE:
+        on_stage("outline")
+        data = await _generate_outlined_data(
+            client,
+            targets,
+            module=module,
+            payload=payload,
+            image_data_url=image_data_url,
+            bypass_cache=bypass_cache,
+            on_stage=on_stage,
+        )
+    else:
+        on_stage("upstream")
         try:
-            raw = await chat_completions(
-                client,
-                cfg=cfg,
-                system=system,
-                user_prompt=prompt,
-                image_data_url=screenshot_data_url if module == "market" else None,
+            result = await hedged_call(
+                targets,
+                lambda cfg: chat_completion_result(
+                    client,
+                    cfg=cfg,
+                    system=SYSTEM_PROMPT,
+                    user_prompt=plan.user_prompt,
+                    max_tokens=plan.max_tokens,
+                    image_data_url=image_data_url,
+                    cache=get_llm_cache(),
+                    admission=get_admission_controller(),
+                    bypass_cache=bypass_cache,
+                    max_continuations=settings.upstream_max_continuations,
+                    response_format=report_response_format(settings, cfg.model),
+                ),
+                kind="report",
             )
+        except AdmissionRejected:
+            raise
         except UpstreamError as e:
             raise ReportServiceError(str(e)) from e
+        _log_continuations(module, result)
+        raw = normalize_markdown(result.content)
+        get_output_tracker().record_completion(module, result, estimate_tokens(raw))
 
-        try:
-            data = parse_json_text(raw)
-        except json.JSONDecodeError as e:
-            _log_diag(
-                "json_parse_failed",
-                {"module": module, "model": model, "raw": raw},
-            )
-            try:
-                repaired = await _repair_json(client, cfg, raw)
-                _log_diag(
-                    "json_repair_attempt",
-                    {"module": module, "model": model, "repaired": repaired},
-                )
-                data = parse_json_text(repaired)
-            except Exception as err:
-                _log_diag(
-                    "json_repair_failed",
-                    {"module": module, "model": model, "error": str(err)},
-                )
-                raise ReportServiceError("JSON解析失败，且修复无效") from err
-
-    report = ReportData.model_validate(data)
-    apply_cover_defaults(report)
-    apply_content_date_defaults(report)
-    return build_pdf_bytes(report, module=module)
+        on_stage("parse")
+        data = _parse_raw(settings, result.model or targets[0].model, raw)
+        if data is None:
+            on_stage("repair")
+            data = await _repair_report_data(client, targets, module, raw)
+
+    on_stage("validate")
+    return _build_report(data)
+
+
+async def _generate_outlined_data(
+    client: httpx.AsyncClient,
+    targets: list[UpstreamConfig],
+    *,
+    module: str,
+    payload: dict[str, Any],
+    image_data_url: str | InlineImage | None,
+    bypass_cache: bool,
+    on_stage: Callable[[str], None],
+) -> dict:
+    settings = get_settings()
+
+    async def call(user_prompt: str, phase: str, is_retry: bool) -> str:
+        usage_key = f"{phase}:{module}"
+        plan = plan_request(
+            usage_key=usage_key,
+            model=targets[0].model,
+            system=SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            has_image=image_data_url is not None,
+            default_max_tokens=OUTLINE_MAX_TOKENS if phase == PHASE_OUTLINE else SECTION_MAX_TOKENS,
+            settings=settings,
+        )
+        result = await hedged_call(
+            targets,
+            lambda cfg: chat_completion_result(
+                client,
+                cfg=cfg,
+                system=SYSTEM_PROMPT,
+                user_prompt=plan.user_prompt,
+                max_tokens=plan.max_tokens,
+                image_data_url=image_data_url,
+                cache=get_llm_cache(),
+                admission=get_admission_controller(),
+                bypass_cache=bypass_cache or is_retry,
+                max_continuations=settings.upstream_max_continuations,
+            ),
+            kind=phase,
+        )
+        _log_continuations(usage_key, result)
+        raw = normalize_markdown(result.content)
+        get_output_tracker().record_completion(usage_key, result, estimate_tokens(raw))
+        return raw
+
+    try:
+        return await generate_outlined_report(
+            call,
+            module=module,
+            payload=payload,
+            concurrency=settings.outline_section_concurrency,
+            retries=settings.outline_section_retries,
+            on_stage=on_stage,
+        )
+    except AdmissionRejected:
+        raise
+    except (UpstreamError, OutlineGenerationError) as e:
+        _log_diag("outline_failed", {"module": module, "model": targets[0].model, "error": str(e)})
+        raise ReportServiceError(str(e)) from e
+
+
+async def stream_pdf_generation(
+    *,
+    module: str,
+    payload: dict[str, Any],
+    screenshot_data_url: str | InlineImage | None = None,
+    client: httpx.AsyncClient | None = None,
+    bypass_cache: bool = False,
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """流式生成：依次产出 (事件名, 数据)，事件包括 stage / delta，最后一条为 pdf。"""
+    yield "stage", {"stage": "prompt"}
+    settings = get_settings()
+    image_data_url = screenshot_data_url if module == "market" else None
+    targets, plan = _prepare_request(module, payload, has_image=image_data_url is not None)
+    if client is None:
+        client = get_upstream_pool().client
+
+    results: dict[UpstreamConfig, ChatResult] = {}
+
+    def open_stream(cfg: UpstreamConfig) -> AsyncIterator[str]:
+        return stream_chat_completions(
+            client,
+            cfg=cfg,
+            system=SYSTEM_PROMPT,
+            user_prompt=plan.user_prompt,
+            max_tokens=plan.max_tokens,
+            image_data_url=image_data_url,
+            cache=get_llm_cache(),
+            admission=get_admission_controller(),
+            bypass_cache=bypass_cache,
+            max_continuations=settings.upstream_max_continuations,
+            result=results.setdefault(cfg, ChatResult()),
+            response_format=report_response_format(settings, cfg.model),
+        )
+
+    # 与非流式相同的对冲与故障转移（按首个增量竞速）；首个增量之后的失败直接报错
+    yield "stage", {"stage": "upstream", "model": targets[0].model}
+    parts: list[str] = []
+    try:
+        cfg, deltas = await hedged_stream(targets, open_stream, kind="report", cached=lambda cfg: results[cfg].cached)
+        if cfg is not targets[0]:
+            yield "stage", {"stage": "upstream", "model": cfg.model}
+        async for delta in deltas:
+            parts.append(delta)
+            yield "delta", {"text": delta}
+    except AdmissionRejected:
+        raise
+    except UpstreamError as e:
+        raise ReportServiceError(str(e)) from e
+    result = results[cfg]
+    _log_continuations(module, result)
+    raw = normalize_markdown("".join(parts))
+    get_output_tracker().record_completion(module, result, estimate_tokens(raw))
+
+    yield "stage", {"stage": "parse"}
+    data = _parse_raw(settings, result.model or cfg.model, raw)
+    if data is None:
+        yield "stage", {"stage": "repair"}
+        data = await _repair_report_data(client, targets, module, raw)
+
+    yield "stage", {"stage": "validate"}
+    report = _build_report(data)
+
+    yield "stage", {"stage": "render"}
+    pdf_bytes = await _render_pdf(report, module)
+    yield "pdf", {"pdf_base64": base64.b64encode(pdf_bytes).decode("ascii"), "size": len(pdf_bytes)}
@@ -0,0 +1,159 @@
+"""
+ReportData 文本后处理：一次遍历执行多个预编译的文本变换。
+
+说明：
+- 每个变换只编译一次正则，带廉价的预检查（如不含 "20" 的字符串跳过日期替换）；
+- 变换可限定作用字段（章节标题、摘要、段落、要点、表头、单元格、卡片标题/正文）；
+- 同一次遍历内相同字段类型的相同文本只计算一次（表格中大量重复单元格）。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable
+
+from app.domain.report_schema import ReportData
+
+FIELD_SECTION_TITLE = "section_title"
+FIELD_SUMMARY = "summary"
+FIELD_SUBTITLE = "subtitle"
+FIELD_PARAGRAPH = "paragraph"
+FIELD_BULLET = "bullet"
+FIELD_HEADER = "header"
+FIELD_CELL = "cell"
+FIELD_CARD_TITLE = "card_title"
+FIELD_CARD_TEXT = "card_text"
+
+# 渲染时按行内 Markdown 转换的字段（与 reportlab/blocks.py 一致）
+CONTENT_FIELDS = frozenset(
+    {FIELD_SUBTITLE, FIELD_PARAGRAPH, FIELD_BULLET, FIELD_CELL, FIELD_CARD_TITLE, FIELD_CARD_TEXT}
+)
+
+
+@dataclass(frozen=True)
+class TextTransform:
+    name: str
+    apply: Callable[[str], str]
+    precheck: Callable[[str], bool] | None = None
+    fields: frozenset[str] | None = None
+
+    def applies_to(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+
+_MONTH = r"(?:1[0-2]|0?[1-9])"
+_DAY = r"(?:[12]\d|3[01]|0?[1-9])"
+_DATE_RE = re.compile(
+    rf"(?P<sep_day>20\d{{2}}(?P<s1>[-/.]){_MONTH}(?P=s1){_DAY})"
+    rf"|(?P<cn_day>20\d{{2}}年{_MONTH}月{_DAY}日?)"
+    rf"|(?P<sep_month>20\d{{2}}(?P<s2>[-/.]){_MONTH}(?!(?P=s2)[0-3]?\d))"
+    rf"|(?P<cn_month>20\d{{2}}年{_MONTH}月)"
+)
+
+
+def date_transform(now: datetime) -> TextTransform:
+    """把文本中的年月日/年月统一替换为 now 对应的日期，保留原分隔符与中文写法。"""
+    mm, dd = f"{now.month:02d}", f"{now.day:02d}"
+    cn_day = f"{now.year}年{mm}月{dd}日"
+    cn_month = f"{now.year}年{mm}月"
+
+    def repl(match: re.Match) -> str:
+        if match.group("sep_day"):
+            sep = match.group("s1")
+            return f"{now.year}{sep}{mm}{sep}{dd}"
+        if match.group("cn_day"):
+            return cn_day
+        if match.group("sep_month"):
+            return f"{now.year}{match.group('s2')}{mm}"
+        return cn_month
+
+    return TextTransform("dates", lambda s: _DATE_RE.sub(repl, s), precheck=lambda s: "20" in s)
+
+
+def replace_date_text(text: str, now: datetime) -> str:
+    if not text:
+        return ""
+    return date_transform(now).apply(str(text))
+
+
+# 只去掉首尾空白（与原先渲染前清洗一致），内部空格、对齐与换行原样保留
+WHITESPACE = TextTransform("whitespace", str.strip, fields=CONTENT_FIELDS)
+
+_MD_HEADING_RE = re.compile(r"^#+\s+")
+_MD_BULLET_RE = re.compile(r"^\s*[-*]\s+")
+_MD_NUMBER_RE = re.compile(r"^\s*\d+\.\s+")
+_MD_INLINE_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_MD_EM_RE = re.compile(r"\*(.+?)\*")
+_MD_CODE_RE = re.compile(r"`([^`]+)`")
+_MD_CHARS = frozenset("#*-_`0123456789")
+
+
+def sanitize_markdown(text: str) -> str:
+    """去掉行首标题/列表标记与行内粗体、斜体、代码标记。"""
+    if not text:
+        return ""
+    s = str(text).strip()
+    if _MD_CHARS.isdisjoint(s):
+        return s
+    s = _MD_HEADING_RE.sub("", s)
+    s = _MD_BULLET_RE.sub("", s)
+    s = _MD_NUMBER_RE.sub("", s)
+    if "*" in s or "_" in s:
+        s = _MD_INLINE_RE.sub(lambda m: m.group(1) if m.group(1) is not None else m.group(2), s)
+        s = _MD_EM_RE.sub(r"\1", s)
+    if "`" in s:
+        s = _MD_CODE_RE.sub(r"\1", s)
+    return s
+
+
+class TransformPipeline:
+    """按顺序对每个字符串执行变换，一次遍历整份报告（原地修改）。"""
+
+    def __init__(self, transforms: Iterable[TextTransform]):
+        self.transforms = tuple(transforms)
+        self._by_field: dict[str, tuple[TextTransform, ...]] = {}
+
+    def _for_field(self, field: str) -> tuple[TextTransform, ...]:
+        chain = self._by_field.get(field)
+        if chain is None:
+            chain = tuple(t for t in self.transforms if t.applies_to(field))
+            self._by_field[field] = chain
+        return chain
+
+    def transform_text(self, text: str, field: str) -> str:
+        s = text or ""
+        for transform in self._for_field(field):
+            if transform.precheck is None or transform.precheck(s):
+                s = transform.apply(s)
+        return s
+
+    def apply(self, report: ReportData) -> ReportData:
+        memo: dict[tuple[str, str], str] = {}
+
+        def run(text: str, field: str) -> str:
+            key = (field, text)
+            out = memo.get(key)
+            if out is None:
+                out = memo[key] = self.transform_text(text, field)
+            return out
+
+        for section in report.sections:
+            section.title = run(section.title, FIELD_SECTION_TITLE)
+            section.summary = run(section.summary, FIELD_SUMMARY)
+            for block in section.blocks:
+                if block.type == "paragraph":
+                    block.text = run(block.text, FIELD_PARAGRAPH)
+                elif block.type == "subtitle":
+                    block.text = run(block.text, FIELD_SUBTITLE)
+                elif block.type == "bullets":
+                    block.items = [run(item, FIELD_BULLET) for item in block.items]
+                elif block.type == "table":
+                    block.headers = [run(item, FIELD_HEADER) for item in block.headers]
+                    block.rows = [[run(cell, FIELD_CELL) for cell in row] for row in block.rows]
+                elif block.type == "highlight_cards":
+                    for item in block.items:
+                        item.title = run(item.title, FIELD_CARD_TITLE)
+                        item.text = run(item.text, FIELD_CARD_TEXT)
+        return report
@@ -2,32 +2,33 @@
 
 from __future__ import annotations
 
-import re
 from typing import Iterable
 
-from reportlab.lib import colors
 from reportlab.lib.units import mm
 from reportlab.platypus import (
     HRFlowable,
     KeepTogether,
     ListFlowable,
     ListItem,
-    Paragraph,
     Spacer,
     Table,
     TableStyle,
 )
 
 from app.domain.report_schema import HighlightCard, Section
+from app.services.report_transforms import sanitize_markdown
+from app.services.reportlab.glyph_widths import CJKParagraph
+from app.services.reportlab.markup import escape_markup, to_markup
+from app.services.reportlab.tables import build_fast_table
 from app.services.reportlab.theme import Theme
 
 
 def build_cover(cover, styles: dict, theme: Theme) -> list:
     meta_rows = [
-        [Paragraph(cover.report_subtitle, styles["cover_meta"])],
-        [Paragraph(cover.business_line, styles["cover_meta"])],
-        [Paragraph(cover.period_text, styles["cover_meta"])],
-        [Paragraph(cover.plan_date, styles["cover_meta"])],
+        [CJKParagraph(escape_markup(cover.report_subtitle), styles["cover_meta"])],
+        [CJKParagraph(escape_markup(cover.business_line), styles["cover_meta"])],
+        [CJKParagraph(escape_markup(cover.period_text), styles["cover_meta"])],
+        [CJKParagraph(escape_markup(cover.plan_date), styles["cover_meta"])],
     ]
     meta_table = Table(meta_rows, colWidths=[160 * mm])
     meta_table.setStyle(
@@ -45,13 +46,13 @@ def build_cover(cover, styles: dict, theme: Theme) -> list:
 
     return [
         Spacer(1, 18 * mm),
-        Paragraph("呈尚策划", styles["cover_brand"]),
+        CJKParagraph("呈尚策划", styles["cover_brand"]),
         Spacer(1, 3 * mm),
         HRFlowable(color=theme.primary, thickness=1.2, width="60%"),
         Spacer(1, 24 * mm),
-        Paragraph(cover.store_name, styles["title"]),
+        CJKParagraph(escape_markup(cover.store_name), styles["title"]),
         Spacer(1, 6 * mm),
-        Paragraph(cover.report_title, styles["subtitle"]),
+        CJKParagraph(escape_markup(cover.report_title), styles["subtitle"]),
         Spacer(1, 60 * mm),
         meta_table,
     ]
@@ -61,10 +62,10 @@ def build_toc(sections: list[Section], styles: dict, theme: Theme) -> list:
     lines = []
     for idx, section in enumerate(sections, 1):
         dots = "." * 24
-        text = f"{idx}. {section.title} {dots} {section.summary}"
-        lines.append([Paragraph(text, styles["toc_item"])])
+        text = f"{idx}. {escape_markup(section.title)} {dots} {escape_markup(section.summary)}"
+        lines.append([CJKParagraph(text, styles["toc_item"])])
     if not lines:
-        lines.append([Paragraph("暂无目录", styles["toc_item"])])
+        lines.append([CJKParagraph("暂无目录", styles["toc_item"])])
     table = Table(lines, colWidths=[160 * mm])
     table.setStyle(
         TableStyle(
@@ -79,7 +80,7 @@ def build_toc(sections: list[Section], styles: dict, theme: Theme) -> list:
         )
     )
     return [
-        Paragraph("目录", styles["toc_title"]),
+        CJKParagraph("目录", styles["toc_title"]),
         Spacer(1, 2 * mm),
         HRFlowable(color=theme.primary, thickness=1),
         Spacer(1, 6 * mm),
@@ -89,7 +90,7 @@ def build_toc(sections: list[Section], styles: dict, theme: Theme) -> list:
 
 def build_section_title(index: int, title: str, styles: dict, theme: Theme) -> list:
     return [
-        Paragraph(f"{index}. {title}", styles["section_title"]),
+        CJKParagraph(f"{index}. {escape_markup(title)}", styles["section_title"]),
         Spacer(1, 2 * mm),
         HRFlowable(color=theme.primary, thickness=1),
         Spacer(1, 4 * mm),
@@ -98,73 +99,34 @@ def build_section_title(index: int, title: str, styles: dict, theme: Theme) -> l
 
 def build_subtitle(text: str, styles: dict) -> list:
     return [
-        Paragraph(sanitize_markdown_text(text), styles["subsection_title"]),
+        CJKParagraph(to_markup(text), styles["subsection_title"]),
         Spacer(1, 2 * mm),
     ]
 
 
 def sanitize_markdown_text(text: str) -> str:
-    if not text:
-        return ""
-    s = str(text).strip()
-    s = re.sub(r"^#+\s+", "", s)
-    s = re.sub(r"^\s*[-*]\s+", "", s)
-    s = re.sub(r"^\s*\d+\.\s+", "", s)
-    s = re.sub(r"\*\*(.+?)\*\*", r"\1", s)
-    s = re.sub(r"__(.+?)__", r"\1", s)
-    s = re.sub(r"\*(.+?)\*", r"\1", s)
-    s = re.sub(r"`([^`]+)`", r"\1", s)
-    return s
+    """去掉 Markdown 标记的纯文本（不转义，不用于 Paragraph）。"""
+    return sanitize_markdown(text)
 
 
 def build_paragraph(text: str, styles: dict) -> Paragraph:
-    return Paragraph(sanitize_markdown_text(text), styles["body"])
+    return CJKParagraph(to_markup(text), styles["body"])
 
 
 def build_bullets(items: Iterable[str], styles: dict) -> ListFlowable:
-    bullets = [ListItem(Paragraph(sanitize_markdown_text(item), styles["body"])) for item in items]
+    bullets = [ListItem(CJKParagraph(to_markup(item), styles["body"])) for item in items]
     return ListFlowable(bullets, bulletType="bullet", leftIndent=14)
 
 
 def build_table(headers: list[str], rows: list[list[str]], styles: dict, theme: Theme) -> Table:
-    safe_headers = headers or ["项", "内容"]
-    col_count = max(len(safe_headers), 1)
-    normalized_rows = []
-    for row in rows:
-        trimmed = list(row)[:col_count]
-        if len(trimmed) < col_count:
-            trimmed.extend([""] * (col_count - len(trimmed)))
-        normalized_rows.append(trimmed)
-    body_rows = [
-        [Paragraph(sanitize_markdown_text(str(cell)), styles["body"]) for cell in row]
-        for row in normalized_rows
-    ]
-    data = [safe_headers] + body_rows
-    col_width = 160 * mm / col_count
-    table = Table(data, colWidths=[col_width] * col_count)
-    style = TableStyle(
-        [
-            ("BACKGROUND", (0, 0), (-1, 0), theme.primary),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#DDDDDD")),
-            ("FONTNAME", (0, 0), (-1, 0), styles["section_title"].fontName),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, theme.light]),
-            ("LEFTPADDING", (0, 0), (-1, -1), 6),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-            ("TOPPADDING", (0, 0), (-1, -1), 4),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-        ]
-    )
-    table.setStyle(style)
-    return table
+    return build_fast_table(headers, rows, styles, theme)
 
 
 def build_highlight_cards(items: list[HighlightCard], styles: dict, theme: Theme) -> list:
     flowables: list = []
     for item in items:
-        content = Paragraph(
-            f"<b>{sanitize_markdown_text(item.title)}</b>：{sanitize_markdown_text(item.text)}",
+        content = CJKParagraph(
+            f"<b>{to_markup(item.title)}</b>：{to_markup(item.text)}",
             styles["highlight_body"],
         )
         card = Table([[content]], colWidths=[160 * mm])
@@ -0,0 +1,161 @@
+"""
+字体包：把随仓库分发的 CFF 轮廓 NotoSansSC（.otf）离线转换为 ReportLab 可加载、可子集化的 TrueType 轮廓（.ttf）。
+
+说明：
+- ReportLab 的 `TTFont` 只支持 glyf 轮廓，直接加载 .otf 会失败并回退到不嵌入字形的 STSong-Light；
+- 转换使用 fontTools（三次贝塞尔 → 二次），每个字体约 10 秒，结果写入 `assets/fonts/bundle` 并以源文件内容哈希命名；
+  该目录随仓库提交，源字体变化后需执行 `python -m app.services.reportlab.font_bundle` 重新生成并提交；
+- 运行时缺少对应文件时，仅在目录可写且已安装 fontTools 时才现场转换，否则立即返回 None，
+  由调用方回退原有字体逻辑（Serverless 只读目录不会白白转换一遍再写入失败）；
+- TTF 注册后 ReportLab 只嵌入每份 PDF 实际用到的字形（子集化）。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+import os
+import sys
+from pathlib import Path
+
+try:
+    from fontTools.pens.cu2quPen import Cu2QuPen
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.ttLib import TTFont, newTable
+except ImportError:  # pragma: no cover - 取决于部署环境
+    TTFont = None
+
+logger = logging.getLogger(__name__)
+
+FONT_STEMS = ("NotoSansSC-Regular", "NotoSansSC-Bold")
+# 二次曲线拟合允许的最大误差（字体单位，1000/em 时约 0.1% 字号）
+MAX_ERROR = 1.0
+# 转换逻辑变化时递增，使已提交的字体包失效
+BUNDLE_VERSION = 1
+
+
+def _signature(path: Path) -> str:
+    """按源字体内容（而非 mtime）计算签名，重新检出仓库后仍然命中。"""
+    digest = hashlib.sha1(f"{BUNDLE_VERSION}|{MAX_ERROR}|".encode("utf-8"))
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _writable(directory: Path) -> bool:
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(directory, os.W_OK)
+
+
+def bundle_path(bundle_dir: Path, source: Path) -> Path:
+    return bundle_dir / f"{source.stem}-{_signature(source)}.ttf"
+
+
+def convert_otf_to_ttf(source: Path, target: Path, *, max_error: float = MAX_ERROR) -> None:
+    """把 CFF 轮廓字体转换为 glyf 轮廓；写临时文件后原子替换。"""
+    font = TTFont(str(source))
+    if "CFF " not in font:
+        raise ValueError(f"{source.name} 不是 CFF 轮廓字体")
+    glyph_order = font.getGlyphOrder()
+    glyph_set = font.getGlyphSet()
+    glyf = newTable("glyf")
+    glyf.glyphOrder = glyph_order
+    glyf.glyphs = {}
+    for name in glyph_order:
+        pen = TTGlyphPen(glyph_set)
+        glyph_set[name].draw(Cu2QuPen(pen, max_error, reverse_direction=True))
+        glyf.glyphs[name] = pen.glyph()
+
+    font["loca"] = newTable("loca")
+    font["glyf"] = glyf
+    for tag in ("CFF ", "VORG"):
+        if tag in font:
+            del font[tag]
+    glyf.compile(font)
+
+    hmtx = font["hmtx"]
+    for name, glyph in glyf.glyphs.items():
+        advance, _ = hmtx[name]
+        hmtx[name] = (advance, getattr(glyph, "xMin", 0) if glyph.numberOfContours else 0)
+
+    maxp = newTable("maxp")
+    maxp.tableVersion = 0x00010000
+    maxp.numGlyphs = len(glyph_order)
+    maxp.maxZones = 1
+    for field in (
+        "maxTwilightPoints",
+        "maxStorage",
+        "maxFunctionDefs",
+        "maxInstructionDefs",
+        "maxStackElements",
+        "maxSizeOfInstructions",
+        "maxComponentElements",
+    ):
+        setattr(maxp, field, 0)
+    font["maxp"] = maxp
+    font["post"].formatType = 3.0
+    font["head"].glyphDataFormat = 0
+    font.sfntVersion = "\x00\x01\x00\x00"
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        font.save(str(tmp))
+        os.replace(tmp, target)
+    finally:
+        with contextlib.suppress(OSError):
+            tmp.unlink()
+
+
+def ensure_font_bundle(fonts_dir: Path, bundle_dir: Path) -> dict[str, Path] | None:
+    """返回 {字体名: TTF 路径}；缺失时尝试转换生成，无法生成（无 fontTools/目录只读/源缺失）时返回 None。"""
+    bundle: dict[str, Path] = {}
+    for stem in FONT_STEMS:
+        source = fonts_dir / f"{stem}.otf"
+        if not source.exists():
+            return None
+        target = bundle_path(bundle_dir, source)
+        if not target.exists():
+            if TTFont is None:
+                logger.warning("font_bundle_skipped: fontTools 未安装，无法转换 %s", source.name)
+                return None
+            if not _writable(bundle_dir):
+                logger.warning("font_bundle_skipped: %s 不可写，跳过转换 %s", bundle_dir, source.name)
+                return None
+            try:
+                convert_otf_to_ttf(source, target)
+            except (OSError, ValueError) as exc:
+                logger.warning("font_bundle_failed: %s: %s", source.name, exc)
+                return None
+        bundle[stem] = target
+    return bundle
+
+
+def prune_bundle(bundle_dir: Path, bundle: dict[str, Path]) -> list[Path]:
+    """删除目录中不再对应当前源字体的旧 TTF，返回被删除的路径。"""
+    keep = set(bundle.values())
+    removed = [path for path in bundle_dir.glob("*.ttf") if path not in keep]
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def main() -> None:
+    from app.services.reportlab.theme import FONT_BUNDLE_DIR, FONTS_DIR
+
+    bundle = ensure_font_bundle(FONTS_DIR, FONT_BUNDLE_DIR)
+    if bundle is None:
+        sys.exit("字体包生成失败（需要 fontTools 且目录可写）")
+    for path in prune_bundle(FONT_BUNDLE_DIR, bundle):
+        print(f"removed stale {path.name}")
+    for stem, path in bundle.items():
+        print(f"{stem}: {path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
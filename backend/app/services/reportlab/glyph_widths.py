@@ -0,0 +1,163 @@
+"""
+字形宽度表与 CJK 断行快速路径。
+
+说明：
+- 为已注册字体预计算 BMP 内全部码位的字宽（1/1000 em，float32），缓存到 `assets/fonts/.cache`，
+  加载时以 mmap 只读映射，多个渲染进程共享同一份页缓存；缓存目录不可写（如 Serverless）时仅保存在内存；
+- 安装后字体实例的 `stringWidth` 改为查表，ReportLab 各处测宽（断行、表格列宽）都走查表；
+- `CJKParagraph` 在单一片段的纯文本段落（绝大多数正文与表格单元格）上一次性查出整段字宽，
+  直接交给 ReportLab 的 `dumbSplit` 断行，语义与 `wordWrap="CJK"` 相同；其余情况回退父类实现。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import mmap
+import os
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable
+
+import reportlab
+from reportlab.lib.textsplit import dumbSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import Paragraph
+
+BMP_SIZE = 0x10000
+CACHE_VERSION = 1
+
+_LOCK = threading.Lock()
+_TABLES: dict[str, "GlyphWidthTable"] = {}
+
+
+class GlyphWidthTable:
+    """单个字体的 BMP 字宽表；超出 BMP 的字符交给字体原有的测宽方法。"""
+
+    def __init__(self, advances: memoryview, fallback: Callable[..., float], source: str):
+        self._advances = advances
+        self._lookup = advances.__getitem__
+        self._fallback = fallback
+        self.source = source
+
+    def char_widths(self, text: str, size: float) -> list[float]:
+        scale = 0.001 * size
+        try:
+            return [self._lookup(cp) * scale for cp in map(ord, text)]
+        except IndexError:
+            return [self._fallback(ch, size) for ch in text]
+
+    def string_width(self, text: str | bytes, size: float, encoding: str | None = "utf8") -> float:
+        if isinstance(text, bytes):
+            text = text.decode(encoding or "utf8")
+        try:
+            return 0.001 * size * sum(map(self._lookup, map(ord, text)))
+        except IndexError:
+            return self._fallback(text, size, encoding)
+
+
+def _font_signature(font_name: str, font) -> str:
+    path = getattr(getattr(font, "face", None), "filename", None)
+    parts = [str(CACHE_VERSION), reportlab.Version, font_name, type(font).__name__]
+    if path and os.path.exists(path):
+        stat = os.stat(path)
+        parts += [os.path.abspath(path), str(stat.st_size), str(int(stat.st_mtime))]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _compute_advances(measure: Callable[..., float]) -> array:
+    # 以 1000pt 测单字即得 1/1000 em 单位的字宽；代理区码位不会单独出现，按 0 处理
+    advances = array("f", bytes(4 * BMP_SIZE))
+    for cp in range(BMP_SIZE):
+        if 0xD800 <= cp <= 0xDFFF:
+            continue
+        advances[cp] = measure(chr(cp), 1000)
+    return advances
+
+
+def _load_cached(path: Path) -> memoryview | None:
+    try:
+        with path.open("rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mapped) != 4 * BMP_SIZE:
+        mapped.close()
+        return None
+    return memoryview(mapped).cast("f")
+
+
+def _store_cache(path: Path, advances: array) -> bool:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("wb") as fh:
+            advances.tofile(fh)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        with contextlib.suppress(OSError):
+            tmp.unlink()
+        return False
+
+
+def load_width_table(font_name: str, cache_dir: Path) -> GlyphWidthTable:
+    """读取（或计算并缓存）字体的字宽表，不修改字体对象。"""
+    font = pdfmetrics.getFont(font_name)
+    measure = font.stringWidth
+    path = cache_dir / f"{font_name}-{_font_signature(font_name, font)}.widths"
+    advances = _load_cached(path)
+    if advances is not None:
+        return GlyphWidthTable(advances, measure, "mmap")
+    computed = _compute_advances(measure)
+    if _store_cache(path, computed):
+        advances = _load_cached(path)
+        if advances is not None:
+            return GlyphWidthTable(advances, measure, "mmap")
+    return GlyphWidthTable(memoryview(computed), measure, "memory")
+
+
+def install_width_table(font_name: str, cache_dir: Path) -> GlyphWidthTable:
+    """为已注册字体安装字宽表（每进程每字体一次）。"""
+    table = _TABLES.get(font_name)
+    if table is not None:
+        return table
+    with _LOCK:
+        table = _TABLES.get(font_name)
+        if table is None:
+            table = load_width_table(font_name, cache_dir)
+            pdfmetrics.getFont(font_name).stringWidth = table.string_width
+            _TABLES[font_name] = table
+    return table
+
+
+def uninstall_width_table(font_name: str) -> None:
+    """恢复字体原有的测宽方法（基准对比用）。"""
+    with _LOCK:
+        if _TABLES.pop(font_name, None) is not None:
+            pdfmetrics.getFont(font_name).__dict__.pop("stringWidth", None)
+
+
+def get_width_table(font_name: str) -> GlyphWidthTable | None:
+    return _TABLES.get(font_name)
+
+
+class CJKParagraph(Paragraph):
+    """单片段纯文本走字宽表整段断行的段落；行为与 `wordWrap="CJK"` 的 Paragraph 一致。"""
+
+    def breakLinesCJK(self, maxWidths):
+        frags = self.frags
+        if len(frags) != 1 or getattr(self, "_splitpara", 0) or self.style.endDots or self.bulletText:
+            return super().breakLinesCJK(maxWidths)
+        f = frags[0]
+        text = getattr(f, "text", None)
+        table = get_width_table(f.fontName)
+        if table is None or not isinstance(text, str) or hasattr(f, "cbDefn"):
+            return super().breakLinesCJK(maxWidths)
+        if not isinstance(maxWidths, (list, tuple)):
+            maxWidths = [maxWidths]
+        self.height = 0
+        lines = dumbSplit(text, table.char_widths(text, f.fontSize), maxWidths)
+        wrapped = [(sp, [line]) for (sp, line) in lines]
+        return f.clone(kind=0, lines=wrapped, ascent=f.fontSize, descent=-0.2 * f.fontSize)
@@ -0,0 +1,78 @@
+"""
+行内 Markdown → ReportLab Paragraph 标记。
+
+说明：
+- 每个字符串最多一次预编译正则扫描：行首标题/列表/序号标记一次匹配去掉，行内标记与 `& < >` 在同一次 sub 中处理；
+  不含行内标记的文本只做 str.replace 转义，不含任何特殊字符的文本原样返回；
+- `**粗体**` / `__粗体__` 转为 `<b>`，斜体与行内代码只保留文字（中文字体没有斜体/等宽字形）；
+- 其余文本按 XML 转义，模型输出中的 `<`、`&` 不会破坏 Paragraph 解析；
+- `to_markup_batch()` 一次处理整张表的单元格，相同文本只转换一次。
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+_PREFIX_RE = re.compile(r"(?:#+\s+)?(?:\s*[-*]\s+)?(?:\s*\d+\.\s+)?")
+# 开头的前瞻让引擎按字符集快速跳过普通文字，只在可能的标记位置尝试各分支
+_INLINE_RE = re.compile(
+    r"(?=[*_`&<>])(?:\*\*(?P<b1>.+?)\*\*|__(?P<b2>.+?)__|\*(?P<em>.+?)\*|`(?P<code>[^`]+)`|(?P<esc>[&<>]))"
+)
+# 预检查用正则 search 而非 frozenset.isdisjoint：后者在不含特殊字符的长文本上逐字符遍历，慢约 10 倍
+_SPECIAL_RE = re.compile(r"[#*\-_`0-9&<>]")
+_PREFIX_START = frozenset("#*-0123456789")
+_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+
+
+def _escape(s: str) -> str:
+    # 连续 str.replace 比 str.translate 在中文长文本上快得多
+    if "&" in s:
+        s = s.replace("&", "&amp;")
+    if "<" in s:
+        s = s.replace("<", "&lt;")
+    if ">" in s:
+        s = s.replace(">", "&gt;")
+    return s
+
+
+def escape_markup(text: str) -> str:
+    """只做 XML 转义（章节标题、封面等不解析 Markdown 的文本）。"""
+    return _escape(str(text or ""))
+
+
+def _replace(match: re.Match) -> str:
+    esc = match.group("esc")
+    if esc is not None:
+        return _ESCAPES[esc]
+    bold = match.group("b1") or match.group("b2")
+    if bold is not None:
+        return f"<b>{_escape(bold)}</b>"
+    return _escape(match.group("em") or match.group("code"))
+
+
+def to_markup(text: str) -> str:
+    """把一段行内 Markdown 转为已转义的 Paragraph 标记。"""
+    if not text:
+        return ""
+    s = str(text).strip()
+    if _SPECIAL_RE.search(s) is None:
+        return s
+    if s[0] in _PREFIX_START:
+        s = s[_PREFIX_RE.match(s).end():]
+    if "*" not in s and "_" not in s and "`" not in s:
+        return _escape(s)
+    return _INLINE_RE.sub(_replace, s)
+
+
+def to_markup_batch(texts: Iterable[object]) -> list[str]:
+    """批量转换（如整张表的单元格），重复文本复用结果。"""
+    memo: dict[str, str] = {}
+    out = []
+    for value in texts:
+        text = str(value)
+        markup = memo.get(text)
+        if markup is None:
+            markup = memo[text] = to_markup(text)
+        out.append(markup)
+    return out
@@ -3,10 +3,11 @@
 from __future__ import annotations
 
 from io import BytesIO
-from pathlib import Path
+from typing import BinaryIO, Callable
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
+from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import PageBreak, SimpleDocTemplate, Spacer
 
 from app.domain.report_schema import ReportData
@@ -20,8 +21,7 @@ from app.services.reportlab.blocks import (
     build_table,
     build_toc,
 )
-from app.services.reportlab.styles import build_styles, register_fonts
-from app.services.reportlab.theme import get_theme
+from app.services.reportlab.theme import ThemeStyles, get_theme_styles, warm_up_styles
 
 
 LEFT_MARGIN_MM = 22
@@ -36,15 +36,20 @@ def get_pagesize() -> tuple[float, float]:
 
 def build_pdf_bytes(report: ReportData, module: str) -> bytes:
     buffer = BytesIO()
-    fonts_dir = Path(__file__).resolve().parents[3] / "assets" / "fonts"
-    font_name, bold_name = register_fonts(fonts_dir)
-    styles = build_styles(font_name, bold_name)
-    theme = get_theme(module)
-    styles["title"].textColor = theme.primary
-    styles["section_title"].textColor = theme.primary
-    styles["toc_title"].textColor = theme.primary
-    styles["cover_brand"].textColor = theme.primary
+    write_pdf(report, module, buffer)
+    return buffer.getvalue()
+
+
+def write_pdf(report: ReportData, module: str, out: BinaryIO, *, canvasmaker: type[Canvas] = Canvas) -> None:
+    """把报告排版写入文件对象（临时文件或内存缓冲）。"""
+    registry = get_theme_styles(module)
+    story = build_story(report, registry)
+    draw_footer = page_footer(registry)
+    build_document(out).build(story, onFirstPage=draw_footer, onLaterPages=draw_footer, canvasmaker=canvasmaker)
 
+
+def build_story(report: ReportData, registry: ThemeStyles) -> list:
+    styles, theme = registry.styles, registry.theme
     story: list = []
     story.extend(build_cover(report.cover, styles, theme))
     story.append(PageBreak())
@@ -66,9 +71,12 @@ def build_pdf_bytes(report: ReportData, module: str) -> bytes:
                 story.extend(build_highlight_cards(block.items, styles, theme))
             story.append(Spacer(1, 4 * mm))
         story.append(Spacer(1, 4 * mm))
+    return story
+
 
-    doc = SimpleDocTemplate(
-        buffer,
+def build_document(out: BinaryIO) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        out,
         pagesize=get_pagesize(),
         leftMargin=LEFT_MARGIN_MM * mm,
         rightMargin=RIGHT_MARGIN_MM * mm,
@@ -76,6 +84,10 @@ def build_pdf_bytes(report: ReportData, module: str) -> bytes:
         bottomMargin=BOTTOM_MARGIN_MM * mm,
     )
 
+
+def page_footer(registry: ThemeStyles) -> Callable[[Canvas, SimpleDocTemplate], None]:
+    font_name, theme = registry.font_name, registry.theme
+
     def _draw_footer(canvas, doc_obj):
         canvas.saveState()
         canvas.setFont(font_name, 9)
@@ -83,5 +95,35 @@ def build_pdf_bytes(report: ReportData, module: str) -> bytes:
         canvas.drawCentredString(A4[0] / 2, 10 * mm, f"第 {doc_obj.page} 页")
         canvas.restoreState()
 
-    doc.build(story, onFirstPage=_draw_footer, onLaterPages=_draw_footer)
-    return buffer.getvalue()
+    return _draw_footer
+
+
+_WARM_UP_REPORT = {
+    "cover": {
+        "store_name": "预热",
+        "report_title": "预热报告",
+        "report_subtitle": "字体与样式预热",
+        "business_line": "外卖",
+        "period_text": "2024年01月",
+        "plan_date": "2024-01-01",
+    },
+    "sections": [
+        {
+            "title": "预热章节",
+            "summary": "预热",
+            "blocks": [
+                {"type": "subtitle", "text": "小标题"},
+                {"type": "paragraph", "text": "常用中文字符与数字 0123456789，用于预热字体度量。"},
+                {"type": "bullets", "items": ["要点"]},
+                {"type": "table", "headers": ["指标", "数值"], "rows": [["曝光", "100"]]},
+                {"type": "highlight_cards", "items": [{"title": "重点", "text": "内容"}]},
+            ],
+        }
+    ],
+}
+
+
+def warm_up() -> None:
+    """构建全部主题样式并渲染一份最小报告，预热字体度量等缓存（启动时调用）。"""
+    warm_up_styles()
+    build_pdf_bytes(ReportData.model_validate(_WARM_UP_REPORT), module="brand")
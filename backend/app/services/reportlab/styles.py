@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Mapping
 
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
@@ -24,7 +25,9 @@ def _safe_register_font(name: str, path: Path) -> bool:
         return False
 
 
-def _pick_font_path(fonts_dir: Path, stem: str) -> Path:
+def _pick_font_path(fonts_dir: Path, stem: str, bundle: Mapping[str, Path] | None = None) -> Path:
+    if bundle and stem in bundle:
+        return bundle[stem]
     ttf = fonts_dir / f"{stem}.ttf"
     otf = fonts_dir / f"{stem}.otf"
     if ttf.exists():
@@ -32,11 +35,12 @@ def _pick_font_path(fonts_dir: Path, stem: str) -> Path:
     return otf
 
 
-def register_fonts(fonts_dir: Path) -> tuple[str, str]:
+def register_fonts(fonts_dir: Path, bundle: Mapping[str, Path] | None = None) -> tuple[str, str]:
+    """注册中文字体；`bundle` 为字体包中转换好的 TTF（见 font_bundle），优先于目录内的字体文件。"""
     regular_name = "NotoSansSC"
     bold_name = "NotoSansSC-Bold"
-    regular_path = _pick_font_path(fonts_dir, "NotoSansSC-Regular")
-    bold_path = _pick_font_path(fonts_dir, "NotoSansSC-Bold")
+    regular_path = _pick_font_path(fonts_dir, "NotoSansSC-Regular", bundle)
+    bold_path = _pick_font_path(fonts_dir, "NotoSansSC-Bold", bundle)
 
     ok_regular = _safe_register_font(regular_name, regular_path)
     ok_bold = _safe_register_font(bold_name, bold_path) if bold_path.exists() else False
@@ -70,6 +74,7 @@ def build_styles(font_name: str, bold_name: str) -> dict[str, ParagraphStyle]:
         fontSize=11,
         leading=18,
         textColor=colors.HexColor("#333333"),
+        wordWrap="CJK",
     )
     styles["small"] = ParagraphStyle(
         "small",
@@ -147,6 +152,19 @@ def build_styles(font_name: str, bold_name: str) -> dict[str, ParagraphStyle]:
         leading=14,
         alignment=TA_LEFT,
     )
+    styles["table_cell"] = ParagraphStyle(
+        "table_cell",
+        parent=styles["body"],
+        fontSize=10,
+        leading=15,
+        alignment=TA_LEFT,
+    )
+    styles["table_header"] = ParagraphStyle(
+        "table_header",
+        parent=styles["table_cell"],
+        fontName=bold_name,
+        textColor=colors.white,
+    )
     styles["highlight_title"] = ParagraphStyle(
         "highlight_title",
         parent=styles["body"],
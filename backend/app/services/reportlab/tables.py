@@ -0,0 +1,160 @@
+"""
+ReportLab 表格渲染：面向上百行的指标/竞品表。
+
+说明：
+- 列宽按内容估算：先测出每列（含表头）单行所需宽度（按去掉标签、还原实体后的纯文本测量），窄列按需分配，其余宽度按需求比例分给长文本列；
+- 表头与单元格整表一次批量转换为 Paragraph 标记（见 markup.py，粗体保留、特殊字符转义）；
+- 单行放得下且不含标记字符的单元格直接使用字符串（不构造 Paragraph），其余用 Paragraph 自动换行；
+- TableStyle 按主题与字体缓存，所有表格共享；长表按行分页并在每页重复表头（repeatRows）。
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from typing import Mapping, Sequence
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Table, TableStyle
+
+from app.services.reportlab.glyph_widths import CJKParagraph
+from app.services.reportlab.markup import to_markup_batch
+from app.services.reportlab.theme import Theme
+
+TABLE_WIDTH = 160 * mm
+CELL_PADDING = 6
+MIN_COL_WIDTH = 14 * mm
+DEFAULT_HEADERS = ["项", "内容"]
+# 含这些字符的文本交给 Paragraph 解析（实体、标签）
+_MARKUP_CHARS = frozenset("<>&\n")
+_TAG_RE = re.compile(r"<[^>]*>")
+
+_STYLE_CACHE: dict[tuple[str, str, str, float, float], TableStyle] = {}
+
+
+def _table_style(theme: Theme, cell: ParagraphStyle, header: ParagraphStyle) -> TableStyle:
+    key = (theme.name, cell.fontName, header.fontName, cell.fontSize, cell.leading)
+    style = _STYLE_CACHE.get(key)
+    if style is None:
+        style = TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), theme.primary),
+                ("TEXTCOLOR", (0, 0), (-1, 0), header.textColor),
+                ("FONTNAME", (0, 0), (-1, 0), header.fontName),
+                ("FONTNAME", (0, 1), (-1, -1), cell.fontName),
+                ("TEXTCOLOR", (0, 1), (-1, -1), cell.textColor),
+                ("FONTSIZE", (0, 0), (-1, -1), cell.fontSize),
+                ("LEADING", (0, 0), (-1, -1), cell.leading),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#DDDDDD")),
+                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, theme.light]),
+                ("LEFTPADDING", (0, 0), (-1, -1), CELL_PADDING),
+                ("RIGHTPADDING", (0, 0), (-1, -1), CELL_PADDING),
+                ("TOPPADDING", (0, 0), (-1, -1), 4),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+            ]
+        )
+        _STYLE_CACHE[key] = style
+    return style
+
+
+def normalize_rows(headers: Sequence[str], rows: Sequence[Sequence[object]]) -> tuple[list[str], list[list[str]]]:
+    """补齐/截断各行到表头列数，并把表头与全部单元格批量转换为 Paragraph 标记。"""
+    col_count = len(headers) or len(DEFAULT_HEADERS)
+    cells: list[object] = list(headers) or list(DEFAULT_HEADERS)
+    for row in rows:
+        row = list(row)[:col_count]
+        cells.extend(row)
+        cells.extend([""] * (col_count - len(row)))
+    markup = to_markup_batch(cells)
+    body = [markup[start : start + col_count] for start in range(col_count, len(markup), col_count)]
+    return markup[:col_count], body
+
+
+def estimate_col_widths(
+    natural: Sequence[float], total: float = TABLE_WIDTH, min_width: float = MIN_COL_WIDTH
+) -> list[float]:
+    """按单行所需宽度分配列宽：需求不超过均分额度的列照需分配，余下宽度按需求比例分给其余列。"""
+    count = len(natural)
+    if not count:
+        return []
+    wanted = [max(w, min_width) for w in natural]
+    if sum(wanted) <= total:
+        scale = total / sum(wanted)
+        return [w * scale for w in wanted]
+    widths = [0.0] * count
+    remaining = set(range(count))
+    budget = total
+    while remaining:
+        share = budget / len(remaining)
+        narrow = [i for i in remaining if wanted[i] <= share]
+        if not narrow:
+            break
+        for i in narrow:
+            widths[i] = wanted[i]
+            budget -= wanted[i]
+            remaining.discard(i)
+    if remaining:
+        demand = sum(wanted[i] for i in remaining)
+        floor = min(min_width, budget / len(remaining))
+        extra = budget - floor * len(remaining)
+        for i in remaining:
+            widths[i] = floor + extra * wanted[i] / demand
+    return widths
+
+
+def _plain_text(markup: str) -> str:
+    """Paragraph 标记对应的可见文本（`<b>`、`&amp;` 不计入宽度）。"""
+    if "<" in markup:
+        markup = _TAG_RE.sub("", markup)
+    if "&" in markup:
+        markup = html.unescape(markup)
+    return markup
+
+
+def _natural_widths(
+    headers: Sequence[str], rows: Sequence[Sequence[str]], cell: ParagraphStyle, header: ParagraphStyle
+) -> list[list[float]]:
+    """返回每列各单元格（第 0 项为表头）的单行文本宽度。"""
+    columns = []
+    for idx, title in enumerate(headers):
+        widths = [stringWidth(_plain_text(title), header.fontName, header.fontSize)]
+        widths.extend(stringWidth(_plain_text(row[idx]), cell.fontName, cell.fontSize) for row in rows)
+        columns.append(widths)
+    return columns
+
+
+def _cell(text: str, fits: bool, style: ParagraphStyle):
+    if fits and _MARKUP_CHARS.isdisjoint(text):
+        return text
+    return CJKParagraph(text, style)
+
+
+def build_fast_table(
+    headers: Sequence[str],
+    rows: Sequence[Sequence[object]],
+    styles: Mapping[str, ParagraphStyle],
+    theme: Theme,
+    *,
+    total_width: float = TABLE_WIDTH,
+) -> Table:
+    cell_style = styles["table_cell"]
+    header_style = styles["table_header"]
+    safe_headers, body = normalize_rows(headers, rows)
+    columns = _natural_widths(safe_headers, body, cell_style, header_style)
+    pad = 2 * CELL_PADDING
+    col_widths = estimate_col_widths([max(col) + pad for col in columns], total_width)
+    inner = [w - pad for w in col_widths]
+
+    data = [
+        [_cell(text, columns[c][0] <= inner[c], header_style) for c, text in enumerate(safe_headers)]
+    ]
+    for r, row in enumerate(body, 1):
+        data.append([_cell(text, columns[c][r] <= inner[c], cell_style) for c, text in enumerate(row)])
+
+    table = Table(data, colWidths=col_widths, repeatRows=1, splitByRow=1, splitInRow=1)
+    table.setStyle(_table_style(theme, cell_style, header_style))
+    return table
@@ -1,10 +1,31 @@
-"""ReportLab 主题色配置。"""
+"""
+ReportLab 主题色配置与进程级样式注册表。
+
+说明：
+- 字体注册（优先使用字体包中转换好的 TTF）与样式表构建只在进程内做一次，按模块主题预先生成各自着色的样式表；
+- 样式表以只读映射发布，渲染时不再修改共享的 ParagraphStyle，可被多个线程并发使用；
+- `warm_up_styles()` 供启动时调用，提前完成字体解析与字宽表加载。
+"""
 
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 
 from reportlab.lib.colors import HexColor
+from reportlab.lib.styles import ParagraphStyle
+
+from app.services.reportlab.font_bundle import ensure_font_bundle
+from app.services.reportlab.glyph_widths import install_width_table
+from app.services.reportlab.styles import build_styles, register_fonts
+
+
+FONTS_DIR = Path(__file__).resolve().parents[3] / "assets" / "fonts"
+GLYPH_CACHE_DIR = FONTS_DIR / ".cache"
+FONT_BUNDLE_DIR = FONTS_DIR / "bundle"
 
 
 @dataclass(frozen=True)
@@ -25,6 +46,63 @@ THEMES: dict[str, Theme] = {
 
 DEFAULT_THEME = Theme("报告", HexColor("#9B5B2A"), HexColor("#F3E7DD"), HexColor("#6E3E1E"))
 
+# 使用主题主色的样式
+THEMED_STYLES = ("title", "section_title", "toc_title", "cover_brand")
+
 
 def get_theme(module: str) -> Theme:
     return THEMES.get(module, DEFAULT_THEME)
+
+
+@dataclass(frozen=True)
+class ThemeStyles:
+    theme: Theme
+    font_name: str
+    bold_name: str
+    styles: Mapping[str, ParagraphStyle]
+
+
+_LOCK = threading.RLock()
+_FONTS: tuple[str, str] | None = None
+_REGISTRY: dict[str, ThemeStyles] = {}
+
+
+def get_fonts() -> tuple[str, str]:
+    """注册字体并安装字宽表（每进程一次），返回 (正文字体名, 粗体字体名)。"""
+    global _FONTS
+    if _FONTS is None:
+        with _LOCK:
+            if _FONTS is None:
+                fonts = register_fonts(FONTS_DIR, ensure_font_bundle(FONTS_DIR, FONT_BUNDLE_DIR))
+                for name in set(fonts):
+                    install_width_table(name, GLYPH_CACHE_DIR)
+                _FONTS = fonts
+    return _FONTS
+
+
+def _build_theme_styles(theme: Theme) -> ThemeStyles:
+    font_name, bold_name = get_fonts()
+    styles = build_styles(font_name, bold_name)
+    for key in THEMED_STYLES:
+        styles[key].textColor = theme.primary
+    return ThemeStyles(theme, font_name, bold_name, MappingProxyType(styles))
+
+
+def get_theme_styles(module: str) -> ThemeStyles:
+    """按模块取预构建的主题样式表；未知模块共用默认主题。"""
+    key = module if module in THEMES else ""
+    entry = _REGISTRY.get(key)
+    if entry is None:
+        with _LOCK:
+            entry = _REGISTRY.get(key)
+            if entry is None:
+                entry = _build_theme_styles(get_theme(module))
+                _REGISTRY[key] = entry
+    return entry
+
+
+def warm_up_styles() -> None:
+    """注册字体并构建全部主题的样式表。"""
+    for module in THEMES:
+        get_theme_styles(module)
+    get_theme_styles("")
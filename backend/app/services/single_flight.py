@@ -0,0 +1,79 @@
+"""
+相同请求合并（single-flight）。
+
+说明：
+- 同一 key 的并发调用只执行一次，其余调用方等待同一个任务并拿到相同结果（或相同异常）。
+- 单个等待方断开（取消）不会影响共享任务；所有等待方都离开后才取消共享任务。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def flight_key(*parts: Any) -> str:
+    text = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Call:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self.leaders_total = 0
+        self.shared_total = 0
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            self._calls.pop(key, None)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task, key=key, call=call: self._forget(key, call))
+            self.leaders_total += 1
+        else:
+            self.shared_total += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders_total": self.leaders_total,
+            "shared_total": self.shared_total,
+        }
+
+
+_GROUPS: dict[str, SingleFlight] = {}
+
+
+def get_flight_group(name: str) -> SingleFlight:
+    group = _GROUPS.get(name)
+    if group is None:
+        group = _GROUPS[name] = SingleFlight()
+    return group
+
+
+def flight_metrics() -> dict[str, dict[str, int]]:
+    return {name: group.metrics() for name, group in _GROUPS.items()}
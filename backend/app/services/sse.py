@@ -0,0 +1,25 @@
+"""Server-Sent Events 编码工具。"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def error_payload(exc: BaseException) -> dict[str, Any]:
+    """未预期异常的对外错误信息；DIAGNOSTIC_LOGS=1 时附带异常内容与类型。"""
+    if os.getenv("DIAGNOSTIC_LOGS") == "1":
+        return {"detail": f"内部错误: {exc}", "type": exc.__class__.__name__}
+    return {"detail": "服务器内部错误"}
+
+
+def format_sse(event: str, data: Any) -> str:
+    text = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    lines = "".join(f"data: {line}\n" for line in text.split("\n"))
+    return f"event: {event}\n{lines}\n"
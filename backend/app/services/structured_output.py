@@ -0,0 +1,118 @@
+"""
+结构化输出（response_format）与按模型的 JSON 解析失败率统计。
+
+说明：
+- JSON Schema 由 `ReportData.model_json_schema()` 生成，并转换为 OpenAI strict 模式可接受的形式
+  （oneOf→anyOf、去掉 discriminator/title、对象补 additionalProperties=false）。
+- 能力表来自 Settings：`upstream_structured_output`（模型 → json_schema / json_object / none），
+  未配置的模型取 `upstream_structured_output_default`；不支持的模型仅依靠提示词中的 JSON 规则。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.domain.report_schema import ReportData
+
+MODE_JSON_SCHEMA = "json_schema"
+MODE_JSON_OBJECT = "json_object"
+MODE_NONE = "none"
+_MODES = {MODE_JSON_SCHEMA, MODE_JSON_OBJECT, MODE_NONE}
+
+_DROPPED_KEYS = {"title", "discriminator", "default"}
+
+
+def _to_strict(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_to_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    out: dict[str, Any] = {}
+    for key, value in node.items():
+        if key in _DROPPED_KEYS:
+            continue
+        if key == "oneOf":
+            key = "anyOf"
+        if key == "const":
+            out["enum"] = [value]
+            continue
+        if key in {"properties", "$defs"}:
+            out[key] = {name: _to_strict(sub) for name, sub in value.items()}
+            continue
+        out[key] = _to_strict(value)
+    if out.get("type") == "object":
+        out["additionalProperties"] = False
+        out["required"] = list((out.get("properties") or {}).keys())
+    return out
+
+
+def strict_json_schema(model: type[BaseModel]) -> dict[str, Any]:
+    return _to_strict(model.model_json_schema())
+
+
+@lru_cache(maxsize=None)
+def _report_schema() -> dict[str, Any]:
+    return strict_json_schema(ReportData)
+
+
+def structured_output_mode(settings: Any, model: str) -> str:
+    table = getattr(settings, "upstream_structured_output", None) or {}
+    mode = str(table.get(model) or getattr(settings, "upstream_structured_output_default", MODE_NONE) or MODE_NONE)
+    mode = mode.strip().lower()
+    return mode if mode in _MODES else MODE_NONE
+
+
+def report_response_format(settings: Any, model: str) -> dict[str, Any] | None:
+    """按模型能力返回 ReportData 的 response_format；不支持时返回 None。"""
+    mode = structured_output_mode(settings, model)
+    if mode == MODE_JSON_SCHEMA:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "report_data", "strict": True, "schema": _report_schema()},
+        }
+    if mode == MODE_JSON_OBJECT:
+        return {"type": "json_object"}
+    return None
+
+
+@dataclass
+class _ModelParseStats:
+    mode: str = MODE_NONE
+    responses: int = 0
+    parse_failures: int = 0
+
+
+class ParseFailureTracker:
+    """按模型统计模型输出直接 `json.loads` 失败（需要修复）的比例。"""
+
+    def __init__(self) -> None:
+        self._models: dict[str, _ModelParseStats] = {}
+
+    def record(self, model: str, *, mode: str, failed: bool) -> None:
+        stats = self._models.setdefault(model, _ModelParseStats())
+        stats.mode = mode
+        stats.responses += 1
+        if failed:
+            stats.parse_failures += 1
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            model: {
+                "mode": s.mode,
+                "responses": s.responses,
+                "parse_failures": s.parse_failures,
+                "failure_rate": round(s.parse_failures / s.responses, 4) if s.responses else 0.0,
+            }
+            for model, s in self._models.items()
+        }
+
+
+_TRACKER = ParseFailureTracker()
+
+
+def get_parse_failure_tracker() -> ParseFailureTracker:
+    return _TRACKER
@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
-import base64
 from pathlib import Path
 from typing import Any
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+from app.services.font_assets import SUBSET_FLAVOR, FontAssets
+
 
 MODULE_THEMES: dict[str, dict[str, str]] = {
     "brand": {"name": "品牌定位分析", "color": "#3b82f6", "dark": "#1e3a8a", "tint": "#eff6ff"},
@@ -17,22 +18,27 @@ MODULE_THEMES: dict[str, dict[str, str]] = {
 }
 
 
-def _read_base64(path: Path) -> str | None:
-    if not path.exists():
-        return None
-    return base64.b64encode(path.read_bytes()).decode("ascii")
+# 先以占位符渲染，再按整页字符计算子集 key 替换
+_SUBSET_KEY_PLACEHOLDER = "__font_subset_key__"
 
 
 class ReportTemplateRenderer:
-    def __init__(self, templates_dir: Path, fonts_dir: Path):
+    def __init__(
+        self,
+        templates_dir: Path,
+        fonts_dir: Path,
+        *,
+        font_subsets: bool = False,
+        font_assets: FontAssets | None = None,
+    ):
         self._env = Environment(
             loader=FileSystemLoader(str(templates_dir)),
             autoescape=select_autoescape(["html", "xml"]),
         )
         self._template = self._env.get_template("report.html.j2")
 
-        self._font_regular = _read_base64(fonts_dir / "NotoSansSC-Regular.otf")
-        self._font_bold = _read_base64(fonts_dir / "NotoSansSC-Bold.otf")
+        self.font_assets = font_assets or FontAssets(fonts_dir)
+        self.font_subsets = font_subsets
 
     def render(
         self,
@@ -44,7 +50,11 @@ class ReportTemplateRenderer:
         screenshot_data_url: str | None,
         content_html: str,
         raw_markdown: str,
+        asset_base_url: str = "",
+        subset_fonts: bool = True,
     ) -> str:
+        """渲染完整 HTML；字体以 `asset_base_url` 开头的绝对 URL 引用（为空时为站内路径），仅转 PDF 时传 subset_fonts=False。"""
+        subset = self.font_subsets and subset_fonts
         theme = MODULE_THEMES.get(module) or {"name": module, "color": "#3b82f6", "dark": "#1e3a8a", "tint": "#eff6ff"}
         ctx: dict[str, Any] = {
             "module": module,
@@ -58,7 +68,12 @@ class ReportTemplateRenderer:
             "screenshot_data_url": screenshot_data_url,
             "content_html": content_html,
             "raw_markdown": raw_markdown,
-            "font_regular": self._font_regular,
-            "font_bold": self._font_bold or self._font_regular,
+            "font_faces": self.font_assets.faces(
+                subset_key=_SUBSET_KEY_PLACEHOLDER if subset else None, base_url=asset_base_url
+            ),
+            "subset_format": SUBSET_FLAVOR,
         }
-        return self._template.render(**ctx)
+        html = self._template.render(**ctx)
+        if subset and self.font_assets.files:
+            html = html.replace(_SUBSET_KEY_PLACEHOLDER, self.font_assets.register_subset(html))
+        return html
@@ -0,0 +1,192 @@
+"""
+本地 token 估算（中英混排）与 max_tokens 规划。
+
+说明：
+- 不依赖分词器：汉字/全角标点按 1 token/字，英文单词约 4 字符/token，数字约 3 字符/token，
+  其余符号 1 token/个；对 Gemini / GPT-4o 系列的中英混合提示词略偏保守（宁多勿少）。
+- 按模块记录历史输出规模，取分位数 × 余量作为 max_tokens，避免一律请求 16384。
+- 请求接近模型上下文窗口时先压缩 max_tokens，仍不够再截断用户提示词尾部。
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from app.settings import get_settings
+
+if TYPE_CHECKING:
+    from app.services.upstream_llm import ChatResult
+
+IMAGE_TOKENS = 1100
+MESSAGE_OVERHEAD_TOKENS = 4
+SAFETY_MARGIN_TOKENS = 256
+TRIM_MARKER = "\n（以下内容过长已省略）"
+
+_TOKEN_RE = re.compile(
+    r"(?P<cjk>[　-〿㐀-䶿一-鿿豈-﫿＀-￯])"
+    r"|(?P<word>[A-Za-z]+)"
+    r"|(?P<digits>\d+)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>.)",
+    re.S,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    total = 0
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "cjk" or kind == "other":
+            total += 1
+        elif kind == "word":
+            total += math.ceil(len(match.group()) / 4)
+        elif kind == "digits":
+            total += math.ceil(len(match.group()) / 3)
+    return total
+
+
+def estimate_messages_tokens(messages: list[dict[str, Any]]) -> int:
+    total = 0
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content")
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += estimate_tokens(part.get("text") or "")
+                elif part.get("type") == "image_url":
+                    total += IMAGE_TOKENS
+    return total
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """保留开头，截断到约 max_tokens 个 token（含截断提示）。"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max(0, max_tokens - estimate_tokens(TRIM_MARKER))
+    used = 0
+    end = 0
+    for match in _TOKEN_RE.finditer(text):
+        piece = estimate_tokens(match.group())
+        if used + piece > budget:
+            break
+        used += piece
+        end = match.end()
+    return text[:end] + TRIM_MARKER
+
+
+def repair_max_tokens(text: str, *, ceiling: int) -> int:
+    """修复类请求的输出规模与输入相当：估算值 × 1.2 + 512，不超过 ceiling。"""
+    return max(1, min(ceiling, math.ceil(estimate_tokens(text) * 1.2) + 512))
+
+
+class OutputSizeTracker:
+    """按用途（模块）记录最近若干次输出的 token 数。"""
+
+    def __init__(self, window: int = 50):
+        self._window = max(1, window)
+        self._samples: dict[str, deque[int]] = {}
+
+    def record(self, key: str, tokens: int) -> None:
+        self._samples.setdefault(key, deque(maxlen=self._window)).append(max(0, int(tokens)))
+
+    def record_completion(self, key: str, result: ChatResult, tokens: int) -> None:
+        """只记录新鲜且完整的输出：命中缓存、因长度截断或经过续写的结果会压偏估计，不计入。"""
+        if result.cached or result.truncated or result.continuations:
+            return
+        self.record(key, tokens)
+
+    def percentile(self, key: str, p: float) -> int | None:
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+        return ordered[idx]
+
+    def count(self, key: str) -> int:
+        return len(self._samples.get(key) or ())
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            key: {"samples": len(values), "p95": self.percentile(key, 0.95)}
+            for key, values in self._samples.items()
+        }
+
+
+@dataclass(frozen=True)
+class RequestPlan:
+    user_prompt: str
+    max_tokens: int
+    prompt_tokens: int
+    context_window: int
+    trimmed: bool
+
+
+def context_window_for(settings: Any, model: str) -> int:
+    windows = getattr(settings, "upstream_context_windows", {}) or {}
+    return int(windows.get(model) or getattr(settings, "upstream_context_window_default", 128000))
+
+
+def plan_request(
+    *,
+    usage_key: str,
+    model: str,
+    system: str,
+    user_prompt: str,
+    has_image: bool = False,
+    default_max_tokens: int | None = None,
+    settings: Any = None,
+    tracker: OutputSizeTracker | None = None,
+) -> RequestPlan:
+    settings = settings or get_settings()
+    tracker = tracker or get_output_tracker()
+    floor = int(getattr(settings, "upstream_max_tokens_floor", 2048))
+    ceiling = int(default_max_tokens or getattr(settings, "upstream_max_tokens_ceiling", 16384))
+    headroom = float(getattr(settings, "upstream_max_tokens_headroom", 1.3))
+    min_samples = int(getattr(settings, "upstream_max_tokens_min_samples", 5))
+
+    desired = ceiling
+    if tracker.count(usage_key) >= min_samples:
+        observed = tracker.percentile(usage_key, 0.95) or 0
+        desired = min(ceiling, max(floor, math.ceil(observed * headroom / 512) * 512))
+
+    window = context_window_for(settings, model)
+    image_tokens = IMAGE_TOKENS if has_image else 0
+    fixed = estimate_tokens(system) + image_tokens + 2 * MESSAGE_OVERHEAD_TOKENS + SAFETY_MARGIN_TOKENS
+    prompt_tokens = fixed + estimate_tokens(user_prompt)
+
+    trimmed = False
+    available = window - prompt_tokens
+    if available < floor:
+        user_prompt = trim_to_tokens(user_prompt, max(0, window - fixed - floor))
+        prompt_tokens = fixed + estimate_tokens(user_prompt)
+        available = window - prompt_tokens
+        trimmed = True
+
+    max_tokens = max(1, min(desired, available))
+    return RequestPlan(
+        user_prompt=user_prompt,
+        max_tokens=max_tokens,
+        prompt_tokens=prompt_tokens,
+        context_window=window,
+        trimmed=trimmed,
+    )
+
+
+_TRACKER: OutputSizeTracker | None = None
+
+
+def get_output_tracker() -> OutputSizeTracker:
+    global _TRACKER
+    if _TRACKER is None:
+        _TRACKER = OutputSizeTracker()
+    return _TRACKER
@@ -7,12 +7,18 @@
 
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
 import httpx
 
+from app.services.body_encoder import InlineImage, JsonBodyStream
+from app.services.json_codec import loads
+from app.services.llm_cache import LLMCache, cache_key
+
+if TYPE_CHECKING:
+    from app.services.admission import AdmissionController
+
 
 @dataclass(frozen=True)
 class UpstreamConfig:
@@ -26,7 +32,7 @@ class UpstreamError(RuntimeError):
     pass
 
 
-def build_messages(*, system: str, user_prompt: str, image_data_url: str | None) -> list[dict[str, Any]]:
+def build_messages(*, system: str, user_prompt: str, image_data_url: str | InlineImage | None) -> list[dict[str, Any]]:
     messages: list[dict[str, Any]] = [{"role": "system", "content": system}]
 
     if image_data_url:
@@ -61,33 +67,99 @@ def normalize_markdown(text: str) -> str:
     return s.strip()
 
 
-async def chat_completions(
-    client: httpx.AsyncClient,
+def _build_body(
     *,
     cfg: UpstreamConfig,
     system: str,
     user_prompt: str,
-    temperature: float = 0.8,
-    max_tokens: int = 16384,
-    image_data_url: str | None = None,
-) -> str:
-    if not cfg.api_key:
-        raise UpstreamError("未配置UPSTREAM_API_KEY，无法调用上游接口")
-
+    temperature: float,
+    max_tokens: int,
+    image_data_url: str | InlineImage | None,
+    stream: bool,
+    response_format: dict[str, Any] | None = None,
+) -> dict[str, Any]:
     messages = build_messages(system=system, user_prompt=user_prompt, image_data_url=image_data_url)
-    body = {
+    body: dict[str, Any] = {
         "model": cfg.model,
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
-        "stream": False,
+        "stream": stream,
+    }
+    if response_format is not None:
+        body["response_format"] = response_format
+    return body
+
+
+def _build_headers(cfg: UpstreamConfig, content: JsonBodyStream) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {cfg.api_key}",
+        "Content-Type": "application/json",
+        "Content-Length": str(content.content_length),
     }
 
+
+CONTINUE_PROMPT = "你的上一条回复因长度限制被截断。请从截断处继续输出剩余内容，不要重复已输出的部分，不要添加任何说明。"
+
+
+@dataclass
+class ChatResult:
+    """一次（可能含续写的）上游调用结果；content 为原始文本（未清洗）。"""
+
+    content: str = ""
+    finish_reason: str | None = None
+    usage: dict[str, Any] | None = None
+    message: dict[str, Any] | None = None
+    continuations: int = 0
+    cached: bool = False
+    model: str = ""
+
+    @property
+    def truncated(self) -> bool:
+        return self.finish_reason == "length"
+
+
+def _add_usage(a: dict[str, Any] | None, b: dict[str, Any] | None) -> dict[str, Any] | None:
+    if not a or not b:
+        return a or b
+    merged = dict(a)
+    for k, v in b.items():
+        if isinstance(v, int) and isinstance(merged.get(k, 0), int):
+            merged[k] = merged.get(k, 0) + v
+    return merged
+
+
+def _continuation_body(body: dict[str, Any], partial: str) -> dict[str, Any]:
+    messages = list(body["messages"]) + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUE_PROMPT},
+    ]
+    # 续写内容只是片段，不能再按完整 JSON Schema 约束
+    out = {k: v for k, v in body.items() if k != "response_format"}
+    out["messages"] = messages
+    return out
+
+
+def stitch_continuation(previous: str, continuation: str, *, max_overlap: int = 200, min_overlap: int = 8) -> str:
+    """拼接续写内容：去掉续写自带的代码块标记，并去除与前文末尾重复的部分。"""
+    nxt = continuation
+    if nxt.lstrip().startswith("```"):
+        nxt = nxt.lstrip().split("\n", 1)[1] if "\n" in nxt.lstrip() else ""
+        if nxt.rstrip().endswith("```") and not previous.lstrip().startswith("```"):
+            nxt = nxt.rstrip()[:-3]
+    for k in range(min(len(previous), len(nxt), max_overlap), min_overlap - 1, -1):
+        if previous.endswith(nxt[:k]):
+            return previous + nxt[k:]
+    return previous + nxt
+
+
+async def _post_chat(client: httpx.AsyncClient, cfg: UpstreamConfig, body: dict[str, Any]) -> ChatResult:
     try:
+        content = JsonBodyStream(body)
         res = await client.post(
             cfg.base_url,
-            headers={"Authorization": f"Bearer {cfg.api_key}", "Content-Type": "application/json"},
-            content=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers=_build_headers(cfg, content),
+            content=content,
             timeout=cfg.timeout_seconds,
         )
     except httpx.TimeoutException as e:
@@ -100,14 +172,271 @@ async def chat_completions(
         raise UpstreamError(f"上游接口返回错误: {res.status_code} {detail}")
 
     try:
-        data = res.json()
+        data = loads(res.content)
     except ValueError as e:
         raise UpstreamError("上游接口返回非JSON") from e
 
     try:
-        content = data["choices"][0]["message"]["content"]
+        choice = data["choices"][0]
+        message = choice["message"]
+        content = message["content"]
     except Exception as e:  # noqa: BLE001 - 需要兼容上游差异
         raise UpstreamError("上游接口返回格式异常（缺少choices/message/content）") from e
 
-    return normalize_markdown(content)
+    return ChatResult(
+        content=content if isinstance(content, str) else "",
+        finish_reason=choice.get("finish_reason"),
+        usage=data.get("usage") if isinstance(data.get("usage"), dict) else None,
+        message=message,
+        model=cfg.model,
+    )
+
+
+async def chat_completion_result(
+    client: httpx.AsyncClient,
+    *,
+    cfg: UpstreamConfig,
+    system: str,
+    user_prompt: str,
+    temperature: float = 0.8,
+    max_tokens: int = 16384,
+    image_data_url: str | InlineImage | None = None,
+    cache: LLMCache | None = None,
+    bypass_cache: bool = False,
+    admission: AdmissionController | None = None,
+    max_continuations: int = 0,
+    response_format: dict[str, Any] | None = None,
+) -> ChatResult:
+    """非流式调用；输出因 max_tokens 截断（finish_reason=length）时最多续写 max_continuations 次并拼接。"""
+    if not cfg.api_key:
+        raise UpstreamError("未配置UPSTREAM_API_KEY，无法调用上游接口")
+
+    body = _build_body(
+        cfg=cfg,
+        system=system,
+        user_prompt=user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        image_data_url=image_data_url,
+        stream=False,
+        response_format=response_format,
+    )
+    key = cache_key(body) if cache is not None else None
+    if key and not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return ChatResult(content=cached, finish_reason="stop", cached=True, model=cfg.model)
+    if admission is not None:
+        await admission.admit(body)
+    result = await _post_chat(client, cfg, body)
+
+    while result.truncated and result.continuations < max_continuations:
+        cont_body = _continuation_body(body, result.content)
+        if admission is not None:
+            await admission.admit(cont_body)
+        nxt = await _post_chat(client, cfg, cont_body)
+        result = ChatResult(
+            content=stitch_continuation(result.content, nxt.content),
+            finish_reason=nxt.finish_reason,
+            usage=_add_usage(result.usage, nxt.usage),
+            message=nxt.message,
+            continuations=result.continuations + 1,
+            model=cfg.model,
+        )
+
+    # 截断的输出不缓存，避免后续请求反复拿到不完整结果
+    if key and result.content.strip() and not result.truncated:
+        cache.set(key, result.content)
+    return result
+
+
+async def chat_completions(
+    client: httpx.AsyncClient,
+    *,
+    cfg: UpstreamConfig,
+    system: str,
+    user_prompt: str,
+    temperature: float = 0.8,
+    max_tokens: int = 16384,
+    image_data_url: str | InlineImage | None = None,
+    cache: LLMCache | None = None,
+    bypass_cache: bool = False,
+    admission: AdmissionController | None = None,
+    max_continuations: int = 0,
+    response_format: dict[str, Any] | None = None,
+    result: ChatResult | None = None,
+) -> str:
+    """返回清洗后的文本；传入 result 时同时填充调用结果（是否命中缓存、续写次数等）。"""
+    full = await chat_completion_result(
+        client,
+        cfg=cfg,
+        system=system,
+        user_prompt=user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        image_data_url=image_data_url,
+        cache=cache,
+        bypass_cache=bypass_cache,
+        admission=admission,
+        max_continuations=max_continuations,
+        response_format=response_format,
+    )
+    if result is not None:
+        for f in fields(ChatResult):
+            setattr(result, f.name, getattr(full, f.name))
+    return normalize_markdown(full.content)
+
+
+@dataclass
+class SSEChunk:
+    text: str = ""
+    finish_reason: str | None = None
+    usage: dict[str, Any] | None = None
+
+
+def parse_sse_chunk(line: str) -> SSEChunk | None:
+    """解析一行 SSE：`[DONE]` 返回 None，非数据行返回空块。"""
+    s = line.strip()
+    if not s.startswith("data:"):
+        return SSEChunk()
+    payload = s[5:].strip()
+    if payload == "[DONE]":
+        return None
+    try:
+        data = loads(payload)
+    except ValueError as e:
+        raise UpstreamError("上游流式返回非JSON") from e
+    if isinstance(data, dict) and data.get("error"):
+        raise UpstreamError(f"上游流式返回错误: {str(data['error'])[:500]}")
+    usage = data.get("usage") if isinstance(data, dict) and isinstance(data.get("usage"), dict) else None
+    try:
+        choice = data["choices"][0]
+        delta = choice.get("delta") or {}
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return SSEChunk(usage=usage)
+    return SSEChunk(text=delta.get("content") or "", finish_reason=choice.get("finish_reason"), usage=usage)
+
+
+def parse_sse_delta(line: str) -> str | None:
+    """解析一行 SSE：返回增量文本；`[DONE]` 返回 None，非数据行返回空串。"""
+    chunk = parse_sse_chunk(line)
+    return None if chunk is None else chunk.text
+
+
+async def _stream_once(
+    client: httpx.AsyncClient, cfg: UpstreamConfig, body: dict[str, Any], result: ChatResult
+) -> AsyncIterator[str]:
+    """发送一次流式请求并产出增量；结束后 result 记录 finish_reason/usage，未见 `[DONE]` 时 finish_reason 为 None。"""
+    content = JsonBodyStream(body)
+    headers = _build_headers(cfg, content)
+    headers["Accept"] = "text/event-stream"
+    result.finish_reason = None
+    try:
+        async with client.stream(
+            "POST",
+            cfg.base_url,
+            headers=headers,
+            content=content,
+            timeout=cfg.timeout_seconds,
+        ) as res:
+            if res.status_code >= 400:
+                detail = (await res.aread()).decode("utf-8", errors="replace")[:500]
+                raise UpstreamError(f"上游接口返回错误: {res.status_code} {detail}")
+            finish_reason = None
+            usage = None
+            async for line in res.aiter_lines():
+                chunk = parse_sse_chunk(line)
+                if chunk is None:
+                    result.finish_reason = finish_reason or "stop"
+                    break
+                finish_reason = chunk.finish_reason or finish_reason
+                usage = chunk.usage or usage
+                if chunk.text:
+                    yield chunk.text
+            result.usage = _add_usage(result.usage, usage)
+    except httpx.TimeoutException as e:
+        raise UpstreamError("上游接口请求超时") from e
+    except httpx.HTTPError as e:
+        raise UpstreamError(f"上游接口网络错误: {e}") from e
+
+
+async def stream_chat_completions(
+    client: httpx.AsyncClient,
+    *,
+    cfg: UpstreamConfig,
+    system: str,
+    user_prompt: str,
+    temperature: float = 0.8,
+    max_tokens: int = 16384,
+    image_data_url: str | InlineImage | None = None,
+    cache: LLMCache | None = None,
+    bypass_cache: bool = False,
+    admission: AdmissionController | None = None,
+    max_continuations: int = 0,
+    result: ChatResult | None = None,
+    response_format: dict[str, Any] | None = None,
+) -> AsyncIterator[str]:
+    """
+    流式调用上游（SSE），逐段产出模型增量文本（未做清洗）；命中缓存时一次性产出。
+
+    输出因 max_tokens 截断时最多续写 max_continuations 次，续写内容去重后继续产出；
+    传入 result 时结束后填充 finish_reason/usage/续写次数与完整文本。
+    """
+    if not cfg.api_key:
+        raise UpstreamError("未配置UPSTREAM_API_KEY，无法调用上游接口")
+    result = result if result is not None else ChatResult()
+    result.model = cfg.model
+
+    body = _build_body(
+        cfg=cfg,
+        system=system,
+        user_prompt=user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        image_data_url=image_data_url,
+        stream=True,
+        response_format=response_format,
+    )
+    key = cache_key(body) if cache is not None else None
+    if key and not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            result.content, result.finish_reason, result.cached = cached, "stop", True
+            yield cached
+            return
+    if admission is not None:
+        await admission.admit(body)
+
+    parts: list[str] = []
+    async for delta in _stream_once(client, cfg, body, result):
+        parts.append(delta)
+        yield delta
+
+    while result.truncated and result.continuations < max_continuations:
+        previous = "".join(parts)
+        cont_body = _continuation_body(body, previous)
+        if admission is not None:
+            await admission.admit(cont_body)
+        result.continuations += 1
+        # 先缓冲续写开头，去掉与前文重复的部分后再产出
+        head: list[str] = []
+        flushed = False
+        async for delta in _stream_once(client, cfg, cont_body, result):
+            if flushed:
+                parts.append(delta)
+                yield delta
+                continue
+            head.append(delta)
+            if sum(len(h) for h in head) >= 256:
+                flushed = True
+                text = stitch_continuation(previous, "".join(head))[len(previous) :]
+                parts.append(text)
+                yield text
+        if not flushed and head:
+            text = stitch_continuation(previous, "".join(head))[len(previous) :]
+            parts.append(text)
+            yield text
 
+    result.content = "".join(parts)
+    if key and result.finish_reason is not None and not result.truncated and result.content:
+        cache.set(key, result.content)
@@ -18,6 +18,65 @@ class Settings(BaseSettings):
     upstream_model_store_activity: str = ""
     upstream_model_data_statistics: str = ""
 
+    upstream_hedge_base_url: str = ""
+    upstream_hedge_api_key: str = ""
+    upstream_hedge_model_default: str = ""
+    upstream_hedge_model_brand: str = ""
+    upstream_hedge_model_market: str = ""
+    upstream_hedge_model_store_activity: str = ""
+    upstream_hedge_model_data_statistics: str = ""
+    upstream_hedge_enabled: bool = True
+    upstream_hedge_percentile: float = 0.95
+    upstream_hedge_min_samples: int = 20
+    upstream_hedge_delay_seconds: float = 45.0
+
+    upstream_rpm_limit: int = 0
+    upstream_tpm_limit: int = 0
+    upstream_rate_limits: dict[str, dict[str, int]] = {}
+    upstream_admission_queue_size: int = 64
+    upstream_request_deadline_seconds: float = 240.0
+
+    upstream_context_window_default: int = 128000
+    upstream_context_windows: dict[str, int] = {}
+    upstream_max_tokens_floor: int = 2048
+    upstream_max_tokens_ceiling: int = 16384
+    upstream_max_tokens_headroom: float = 1.3
+    upstream_max_tokens_min_samples: int = 5
+    upstream_max_continuations: int = 2
+    upstream_structured_output_default: str = "none"
+    upstream_structured_output: dict[str, str] = {}
+
+    report_generation_mode: str = "single"
+    outline_section_concurrency: int = 4
+    outline_section_retries: int = 1
+
+    upstream_http2: bool = True
+    upstream_max_connections: int = 100
+    upstream_max_keepalive_connections: int = 20
+    upstream_max_connections_per_host: int = 20
+    upstream_keepalive_expiry_seconds: float = 30.0
+
+    render_workers: int = 0
+    render_max_tasks_per_worker: int = 200
+    pdf_spool_max_memory_bytes: int = 1_048_576
+    pdf_stream_chunk_bytes: int = 65_536
+    preview_font_subsets: bool = False
+    public_base_url: str = ""
+    preview_font_subset_cache_size: int = 32
+
+    job_workers: int = 2
+    job_queue_size: int = 32
+    job_store_sqlite_path: str = ""
+    job_ttl_seconds: int = 86400
+    job_result_dir: str = ""
+
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 256
+    llm_cache_ttl_seconds: int = 3600
+    llm_cache_sqlite_path: str = ""
+    llm_cache_sqlite_max_entries: int = 2000
+    llm_cache_sqlite_ttl_seconds: int = 86400
+
     report_ttl_seconds: int = 86400
     cors_allow_origins: str = "*"
     max_upload_mb: int = 10
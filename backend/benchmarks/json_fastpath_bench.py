@@ -0,0 +1,90 @@
+"""
+报告 JSON 解析基准：旧路径（json 解析外层响应 → json.loads 正文 → model_validate(dict)）
+对比快速路径（json_codec 解析外层响应 → model_validate_json 直接校验正文文本）。
+
+用法（在 backend 目录）：
+    python benchmarks/json_fastpath_bench.py --sizes 30 50 80 --repeat 50
+
+说明：
+- 正文为模拟上游的固定报告（按目标大小增加章节数），外层为 OpenAI 兼容的 chat.completion 响应；
+- 输出每种大小下两条路径的单次耗时（取最优值，毫秒）与加速比。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.domain.report_schema import ReportData  # noqa: E402
+from app.mock_upstream import canned_report  # noqa: E402
+from app.services import json_codec  # noqa: E402
+from app.services.json_parser import extract_json_text  # noqa: E402
+
+
+def _envelope(target_kb: int) -> tuple[bytes, int]:
+    sections = 1
+    while True:
+        content = json.dumps(canned_report("data-statistics", sections=sections), ensure_ascii=False, indent=2)
+        if len(content.encode("utf-8")) >= target_kb * 1024:
+            break
+        sections += 1
+    body = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1200, "completion_tokens": 9000, "total_tokens": 10200},
+    }
+    return json.dumps(body, ensure_ascii=False).encode("utf-8"), len(content.encode("utf-8"))
+
+
+def _legacy(raw: bytes) -> ReportData:
+    content = json.loads(raw)["choices"][0]["message"]["content"]
+    return ReportData.model_validate(json.loads(extract_json_text(content)))
+
+
+def _fast(raw: bytes) -> ReportData:
+    content = json_codec.loads(raw)["choices"][0]["message"]["content"]
+    return ReportData.model_validate_json(extract_json_text(content))
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 50, 80], help="正文大小（KB）")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        raw, content_bytes = _envelope(size)
+        assert _legacy(raw) == _fast(raw)
+        legacy = _best(lambda: _legacy(raw), args.repeat)
+        fast = _best(lambda: _fast(raw), args.repeat)
+        results.append(
+            {
+                "content_kb": round(content_bytes / 1024, 1),
+                "legacy_ms": round(legacy * 1000, 3),
+                "fast_ms": round(fast * 1000, 3),
+                "speedup": round(legacy / fast, 2) if fast > 0 else None,
+            }
+        )
+    print(json.dumps({"json_backend": json_codec.BACKEND, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
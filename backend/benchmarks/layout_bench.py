@@ -0,0 +1,112 @@
+"""
+ReportLab 排版基准：对比默认断行、`wordWrap="CJK"` 逐字测宽与字宽表快速路径。
+
+用法（在 backend 目录）：
+    python benchmarks/layout_bench.py --sections 6 --paragraphs 8 --rows 40 --repeat 5
+
+说明：
+- 生成以中文为主的合成报告：每章若干长段落 + 一张多行表格（单元格含长句）；
+- legacy 为原先的默认断行（无空格中文按超长单词逐字拆分）且不使用字宽表；
+- cjk 为 CJK 断行但逐字调用字体测宽；cjk_table 为当前实现（字宽表 + 整段断行）；
+- 输出整份 PDF 的构建耗时（取最优值）与生成的 PDF 页数。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.domain.report_schema import ReportData  # noqa: E402
+from app.services.reportlab.glyph_widths import install_width_table, uninstall_width_table  # noqa: E402
+from app.services.reportlab.pdf_builder import build_pdf_bytes  # noqa: E402
+from app.services.reportlab.theme import GLYPH_CACHE_DIR, get_fonts, get_theme_styles  # noqa: E402
+
+CJK = "外卖店铺曝光转化复购品牌定位商圈调研活动方案数据统计分析用户画像客单价满减优惠配送时效评分提升午晚高峰"
+MODULE = "data-statistics"
+
+
+def synthetic_report(*, sections: int, paragraphs: int, rows: int, seed: int = 7) -> dict[str, Any]:
+    rnd = random.Random(seed)
+
+    def sentence(n: int) -> str:
+        return "".join(rnd.choice(CJK) for _ in range(n)) + "。"
+
+    out = []
+    for s in range(sections):
+        blocks: list[dict[str, Any]] = [
+            {"type": "paragraph", "text": "".join(sentence(rnd.randint(20, 40)) for _ in range(6))}
+            for _ in range(paragraphs)
+        ]
+        blocks.append(
+            {
+                "type": "table",
+                "headers": ["指标", "现状", "目标", "说明"],
+                "rows": [[sentence(4), f"{rnd.randint(1, 99)}%", sentence(6), sentence(40)] for _ in range(rows)],
+            }
+        )
+        out.append({"title": f"经营分析{s + 1}", "summary": sentence(8), "blocks": blocks})
+    return {
+        "cover": {
+            "store_name": "示例店",
+            "report_title": "数据统计分析报告",
+            "report_subtitle": "排版基准",
+            "business_line": "外卖",
+            "period_text": "2026年01月",
+            "plan_date": "2026-01-31",
+        },
+        "sections": out,
+    }
+
+
+def _configure(*, word_wrap: str | None, tables: bool) -> None:
+    for style in get_theme_styles(MODULE).styles.values():
+        style.wordWrap = word_wrap
+    for name in set(get_fonts()):
+        if tables:
+            install_width_table(name, GLYPH_CACHE_DIR)
+        else:
+            uninstall_width_table(name)
+
+
+def _time(report: ReportData, repeat: int) -> tuple[float, int]:
+    best, pdf = float("inf"), b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pdf = build_pdf_bytes(report, module=MODULE)
+        best = min(best, time.perf_counter() - started)
+    return best, len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--paragraphs", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    report = ReportData.model_validate(
+        synthetic_report(sections=args.sections, paragraphs=args.paragraphs, rows=args.rows)
+    )
+    results: dict[str, Any] = {"fonts": sorted(set(get_fonts()))}
+    for name, word_wrap, tables in (("legacy", None, False), ("cjk", "CJK", False), ("cjk_table", "CJK", True)):
+        _configure(word_wrap=word_wrap, tables=tables)
+        build_pdf_bytes(report, module=MODULE)
+        seconds, pages = _time(report, args.repeat)
+        results[f"{name}_ms"] = round(seconds * 1000, 1)
+        results[f"{name}_pages"] = pages
+    results["speedup_vs_legacy"] = round(results["legacy_ms"] / results["cjk_table_ms"], 2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+离线压测：启动本地模拟上游，并发驱动报告生成服务或路由，输出吞吐与延迟分位数。
+
+用法（在 backend 目录）：
+    python benchmarks/load_test.py --target service --requests 200 --concurrency 20
+    python benchmarks/load_test.py --target pdf --module market --latency-ms 1500 --tps 300
+    python benchmarks/load_test.py --target markdown --upstream-url http://127.0.0.1:9000/v1/chat/completions
+
+说明：
+- 未指定 `--upstream-url` 时在本进程后台线程中用 uvicorn 启动 `app.mock_upstream`（仅监听 127.0.0.1）。
+- target：service = 直接调用 `report_service.generate_pdf_bytes`；pdf = `/api/generate`；markdown = `/api/reports/generate`。
+- 默认每个请求的表单各不相同且跳过缓存读取，避免被响应缓存/请求合并“加速”；`--identical` 可观察合并效果。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = BACKEND_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="离线压测（模拟上游）")
+    parser.add_argument("--target", choices=["service", "pdf", "markdown"], default="service")
+    parser.add_argument("--module", default="brand", choices=["brand", "market", "store-activity", "data-statistics"])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", choices=["single", "outline"], default=None, help="PDF 生成模式（默认取 REPORT_GENERATION_MODE）")
+    parser.add_argument("--identical", action="store_true", help="所有请求使用相同表单且允许命中缓存")
+    parser.add_argument("--upstream-url", default="", help="使用已启动的模拟上游/真实上游地址")
+    parser.add_argument("--latency-ms", type=float, default=None, help="模拟上游首字节延迟中位数")
+    parser.add_argument("--tps", type=float, default=None, help="模拟上游每秒输出 token 数")
+    parser.add_argument("--error-rate", type=float, default=None)
+    parser.add_argument("--rate-limit-rate", type=float, default=None)
+    parser.add_argument("--truncate-rate", type=float, default=None)
+    return parser.parse_args(argv)
+
+
+def _start_mock_upstream(args: argparse.Namespace) -> tuple[str, Any]:
+    import uvicorn
+
+    from app.mock_upstream import MockUpstreamSettings, create_mock_app
+
+    overrides = {
+        "latency_ms": args.latency_ms,
+        "tokens_per_second": args.tps,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "truncate_rate": args.truncate_rate,
+    }
+    settings = MockUpstreamSettings(**{k: v for k, v in overrides.items() if v is not None})
+    app = create_mock_app(settings)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("模拟上游启动失败")
+        time.sleep(0.02)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1/chat/completions", app.state.mock
+
+
+def _payload(module: str, idx: int, identical: bool) -> dict[str, Any]:
+    suffix = "" if identical else f"-{idx}"
+    return {
+        "storeName": f"压测门店{suffix}",
+        "category": "快餐简餐",
+        "address": "上海市徐汇区漕河泾",
+        "location": "上海市徐汇区漕河泾",
+        "areaType": "写字楼",
+    }
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+    return ordered[idx]
+
+
+async def _run(args: argparse.Namespace) -> dict[str, Any]:
+    import httpx
+
+    from app.services.http_client import close_upstream_pool
+
+    if args.target == "service":
+        from app.services.report_service import generate_pdf_bytes
+
+        async def call(idx: int) -> str:
+            await generate_pdf_bytes(
+                module=args.module,
+                payload=_payload(args.module, idx, args.identical),
+                bypass_cache=not args.identical,
+            )
+            return "ok"
+
+        client = None
+    else:
+        if args.target == "pdf":
+            sys.path.insert(0, str(PROJECT_ROOT))
+            from api.index import app
+
+            path = "/api/generate"
+        else:
+            from app.main import create_app
+
+            app = create_app()
+            path = "/api/reports/generate"
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=None)
+
+        async def call(idx: int) -> str:
+            res = await client.post(
+                path,
+                data={
+                    "module": args.module,
+                    "payload_json": json.dumps(_payload(args.module, idx, args.identical), ensure_ascii=False),
+                    "no_cache": "false" if args.identical else "true",
+                },
+            )
+            return "ok" if res.status_code < 400 else f"http_{res.status_code}"
+
+    latencies: list[float] = []
+    outcomes: Counter[str] = Counter()
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for idx in range(args.requests):
+        queue.put_nowait(idx)
+
+    async def worker() -> None:
+        while not queue.empty():
+            idx = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                outcome = await call(idx)
+            except Exception as e:  # noqa: BLE001 - 压测统计所有异常类型
+                outcome = e.__class__.__name__
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, args.concurrency))))
+    finally:
+        elapsed = time.perf_counter() - started
+        if client is not None:
+            await client.aclose()
+        await close_upstream_pool()
+
+    result: dict[str, Any] = {
+        "target": args.target,
+        "module": args.module,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 3) if elapsed > 0 else None,
+        "outcomes": dict(outcomes),
+    }
+    if latencies:
+        result["latency_seconds"] = {
+            "p50": round(_percentile(latencies, 0.50), 3),
+            "p95": round(_percentile(latencies, 0.95), 3),
+            "p99": round(_percentile(latencies, 0.99), 3),
+            "max": round(max(latencies), 3),
+        }
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    mock = None
+    upstream_url = args.upstream_url
+    if not upstream_url:
+        upstream_url, mock = _start_mock_upstream(args)
+    os.environ["UPSTREAM_BASE_URL"] = upstream_url
+    os.environ.setdefault("UPSTREAM_API_KEY", "mock")
+    if args.mode:
+        os.environ["REPORT_GENERATION_MODE"] = args.mode
+    os.environ.setdefault("FONT_DIR", str(BACKEND_DIR / "assets" / "fonts"))
+
+    result = asyncio.run(_run(args))
+    if mock is not None:
+        result["mock_upstream"] = mock.metrics()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+行内 Markdown 转换基准：旧的多次 re.sub 清洗 vs 单次扫描的 Paragraph 标记转换（含转义）。
+
+用法（在 backend 目录）：
+    python benchmarks/markup_bench.py
+    python benchmarks/markup_bench.py --preset tables --markdown-rate 0.3 --repeat 20
+
+说明：
+- 文本取自 `synthetic_report.py` 生成的报告（表头、单元格、段落、要点、卡片），按 --markdown-rate 随机加入粗体/代码/列表标记与 `<`、`&`；
+- legacy 为 `sanitize_markdown`（不转义，粗体被丢弃）；legacy+escape 为其后再做 XML 转义，与新实现输出能力相当；
+- batch 为整张表一次调用 `to_markup_batch`（重复单元格只转换一次）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.services.report_transforms import sanitize_markdown  # noqa: E402
+from app.services.reportlab.markup import escape_markup, to_markup, to_markup_batch  # noqa: E402
+from synthetic_report import PRESETS, generate_report  # noqa: E402
+
+_DECORATIONS = (
+    lambda s: f"**{s[:6]}**{s[6:]}",
+    lambda s: f"- {s}",
+    lambda s: f"1. {s}",
+    lambda s: f"{s[:4]}`{s[4:8]}`{s[8:]}",
+    lambda s: f"{s}（满30<减5 & 返券）",
+)
+
+
+def collect_texts(preset: str, seed: int, markdown_rate: float) -> tuple[list[list[str]], list[str]]:
+    """返回 (表格列表[每张表的扁平单元格], 其它文本)。"""
+    rnd = random.Random(seed)
+    data = generate_report(seed=seed, **PRESETS[preset])
+
+    def decorate(text: str) -> str:
+        return rnd.choice(_DECORATIONS)(text) if rnd.random() < markdown_rate else text
+
+    tables: list[list[str]] = []
+    others: list[str] = []
+    for section in data["sections"]:
+        for block in section["blocks"]:
+            if block["type"] == "table":
+                cells = list(block["headers"]) + [cell for row in block["rows"] for cell in row]
+                tables.append([decorate(cell) for cell in cells])
+            elif block["type"] in ("paragraph", "subtitle"):
+                others.append(decorate(block["text"]))
+            elif block["type"] == "bullets":
+                others.extend(decorate(item) for item in block["items"])
+            else:
+                for card in block["items"]:
+                    others.extend((decorate(card["title"]), decorate(card["text"])))
+    return tables, others
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="tables")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--markdown-rate", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    tables, others = collect_texts(args.preset, args.seed, args.markdown_rate)
+    texts = [cell for table in tables for cell in table] + others
+    print(f"preset={args.preset} strings={len(texts)} table_cells={len(texts) - len(others)} tables={len(tables)}")
+
+    cases = {
+        "legacy": lambda: [sanitize_markdown(t) for t in texts],
+        "legacy+escape": lambda: [escape_markup(sanitize_markdown(t)) for t in texts],
+        "to_markup": lambda: [to_markup(t) for t in texts],
+        "batch": lambda: ([to_markup_batch(table) for table in tables], [to_markup(t) for t in others]),
+    }
+    base = None
+    for name, fn in cases.items():
+        ms = _time(fn, args.repeat)
+        base = base or ms
+        print(f"{name:<14}{ms:>9.2f} ms  {len(texts) / ms * 1000:>12,.0f} str/s  x{base / ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
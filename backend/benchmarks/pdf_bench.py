@@ -0,0 +1,223 @@
+"""
+ReportLab PDF 基准：按阶段统计 `build_pdf_bytes` 的耗时与峰值内存，并与保存的基线对比。
+
+用法（在 backend 目录）：
+    python benchmarks/pdf_bench.py                              # 全部预设，与基线对比
+    python benchmarks/pdf_bench.py --preset medium --repeat 10
+    python benchmarks/pdf_bench.py --sections 20 --table-rows 100 --block-mix "paragraph=2,table=1"
+    python benchmarks/pdf_bench.py --save-baseline              # 覆盖保存基线
+    python benchmarks/pdf_bench.py --fail-on-regression 15      # 任一耗时指标比基线慢 15% 以上时退出码为 1
+
+说明：
+- 报告由 `synthetic_report.py` 按种子生成，完全离线、可复现；
+- 阶段：styles（字体与主题样式）、story（构建 flowable）、layout（分页排版）、output（序列化 PDF 并取出字节）；
+  layout 与 output 通过计时 Canvas.save 拆分；
+- 耗时取 --repeat 次中的中位数；峰值内存在单独一轮中用 tracemalloc 逐阶段测量（仅 Python 分配）；
+- `cold_ms` 为进程内首次渲染（含字体注册与字宽表加载）的总耗时。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import reportlab  # noqa: E402
+from reportlab.pdfgen.canvas import Canvas  # noqa: E402
+
+from app.domain.report_schema import ReportData  # noqa: E402
+from app.services.reportlab.pdf_builder import build_document, build_story, page_footer  # noqa: E402
+from app.services.reportlab.theme import get_fonts, get_theme_styles  # noqa: E402
+from synthetic_report import PRESETS, generate_report, parse_block_mix  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "pdf_bench.json"
+MODULE = "data-statistics"
+STAGES = ("styles", "story", "layout", "output")
+TIME_KEYS = ("total_ms", *(f"{stage}_ms" for stage in STAGES))
+
+
+class _TimedCanvas(Canvas):
+    """记录 save()（PDF 序列化与写出）耗时的 Canvas。"""
+
+    save_seconds = 0.0
+
+    def save(self) -> None:
+        started = time.perf_counter()
+        super().save()
+        _TimedCanvas.save_seconds = time.perf_counter() - started
+
+
+def _staged_render(report: ReportData, probe: Callable[[str], None]) -> bytes:
+    """按阶段渲染一次；每个阶段结束时调用 probe(阶段名)。"""
+    registry = get_theme_styles(MODULE)
+    probe("styles")
+    story = build_story(report, registry)
+    probe("story")
+    buffer = BytesIO()
+    footer = page_footer(registry)
+    build_document(buffer).build(story, onFirstPage=footer, onLaterPages=footer, canvasmaker=_TimedCanvas)
+    probe("layout")
+    pdf = buffer.getvalue()
+    probe("output")
+    return pdf
+
+
+def _time_once(report: ReportData) -> tuple[dict[str, float], bytes]:
+    marks: dict[str, float] = {}
+    started = last = time.perf_counter()
+
+    def probe(stage: str) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        marks[stage] = now - last
+        last = now
+
+    pdf = _staged_render(report, probe)
+    # Canvas.save 在 doc.build 内执行，从 layout 中扣除并计入 output
+    marks["layout"] -= _TimedCanvas.save_seconds
+    marks["output"] += _TimedCanvas.save_seconds
+    marks["total"] = time.perf_counter() - started
+    return marks, pdf
+
+
+def _peak_memory(report: ReportData) -> dict[str, float]:
+    peaks: dict[str, float] = {}
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    def probe(stage: str) -> None:
+        peaks[stage] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.reset_peak()
+
+    try:
+        _staged_render(report, probe)
+    finally:
+        tracemalloc.stop()
+    return {f"{stage}_peak_kb": round(kb, 1) for stage, kb in peaks.items()} | {
+        "peak_kb": round(max(peaks.values()), 1)
+    }
+
+
+def run_case(params: dict[str, Any], *, seed: int, repeat: int) -> dict[str, Any]:
+    data = generate_report(seed=seed, **params)
+    report = ReportData.model_validate(data)
+    samples = []
+    pdf = b""
+    for _ in range(repeat):
+        marks, pdf = _time_once(report)
+        samples.append(marks)
+    result: dict[str, Any] = {
+        key: round(statistics.median(s[key.removesuffix("_ms")] for s in samples) * 1000, 2) for key in TIME_KEYS
+    }
+    result.update(_peak_memory(report))
+    blocks = sum(len(section["blocks"]) for section in data["sections"])
+    result.update(
+        {
+            "pdf_bytes": len(pdf),
+            "pages": len(re.findall(rb"/Type /Page\b", pdf)),
+            "sections": len(data["sections"]),
+            "blocks": blocks,
+        }
+    )
+    return result
+
+
+def environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "platform": platform.platform(terse=True),
+        "fonts": ",".join(sorted(set(get_fonts()))),
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> tuple[list[str], float]:
+    """返回对比表格的文本行与耗时指标中最大的回退百分比。"""
+    lines = [f"{'case':<10}{'metric':<18}{'baseline':>12}{'current':>12}{'delta':>10}"]
+    worst = 0.0
+    for case, result in current.items():
+        base = baseline.get(case)
+        if not base:
+            lines.append(f"{case:<10}(基线中无此用例)")
+            continue
+        for key, value in result.items():
+            if key not in base or not isinstance(value, (int, float)):
+                continue
+            old = base[key]
+            delta = (value - old) / old * 100 if old else 0.0
+            if key in TIME_KEYS:
+                worst = max(worst, delta)
+            lines.append(f"{case:<10}{key:<18}{old:>12}{value:>12}{delta:>+9.1f}%")
+    return lines, worst
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", nargs="+", choices=sorted(PRESETS), help="默认运行全部预设")
+    parser.add_argument("--sections", type=int, help="自定义用例：章节数（指定后忽略 --preset）")
+    parser.add_argument("--blocks-per-section", type=int, default=8)
+    parser.add_argument("--table-rows", type=int, default=20)
+    parser.add_argument("--highlight-cards", type=int, default=4)
+    parser.add_argument("--block-mix", default="", help="块类型权重，如 paragraph=4,table=1")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="PERCENT")
+    args = parser.parse_args(argv)
+
+    if args.sections:
+        cases = {
+            "custom": {
+                "sections": args.sections,
+                "blocks_per_section": args.blocks_per_section,
+                "table_rows": args.table_rows,
+                "highlight_cards": args.highlight_cards,
+                "block_mix": parse_block_mix(args.block_mix) or None,
+            }
+        }
+    else:
+        cases = {name: PRESETS[name] for name in (args.preset or sorted(PRESETS))}
+
+    cold_started = time.perf_counter()
+    _time_once(ReportData.model_validate(generate_report(seed=args.seed, **PRESETS["small"])))
+    cold_ms = round((time.perf_counter() - cold_started) * 1000, 2)
+
+    results = {name: run_case(params, seed=args.seed, repeat=args.repeat) for name, params in cases.items()}
+    output = {"env": environment(), "seed": args.seed, "repeat": args.repeat, "cold_ms": cold_ms, "results": results}
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(output, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"基线已保存：{args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("未找到基线，使用 --save-baseline 生成")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("env") != output["env"]:
+        print(f"注意：基线环境不同 {baseline.get('env')}")
+    lines, worst = compare(baseline.get("results", {}), results)
+    print("\n".join(lines))
+    if args.fail_on_regression is not None and worst > args.fail_on_regression:
+        print(f"耗时回退 {worst:.1f}% 超过阈值 {args.fail_on_regression}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
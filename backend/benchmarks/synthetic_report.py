@@ -0,0 +1,164 @@
+"""
+合成 ReportData 生成器：按随机种子生成结构与篇幅可控的中文外卖运营报告，供基准脚本离线使用。
+
+用法（在其他基准脚本中）：
+    from synthetic_report import PRESETS, generate_report
+    data = generate_report(seed=1, **PRESETS["medium"])
+
+说明：
+- 文本由外卖运营常见短语随机拼接，长度分布接近真实模型输出（段落 80–240 字、表格说明列 10–60 字）；
+- `block_mix` 为各块类型的相对权重，`table_rows` / `highlight_cards` 控制表格行数与每组卡片数；
+- 同一组参数与种子始终生成完全相同的报告。
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Any
+
+SUBJECTS = ["门店", "新客", "老客", "午高峰", "晚高峰", "夜宵时段", "主推套餐", "招牌单品", "配送范围", "商圈竞品"]
+METRICS = ["曝光量", "进店转化率", "下单转化率", "客单价", "复购率", "好评率", "出餐时长", "配送时长", "活动成本占比"]
+TRENDS = ["环比提升", "同比下降", "基本持平", "明显波动", "持续走低", "稳步增长"]
+ACTIONS = [
+    "调整满减梯度",
+    "优化菜品主图与标题",
+    "上线新客专享价",
+    "设置第二份半价",
+    "投放精准曝光推广",
+    "压缩出餐流程",
+    "增加套餐组合",
+    "完善评价回复话术",
+    "开通夜宵时段",
+    "扩大配送范围",
+]
+REASONS = [
+    "商圈内同类门店价格带更低",
+    "页面首屏信息不够聚焦",
+    "高峰期出餐不稳定导致差评",
+    "活动力度与竞品相比缺乏吸引力",
+    "新客占比高但留存不足",
+    "客单价集中在低价区间",
+]
+STORES = ["川味小馆", "轻食沙拉", "黄焖鸡米饭", "老北京炸酱面", "麻辣烫", "港式茶餐厅", "韩式炸鸡", "牛肉拉面"]
+SECTION_TITLES = [
+    "经营现状诊断",
+    "商圈竞争分析",
+    "用户画像与需求",
+    "菜品结构优化",
+    "活动策略设计",
+    "流量与曝光提升",
+    "服务与评价管理",
+    "执行计划与预期效果",
+]
+
+DEFAULT_BLOCK_MIX = {"paragraph": 4, "subtitle": 1, "bullets": 2, "table": 1, "highlight_cards": 1}
+
+PRESETS: dict[str, dict[str, Any]] = {
+    "small": {"sections": 4, "blocks_per_section": 5, "table_rows": 8, "highlight_cards": 3},
+    "medium": {"sections": 8, "blocks_per_section": 8, "table_rows": 20, "highlight_cards": 4},
+    "large": {"sections": 12, "blocks_per_section": 12, "table_rows": 80, "highlight_cards": 6},
+    "tables": {
+        "sections": 6,
+        "blocks_per_section": 4,
+        "table_rows": 300,
+        "highlight_cards": 2,
+        "block_mix": {"paragraph": 1, "table": 3},
+    },
+}
+
+
+def parse_block_mix(text: str) -> dict[str, float]:
+    """解析 `paragraph=4,table=1` 形式的块类型权重。"""
+    mix: dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_BLOCK_MIX:
+            raise ValueError(f"未知块类型: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class _Writer:
+    def __init__(self, rnd: random.Random):
+        self.rnd = rnd
+
+    def sentence(self) -> str:
+        r = self.rnd
+        templates = (
+            lambda: f"{r.choice(SUBJECTS)}{r.choice(METRICS)}{r.choice(TRENDS)}，主要原因是{r.choice(REASONS)}。",
+            lambda: f"建议{r.choice(ACTIONS)}，预计{r.choice(METRICS)}提升{r.randint(3, 30)}%。",
+            lambda: f"近{r.choice((7, 14, 30))}天{r.choice(METRICS)}为{r.uniform(1, 99):.1f}%，{r.choice(TRENDS)}。",
+            lambda: f"针对{r.choice(SUBJECTS)}，可以{r.choice(ACTIONS)}并同步{r.choice(ACTIONS)}。",
+        )
+        return r.choice(templates)()
+
+    def text(self, low: int, high: int) -> str:
+        target = self.rnd.randint(low, high)
+        parts: list[str] = []
+        while sum(map(len, parts)) < target:
+            parts.append(self.sentence())
+        return "".join(parts)
+
+    def phrase(self, low: int, high: int) -> str:
+        return self.text(low, high).rstrip("。")
+
+    def block(self, kind: str, *, table_rows: int, highlight_cards: int) -> dict[str, Any]:
+        r = self.rnd
+        if kind == "paragraph":
+            return {"type": "paragraph", "text": self.text(80, 240)}
+        if kind == "subtitle":
+            return {"type": "subtitle", "text": f"{r.randint(1, 9)}. {r.choice(ACTIONS)}"}
+        if kind == "bullets":
+            return {"type": "bullets", "items": [self.sentence() for _ in range(r.randint(3, 6))]}
+        if kind == "table":
+            headers = ["指标", "当前值", "目标值", "说明"]
+            rows = [
+                [
+                    r.choice(METRICS),
+                    f"{r.uniform(1, 99):.1f}%",
+                    f"{r.uniform(1, 99):.1f}%",
+                    self.phrase(10, 60),
+                ]
+                for _ in range(table_rows)
+            ]
+            return {"type": "table", "headers": headers, "rows": rows}
+        return {
+            "type": "highlight_cards",
+            "items": [{"title": r.choice(ACTIONS), "text": self.text(30, 90)} for _ in range(highlight_cards)],
+        }
+
+
+def generate_report(
+    *,
+    seed: int = 1,
+    sections: int = 8,
+    blocks_per_section: int = 8,
+    table_rows: int = 20,
+    highlight_cards: int = 4,
+    block_mix: dict[str, float] | None = None,
+) -> dict[str, Any]:
+    """生成 ReportData 结构的字典（未校验，调用方按需 `ReportData.model_validate`）。"""
+    rnd = random.Random(seed)
+    writer = _Writer(rnd)
+    mix = block_mix or DEFAULT_BLOCK_MIX
+    kinds, weights = list(mix), list(mix.values())
+    out = []
+    for idx in range(sections):
+        blocks = [
+            writer.block(kind, table_rows=table_rows, highlight_cards=highlight_cards)
+            for kind in rnd.choices(kinds, weights=weights, k=blocks_per_section)
+        ]
+        title = SECTION_TITLES[idx % len(SECTION_TITLES)]
+        out.append({"title": title, "summary": writer.phrase(8, 20), "blocks": blocks})
+    store = rnd.choice(STORES)
+    return {
+        "cover": {
+            "store_name": store,
+            "report_title": "店铺经营分析报告",
+            "report_subtitle": "外卖运营诊断与优化方案",
+            "business_line": "主营：快餐简餐",
+            "period_text": "分析周期：2026年01月01日 - 2026年01月31日",
+            "plan_date": "策划日期：2026年02月",
+        },
+        "sections": out,
+    }
@@ -0,0 +1,116 @@
+"""
+表格排版基准：旧实现（每格 Paragraph + 等分列宽 + 每表新建 TableStyle，无表头重复）对比当前表格渲染。
+
+用法（在 backend 目录）：
+    python benchmarks/table_bench.py --rows 10 100 500 2000 --repeat 3
+
+说明：
+- 合成数据模拟数据统计/竞品表：短指标列、数值列与长文本说明列混合；
+- 每种行数单独排一份只含该表格的 A4 文档，输出构建耗时（取最优值）与页数。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from reportlab.lib import colors  # noqa: E402
+from reportlab.lib.pagesizes import A4  # noqa: E402
+from reportlab.lib.units import mm  # noqa: E402
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle  # noqa: E402
+
+from app.services.report_transforms import sanitize_markdown  # noqa: E402
+from app.services.reportlab.tables import build_fast_table  # noqa: E402
+from app.services.reportlab.theme import get_theme_styles  # noqa: E402
+
+CJK = "外卖店铺曝光转化复购品牌定位商圈调研活动方案数据统计分析用户画像客单价满减优惠配送时效评分提升"
+HEADERS = ["店铺", "月售", "评分", "客单价", "主推活动与差异点"]
+
+
+def synthetic_rows(count: int, seed: int = 11) -> list[list[str]]:
+    rnd = random.Random(seed)
+
+    def words(n: int) -> str:
+        return "".join(rnd.choice(CJK) for _ in range(n))
+
+    return [
+        [
+            f"{words(3)}店{i}",
+            str(rnd.randint(100, 9999)),
+            f"{rnd.uniform(3.5, 5):.1f}",
+            f"¥{rnd.randint(15, 80)}",
+            words(rnd.choice((8, 20, 60))),
+        ]
+        for i in range(count)
+    ]
+
+
+def legacy_table(headers: list[str], rows: list[list[str]], styles: Any, theme: Any) -> Table:
+    col_count = len(headers)
+    body_rows = [[Paragraph(sanitize_markdown(str(cell)), styles["body"]) for cell in row] for row in rows]
+    col_width = 160 * mm / col_count
+    table = Table([headers] + body_rows, colWidths=[col_width] * col_count)
+    table.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), theme.primary),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#DDDDDD")),
+                ("FONTNAME", (0, 0), (-1, 0), styles["section_title"].fontName),
+                ("FONTSIZE", (0, 0), (-1, -1), 10),
+                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, theme.light]),
+                ("LEFTPADDING", (0, 0), (-1, -1), 6),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+                ("TOPPADDING", (0, 0), (-1, -1), 4),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+            ]
+        )
+    )
+    return table
+
+
+def _render(build, rows: list[list[str]]) -> tuple[float, int]:
+    registry = get_theme_styles("data-statistics")
+    buffer = BytesIO()
+    started = time.perf_counter()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=22 * mm, rightMargin=22 * mm)
+    doc.build([build(HEADERS, rows, registry.styles, registry.theme)])
+    elapsed = time.perf_counter() - started
+    return elapsed, len(re.findall(rb"/Type /Page\b", buffer.getvalue()))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    _render(build_fast_table, synthetic_rows(5))
+    results = []
+    for count in args.rows:
+        rows = synthetic_rows(count)
+        entry: dict[str, Any] = {"rows": count}
+        for name, build in (("legacy", legacy_table), ("fast", build_fast_table)):
+            best, pages = float("inf"), 0
+            for _ in range(args.repeat):
+                elapsed, pages = _render(build, rows)
+                best = min(best, elapsed)
+            entry[f"{name}_ms"] = round(best * 1000, 1)
+            entry[f"{name}_pages"] = pages
+        entry["speedup"] = round(entry["legacy_ms"] / entry["fast_ms"], 2)
+        results.append(entry)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
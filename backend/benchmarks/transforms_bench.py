@@ -0,0 +1,161 @@
+"""
+ReportData 文本后处理基准：逐字符串多次 re.sub（旧实现）对比一次遍历的预编译变换流水线。
+
+用法（在 backend 目录）：
+    python benchmarks/transforms_bench.py --rows 500 --tables 6 --repeat 5
+
+说明：
+- 生成含大表格的合成报告（每张表 --rows 行，单元格混有日期、数字与 Markdown 标记）；
+- legacy 为原先的逐字符串四次 re.sub 日期替换；pipeline 为日期替换 + 首尾空白清理的一次遍历（Markdown 在渲染时转换）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.domain.report_schema import ReportData  # noqa: E402
+from app.services.report_transforms import (  # noqa: E402
+    WHITESPACE,
+    TransformPipeline,
+    date_transform,
+)
+
+
+def _legacy_replace_date_text(text: str, ts: datetime) -> str:
+    if not text:
+        return ""
+    s = str(text)
+    year, month, day = ts.year, ts.month, ts.day
+
+    def repl_sep(match: re.Match) -> str:
+        sep = match.group(2)
+        return f"{year}{sep}{month:02d}{sep}{day:02d}"
+
+    def repl_cn(match: re.Match) -> str:
+        return f"{year}年{month:02d}月{day:02d}日"
+
+    def repl_sep_month(match: re.Match) -> str:
+        sep = match.group(2)
+        return f"{year}{sep}{month:02d}"
+
+    def repl_cn_month(match: re.Match) -> str:
+        return f"{year}年{month:02d}月"
+
+    s = re.sub(r"(20\d{2})([-/.])(1[0-2]|0?[1-9])\2([12]\d|3[01]|0?[1-9])", repl_sep, s)
+    s = re.sub(r"(20\d{2})年(1[0-2]|0?[1-9])月([12]\d|3[01]|0?[1-9])日?", repl_cn, s)
+    s = re.sub(r"(20\d{2})([-/.])(1[0-2]|0?[1-9])(?!\2[0-3]?\d)", repl_sep_month, s)
+    s = re.sub(r"(20\d{2})年(1[0-2]|0?[1-9])月", repl_cn_month, s)
+    return s
+
+
+def _legacy_apply(report: ReportData, ts: datetime) -> None:
+    for section in report.sections:
+        section.title = _legacy_replace_date_text(section.title, ts)
+        section.summary = _legacy_replace_date_text(section.summary, ts)
+        for block in section.blocks:
+            if block.type in {"paragraph", "subtitle"}:
+                block.text = _legacy_replace_date_text(block.text, ts)
+            elif block.type == "bullets":
+                block.items = [_legacy_replace_date_text(item, ts) for item in block.items]
+            elif block.type == "table":
+                block.headers = [_legacy_replace_date_text(item, ts) for item in block.headers]
+                block.rows = [[_legacy_replace_date_text(item, ts) for item in row] for row in block.rows]
+            elif block.type == "highlight_cards":
+                for item in block.items:
+                    item.title = _legacy_replace_date_text(item.title, ts)
+                    item.text = _legacy_replace_date_text(item.text, ts)
+
+
+def synthetic_report(*, tables: int, rows: int) -> dict[str, Any]:
+    sections = []
+    for t in range(tables):
+        table_rows = [
+            [
+                f"2023-{(r % 12) + 1:02d}-{(r % 28) + 1:02d}",
+                f"**门店{r % 37}号**",
+                f"{1000 + r * 7:,}",
+                f"{(r % 20) + 5}.{r % 10}%",
+                "店长" if r % 2 else "运营",
+            ]
+            for r in range(rows)
+        ]
+        sections.append(
+            {
+                "title": f"{t + 1}. 经营数据 2023年{(t % 12) + 1}月",
+                "summary": "按日统计曝光、进店与下单转化",
+                "blocks": [
+                    {"type": "paragraph", "text": f"统计周期：2023年{(t % 12) + 1}月1日至月底，数据来源于商家后台。"},
+                    {"type": "bullets", "items": ["- 午高峰  曝光不足", "`满减`梯度偏低", "复购率 2023.10 下降"]},
+                    {"type": "table", "headers": ["日期", "门店", "曝光", "转化率", "负责人"], "rows": table_rows},
+                ],
+            }
+        )
+    return {
+        "cover": {
+            "store_name": "示例店",
+            "report_title": "数据统计分析报告",
+            "report_subtitle": "基准测试",
+            "business_line": "外卖",
+            "period_text": "2023年10月",
+            "plan_date": "2023-10-27",
+        },
+        "sections": sections,
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--tables", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    data = synthetic_report(tables=args.tables, rows=args.rows)
+    ts = datetime(2026, 1, 31, tzinfo=timezone(timedelta(hours=8)))
+    pipeline = TransformPipeline([date_transform(ts), WHITESPACE])
+    dates_only = TransformPipeline([date_transform(ts)])
+
+    legacy = _time(lambda: _legacy_apply(ReportData.model_validate(data), ts), args.repeat)
+    dates = _time(lambda: dates_only.apply(ReportData.model_validate(data)), args.repeat)
+    full = _time(lambda: pipeline.apply(ReportData.model_validate(data)), args.repeat)
+    validate = _time(lambda: ReportData.model_validate(data), args.repeat)
+
+    cells = args.tables * args.rows * 5
+    print(
+        json.dumps(
+            {
+                "tables": args.tables,
+                "rows_per_table": args.rows,
+                "cells": cells,
+                "validate_ms": round(validate * 1000, 2),
+                "legacy_dates_ms": round((legacy - validate) * 1000, 2),
+                "pipeline_dates_ms": round((dates - validate) * 1000, 2),
+                "pipeline_full_ms": round((full - validate) * 1000, 2),
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
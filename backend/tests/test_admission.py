@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    AdmissionRejected,
+    TokenBucket,
+    admission_scope,
+    estimate_request_tokens,
+)
+from app.settings import Settings
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.take(60, now)
+    assert bucket.time_until(1, now) == pytest.approx(1.0)
+    assert bucket.time_until(1, now + 1.0) == 0.0
+
+
+def test_unlimited_model_admits_immediately():
+    controller = AdmissionController()
+    asyncio.run(controller.acquire("m", tokens=100000))
+    assert controller.metrics()["admitted_total"] == 1
+
+
+def test_rejects_when_wait_exceeds_deadline():
+    controller = AdmissionController(model_limits={"m": {"rpm": 1}})
+
+    async def run():
+        await controller.acquire("m", tokens=1)
+        with admission_scope(deadline_seconds=5):
+            await controller.acquire("m", tokens=1)
+
+    with pytest.raises(AdmissionRejected) as info:
+        asyncio.run(run())
+    assert info.value.retry_after >= 55
+    assert controller.metrics()["rejected_total"] == 1
+
+
+def test_interactive_requests_jump_ahead_of_batch():
+    controller = AdmissionController(model_limits={"m": {"rpm": 600}}, poll_seconds=0.01)
+    order: list[str] = []
+
+    async def worker(name: str, priority: int, delay: float):
+        await asyncio.sleep(delay)
+        with admission_scope(priority=priority):
+            await controller.acquire("m", tokens=1)
+        order.append(name)
+
+    async def run():
+        controller._limiter("m").rpm.tokens = 0
+        await asyncio.gather(
+            worker("batch", PRIORITY_BATCH, 0),
+            worker("interactive", PRIORITY_INTERACTIVE, 0.02),
+        )
+
+    asyncio.run(run())
+    assert order == ["interactive", "batch"]
+
+
+def test_rejects_when_queue_full():
+    controller = AdmissionController(model_limits={"m": {"rpm": 1}}, max_queue=0)
+
+    async def run():
+        await controller.acquire("m", tokens=1)
+        await controller.acquire("m", tokens=1)
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(run())
+
+
+def test_estimate_request_tokens_counts_text_and_max_tokens():
+    body = {
+        "max_tokens": 1000,
+        "messages": [
+            {"role": "system", "content": "系统"},
+            {"role": "user", "content": [{"type": "text", "text": "你好"}, {"type": "image_url", "image_url": {}}]},
+        ],
+    }
+    # 每条消息 4 + 汉字各 1 + 图片 1100 + max_tokens
+    assert estimate_request_tokens(body) == 2112
+
+
+def test_rate_limits_setting_parses_json(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_RATE_LIMITS", '{"m": {"rpm": 60, "tpm": 1000}}')
+    assert Settings().upstream_rate_limits == {"m": {"rpm": 60, "tpm": 1000}}
@@ -12,7 +12,7 @@ import api.index as api_index
 
 def test_debug_error_handler_includes_detail(monkeypatch):
     monkeypatch.setenv("DIAGNOSTIC_LOGS", "1")
-    monkeypatch.setattr(api_index, "generate_pdf_bytes", lambda **_: (_ for _ in ()).throw(ValueError("boom")))
+    monkeypatch.setattr(api_index, "generate_pdf_file", lambda **_: (_ for _ in ()).throw(ValueError("boom")))
 
     client = TestClient(api_index.app)
     response = client.post("/api/generate", data={"module": "brand", "payload_json": "{}"})
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from app.services.body_encoder import (
+    CHUNK_SIZE,
+    InlineImage,
+    JsonBodyStream,
+    iter_json_bytes,
+    json_content_length,
+)
+from app.services.llm_cache import cache_key
+from app.services.upstream_llm import UpstreamConfig, chat_completions
+
+
+def test_encoder_matches_json_dumps_for_plain_bodies():
+    body = {
+        "model": "m",
+        "messages": [{"role": "user", "content": "你好\n\"引号\"\\ tab\t" + "长" * (CHUNK_SIZE + 7)}],
+        "temperature": 0.8,
+        "max_tokens": 1024,
+        "stream": False,
+        "extra": None,
+    }
+    expected = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    assert b"".join(iter_json_bytes(body)) == expected
+    assert json_content_length(body) == len(expected)
+
+
+def test_inline_image_streams_same_bytes_as_data_url():
+    image = InlineImage(os.urandom(CHUNK_SIZE * 2 + 5))
+    body = {"messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": image}}]}]}
+    expected_body = {"messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": image.data_url()}}]}]}
+    expected = json.dumps(expected_body, ensure_ascii=False).encode("utf-8")
+
+    chunks = list(iter_json_bytes(body))
+    assert b"".join(chunks) == expected
+    assert json_content_length(body) == len(expected)
+    assert max(len(c) for c in chunks) <= CHUNK_SIZE
+
+
+def test_inline_image_cache_key_uses_digest():
+    data = b"\xff\xd8jpeg-bytes"
+    body = {"model": "m", "messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": InlineImage(data)}}]}]}
+    same = {"model": "m", "messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": InlineImage(bytes(data))}}]}]}
+    other = {"model": "m", "messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": InlineImage(b"other")}}]}]}
+    assert cache_key(body) == cache_key(same)
+    assert cache_key(body) != cache_key(other)
+    assert "jpeg-bytes" not in str(InlineImage(data))
+
+
+def test_chat_completions_sends_fixed_length_streamed_body():
+    image = InlineImage(os.urandom(200_000))
+    seen: dict = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["headers"] = request.headers
+        seen["body"] = json.loads(request.content)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await chat_completions(
+                client,
+                cfg=UpstreamConfig(base_url="https://example.test/v1/chat/completions", api_key="k", model="m"),
+                system="S",
+                user_prompt="P",
+                image_data_url=image,
+            )
+
+    assert asyncio.run(run()) == "ok"
+    assert "transfer-encoding" not in seen["headers"]
+    assert int(seen["headers"]["content-length"]) == JsonBodyStream(seen["body"]).content_length
+    assert seen["body"]["messages"][1]["content"][1]["image_url"]["url"] == image.data_url()
+
+
+def test_stateful_generate_sends_inline_image_and_stores_data_url(monkeypatch):
+    from io import BytesIO
+
+    from fastapi.testclient import TestClient
+    from PIL import Image
+
+    import app.routes.reports_generate as reports_generate
+    from app.main import create_app
+
+    monkeypatch.setenv("UPSTREAM_API_KEY", "test-key")
+    seen = {}
+
+    async def fake_chat_completions(_client, *, image_data_url, **_kwargs):  # noqa: ANN001
+        seen["image"] = image_data_url
+        return "# ok"
+
+    monkeypatch.setattr(reports_generate, "chat_completions", fake_chat_completions)
+    png = BytesIO()
+    Image.new("RGB", (32, 32), "red").save(png, format="PNG")
+
+    client = TestClient(create_app())
+    res = client.post(
+        "/api/reports/generate",
+        data={"module": "market", "payload_json": "{}", "no_cache": "true"},
+        files={"screenshot": ("s.png", png.getvalue(), "image/png")},
+    )
+    assert res.status_code == 200
+    assert isinstance(seen["image"], InlineImage)
+    stored = client.get(f"/api/reports/{res.json()['report_id']}").json()
+    assert stored["screenshot_data_url"] == seen["image"].data_url()
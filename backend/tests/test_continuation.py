@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import httpx
+
+from app.mock_upstream import MockUpstreamSettings, canned_markdown, canned_report, create_mock_app
+from app.services.llm_cache import LLMCache, MemoryLRUCache
+from app.services.upstream_llm import (
+    CONTINUE_PROMPT,
+    ChatResult,
+    UpstreamConfig,
+    chat_completion_result,
+    parse_sse_chunk,
+    stitch_continuation,
+    stream_chat_completions,
+)
+
+CFG = UpstreamConfig(base_url="https://upstream.test/v1/chat/completions", api_key="k", model="m")
+
+
+def _completion(content: str, finish_reason: str, completion_tokens: int) -> dict:
+    return {
+        "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": completion_tokens, "total_tokens": 10 + completion_tokens},
+    }
+
+
+def test_stitch_continuation_removes_overlap_and_code_fence():
+    assert stitch_continuation('{"a": "门店近三十天曝光偏低', '门店近三十天曝光偏低，需加大投放"}') == '{"a": "门店近三十天曝光偏低，需加大投放"}'
+    assert stitch_continuation("abc", "def") == "abcdef"
+    assert stitch_continuation('{"a": 1,', '```json\n"b": 2}\n```') == '{"a": 1,"b": 2}\n'
+
+
+def test_parse_sse_chunk_reports_finish_reason_and_usage():
+    line = 'data: {"choices": [{"delta": {"content": "尾"}, "finish_reason": "length"}], "usage": {"completion_tokens": 5}}'
+    chunk = parse_sse_chunk(line)
+    assert chunk.text == "尾"
+    assert chunk.finish_reason == "length"
+    assert chunk.usage == {"completion_tokens": 5}
+    assert parse_sse_chunk("data: [DONE]") is None
+
+
+def test_truncated_output_is_continued_and_stitched():
+    bodies: list[dict] = []
+    replies = [
+        _completion('{"sections": [{"title": "一', "length", 100),
+        _completion('{"title": "一"}]}', "stop", 20),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json=replies[len(bodies) - 1])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await chat_completion_result(client, cfg=CFG, system="S", user_prompt="P", max_continuations=2)
+
+    result = asyncio.run(run())
+    assert json.loads(result.content) == {"sections": [{"title": "一"}]}
+    assert result.finish_reason == "stop"
+    assert result.continuations == 1
+    assert result.usage["completion_tokens"] == 120
+    assert bodies[1]["messages"][-2] == {"role": "assistant", "content": '{"sections": [{"title": "一'}
+    assert bodies[1]["messages"][-1] == {"role": "user", "content": CONTINUE_PROMPT}
+
+
+def test_truncated_output_without_continuations_is_not_cached(tmp_path):
+    calls = {"n": 0}
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(200, json=_completion('{"a": ', "length", 50))
+
+    async def run():
+        cache = LLMCache(MemoryLRUCache(max_entries=8, ttl_seconds=60))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await chat_completion_result(client, cfg=CFG, system="S", user_prompt="P", cache=cache)
+            second = await chat_completion_result(client, cfg=CFG, system="S", user_prompt="P", cache=cache)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.truncated and second.truncated
+    assert not second.cached
+    assert calls["n"] == 2
+
+
+def test_mock_upstream_continuation_completes_json_report():
+    async def run():
+        app = create_mock_app(MockUpstreamSettings(latency_ms=0, tokens_per_second=0, sections=3, seed=1))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+            cfg = UpstreamConfig(base_url="http://mock/v1/chat/completions", api_key="mock", model="mock")
+            return await chat_completion_result(
+                client, cfg=cfg, system="JSON", user_prompt="品牌定位", max_tokens=400, max_continuations=5
+            )
+
+    result = asyncio.run(run())
+    assert result.continuations >= 1
+    assert not result.truncated
+    assert json.loads(result.content) == canned_report("brand", sections=3)
+
+
+def test_streaming_continuation_yields_only_new_text():
+    async def run():
+        app = create_mock_app(
+            MockUpstreamSettings(latency_ms=0, tokens_per_second=0, sections=2, chunk_chars=16, seed=1)
+        )
+        result = ChatResult()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+            cfg = UpstreamConfig(base_url="http://mock/v1/chat/completions", api_key="mock", model="mock")
+            deltas = [
+                delta
+                async for delta in stream_chat_completions(
+                    client,
+                    cfg=cfg,
+                    system="严格输出Markdown正文",
+                    user_prompt="商圈调研",
+                    max_tokens=300,
+                    max_continuations=5,
+                    result=result,
+                )
+            ]
+        return deltas, result
+
+    deltas, result = asyncio.run(run())
+    expected = canned_markdown("market", sections=2)
+    assert "".join(deltas) == expected
+    assert result.content == expected
+    assert result.continuations >= 1
+    assert result.finish_reason == "stop"
@@ -0,0 +1,70 @@
+import re
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.services.font_assets import CACHE_CONTROL, SUBSET_FLAVOR, FontAssets
+
+FONTS_DIR = Path(__file__).resolve().parents[1] / "assets" / "fonts"
+
+
+def _client(monkeypatch, subsets: bool) -> TestClient:
+    monkeypatch.setenv("PREVIEW_FONT_SUBSETS", "1" if subsets else "0")
+    from app.main import create_app
+
+    return TestClient(create_app())
+
+
+def _preview(client: TestClient) -> str:
+    res = client.post("/api/reports/preview", json={"module": "brand", "markdown": "# 标题\n**门店**曝光量环比提升"})
+    assert res.status_code == 200
+    return res.text
+
+
+def test_preview_references_hashed_font_urls(monkeypatch):
+    client = _client(monkeypatch, subsets=False)
+    html = _preview(client)
+    assert "base64" not in html
+    assert len(html.encode("utf-8")) < 50_000
+    urls = re.findall(r'url\("(/api/assets/fonts/[^"]+)"\)', html)
+    assert len(urls) == 2 and "/subset/" not in html
+
+    res = client.get(urls[0])
+    assert res.status_code == 200
+    assert res.headers["cache-control"] == CACHE_CONTROL
+    assert res.content == (FONTS_DIR / "NotoSansSC-Regular.otf").read_bytes()
+    assert client.get(urls[0], headers={"If-None-Match": res.headers["etag"]}).status_code == 304
+    assert client.get("/api/assets/fonts/NotoSansSC-Regular.0000000000000000.otf").status_code == 404
+
+
+def test_preview_font_urls_use_public_base_url_not_request_host(monkeypatch):
+    monkeypatch.setenv("PUBLIC_BASE_URL", "https://report.example.com/")
+    html = _preview(_client(monkeypatch, subsets=False))
+    assert "testserver" not in html
+    assert len(re.findall(r'url\("https://report\.example\.com/api/assets/fonts/[^"]+"\)', html)) == 2
+
+
+def test_subset_font_served_lazily_and_cached(monkeypatch):
+    client = _client(monkeypatch, subsets=True)
+    html = _preview(client)
+    subset_urls = re.findall(r'url\("(/api/assets/fonts/subset/[^"]+)"\)', html)
+    assert len(subset_urls) == 2
+    assert subset_urls == re.findall(r'url\("(/api/assets/fonts/subset/[^"]+)"\)', _preview(client))
+
+    regular = next(u for u in subset_urls if "-regular." in u)
+    first = client.get(regular)
+    assert first.status_code == 200
+    assert first.headers["content-type"] == f"font/{SUBSET_FLAVOR}"
+    assert len(first.content) < 200_000
+    assert client.get(regular).content == first.content
+    stats = client.get("/api/metrics").json()["font_assets"]
+    assert stats["subsets_built"] == 1
+    assert client.get(f"/api/assets/fonts/subset/ffffffffffffffff-regular.{SUBSET_FLAVOR}").status_code == 404
+
+
+def test_register_subset_key_depends_on_characters_only():
+    assets = FontAssets(FONTS_DIR, subset_cache_size=1)
+    assert assets.register_subset("门店曝光") == assets.register_subset("曝光门店店")
+    old = assets.register_subset("甲")
+    assets.register_subset("乙")
+    assert assets.subset_bytes(old, "regular") is None
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fontTools")
+
+from fontTools import subset  # noqa: E402
+from reportlab.pdfbase.ttfonts import TTFont  # noqa: E402
+
+from app.domain.report_schema import ReportData  # noqa: E402
+from app.mock_upstream import canned_report  # noqa: E402
+import app.services.reportlab.font_bundle as font_bundle  # noqa: E402
+from app.services.reportlab.font_bundle import FONT_STEMS, bundle_path, convert_otf_to_ttf, ensure_font_bundle  # noqa: E402
+from app.services.reportlab.pdf_builder import build_pdf_bytes  # noqa: E402
+from app.services.reportlab.theme import FONT_BUNDLE_DIR, FONTS_DIR, get_fonts  # noqa: E402
+
+
+def _small_otf(tmp_path: Path) -> Path:
+    out = tmp_path / "NotoSansSC-Regular.otf"
+    options = subset.Options()
+    font = subset.load_font(str(FONTS_DIR / "NotoSansSC-Regular.otf"), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text="品牌定位报告ABC123")
+    subsetter.subset(font)
+    subset.save_font(font, str(out), options)
+    return out
+
+
+def test_convert_otf_to_ttf_loads_in_reportlab(tmp_path):
+    source = _small_otf(tmp_path)
+    target = bundle_path(tmp_path / "bundle", source)
+    convert_otf_to_ttf(source, target)
+    font = TTFont("BundleTest", str(target))
+    assert font.stringWidth("品牌", 10) > 0
+    assert list((tmp_path / "bundle").iterdir()) == [target]
+
+
+def test_ensure_font_bundle_returns_none_without_sources(tmp_path):
+    assert ensure_font_bundle(tmp_path, tmp_path / "bundle") is None
+
+
+def test_read_only_bundle_dir_skips_conversion(tmp_path, monkeypatch):
+    def fail(*_args, **_kwargs):
+        raise AssertionError("不应在只读目录上转换")
+
+    monkeypatch.setattr(font_bundle, "convert_otf_to_ttf", fail)
+    blocker = tmp_path / "readonly"
+    blocker.write_text("")
+    assert ensure_font_bundle(FONTS_DIR, blocker / "bundle") is None
+
+
+def test_signature_ignores_mtime(tmp_path):
+    source = _small_otf(tmp_path)
+    before = bundle_path(tmp_path, source)
+    os.utime(source, (0, 0))
+    assert bundle_path(tmp_path, source) == before
+
+
+def test_committed_bundle_matches_sources():
+    # 更换 .otf 后需执行 python -m app.services.reportlab.font_bundle 并提交结果
+    for stem in FONT_STEMS:
+        assert bundle_path(FONT_BUNDLE_DIR, FONTS_DIR / f"{stem}.otf").exists()
+
+
+def test_pdf_embeds_subset_of_bundled_font():
+    assert get_fonts() == ("NotoSansSC", "NotoSansSC-Bold")
+    pdf = build_pdf_bytes(ReportData.model_validate(canned_report("brand", sections=2)), module="brand")
+    assert b"/FontFile2" in pdf
+    assert b"STSong-Light" not in pdf
+    assert len(pdf) < 500_000
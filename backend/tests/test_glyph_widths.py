@@ -0,0 +1,44 @@
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import Paragraph
+
+from app.services.reportlab.glyph_widths import CJKParagraph, get_width_table, load_width_table
+from app.services.reportlab.theme import get_fonts
+
+TEXT = "外卖店铺曝光转化与复购提升方案，覆盖午晚高峰满减梯度及配送时效 ABC 123。" * 6
+
+
+def test_width_table_matches_font_metrics():
+    font_name, _ = get_fonts()
+    table = get_width_table(font_name)
+    assert table is not None
+    original = type(pdfmetrics.getFont(font_name)).stringWidth
+    expected = original(pdfmetrics.getFont(font_name), TEXT, 11)
+    assert abs(pdfmetrics.stringWidth(TEXT, font_name, 11) - expected) < 1e-3
+    assert abs(table.string_width("😀字", 11) - original(pdfmetrics.getFont(font_name), "😀字", 11)) < 1e-3
+
+
+def test_width_table_cached_and_memory_mapped(tmp_path):
+    font_name, _ = get_fonts()
+    first = load_width_table(font_name, tmp_path)
+    assert first.source == "mmap"
+    assert len(list(tmp_path.glob("*.widths"))) == 1
+    second = load_width_table(font_name, tmp_path)
+    assert second.source == "mmap"
+    assert second.char_widths("字a", 10) == first.char_widths("字a", 10)
+
+
+def test_width_table_falls_back_to_memory_when_cache_unwritable(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("x")
+    table = load_width_table(get_fonts()[0], blocker / "cache")
+    assert table.source == "memory"
+
+
+def test_cjk_paragraph_breaks_like_reportlab():
+    font_name, _ = get_fonts()
+    style = ParagraphStyle("t", fontName=font_name, fontSize=11, leading=18, wordWrap="CJK")
+    fast = CJKParagraph(TEXT, style)
+    slow = Paragraph(TEXT, style)
+    assert fast.wrap(300, 1000) == slow.wrap(300, 1000)
+    assert [line[1] for line in fast.blPara.lines] == [line[1] for line in slow.blPara.lines]
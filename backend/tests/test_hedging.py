@@ -0,0 +1,243 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.hedging import HedgePolicy, LatencyTracker, build_upstream_targets, hedged_call, hedged_stream
+from app.services.upstream_llm import UpstreamConfig, UpstreamError
+from app.settings import Settings
+
+PRIMARY = UpstreamConfig(base_url="https://a.test/v1/chat/completions", api_key="k", model="primary")
+BACKUP = UpstreamConfig(base_url="https://a.test/v1/chat/completions", api_key="k", model="backup")
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker()
+    for value in range(1, 101):
+        tracker.record(float(value))
+    assert tracker.percentile(0.95) == 95.0
+    assert tracker.percentile(0.5) == 50.0
+
+
+def test_policy_uses_default_delay_until_enough_samples():
+    policy = HedgePolicy(min_samples=3, default_delay_seconds=9.0)
+    assert policy.delay_for("m") == 9.0
+    for value in (1.0, 2.0, 3.0):
+        policy.record("m", value)
+    assert policy.delay_for("m") == 3.0
+    assert HedgePolicy(enabled=False).delay_for("m") is None
+
+
+def test_build_targets_from_module_settings():
+    settings = Settings(
+        upstream_hedge_model_default="fallback-a",
+        upstream_hedge_model_market="fallback-b, fallback-c",
+        upstream_hedge_base_url="https://b.test/v1/chat/completions",
+    )
+    brand = build_upstream_targets(settings, "brand", PRIMARY)
+    market = build_upstream_targets(settings, "market", PRIMARY)
+    assert [t.model for t in brand] == ["primary", "fallback-a"]
+    assert [t.model for t in market] == ["primary", "fallback-b", "fallback-c"]
+    assert market[1].base_url == "https://b.test/v1/chat/completions"
+    assert market[1].api_key == "k"
+
+
+def test_hedge_fires_backup_and_cancels_slow_primary():
+    policy = HedgePolicy(min_samples=1, default_delay_seconds=0.02)
+    cancelled = {"primary": False}
+
+    async def call(cfg):
+        if cfg.model == "primary":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled["primary"] = True
+                raise
+        await asyncio.sleep(0.01)
+        return cfg.model
+
+    async def run():
+        result = await hedged_call([PRIMARY, BACKUP], call, policy=policy)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "backup"
+    assert cancelled["primary"] is True
+    assert policy.hedges_total == 1
+    assert policy.hedge_wins == 1
+
+
+def test_failover_on_upstream_error_without_hedge():
+    policy = HedgePolicy(enabled=False)
+
+    async def call(cfg):
+        if cfg.model == "primary":
+            raise UpstreamError("上游接口返回错误: 429")
+        return "ok"
+
+    assert asyncio.run(hedged_call([PRIMARY, BACKUP], call, policy=policy)) == "ok"
+    assert policy.failovers_total == 1
+
+
+def test_all_targets_fail_raises_last_error():
+    policy = HedgePolicy(enabled=False)
+
+    async def call(cfg):
+        raise UpstreamError(f"{cfg.model} 失败")
+
+    try:
+        asyncio.run(hedged_call([PRIMARY, BACKUP], call, policy=policy))
+    except UpstreamError as e:
+        assert "backup" in str(e)
+    else:
+        raise AssertionError("expected UpstreamError")
+
+
+def test_losing_requests_finish_cleanup_before_return():
+    policy = HedgePolicy(min_samples=1, default_delay_seconds=0.02)
+    cleaned = {"primary": False}
+
+    async def call(cfg):
+        if cfg.model == "primary":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                await asyncio.sleep(0)  # 模拟释放准入名额/连接的异步清理
+                cleaned["primary"] = True
+                raise
+        return cfg.model
+
+    async def run():
+        result = await hedged_call([PRIMARY, BACKUP], call, policy=policy)
+        return result, cleaned["primary"]
+
+    assert asyncio.run(run()) == ("backup", True)
+
+
+def test_next_hedge_waits_only_remaining_delay_after_backup_fails():
+    policy = HedgePolicy(min_samples=1, default_delay_seconds=0.3)
+    third = UpstreamConfig(base_url="https://hedge.test", api_key="k", model="third")
+    launched: dict[str, float] = {}
+
+    async def call(cfg):
+        launched[cfg.model] = time.monotonic()
+        if cfg.model == "primary":
+            await asyncio.sleep(5)
+        if cfg.model == "backup":
+            await asyncio.sleep(0.2)
+            raise UpstreamError("backup 失败")
+        return cfg.model
+
+    assert asyncio.run(hedged_call([PRIMARY, BACKUP, third], call, policy=policy)) == "third"
+    # 第二次对冲在主请求发出后约 2 个延迟（0.6s）发出，而不是备用失败后再等一整个延迟（0.8s）
+    assert launched["third"] - launched["primary"] < 0.72
+
+
+def test_hedged_stream_fails_over_before_first_delta_only():
+    policy = HedgePolicy(enabled=False)
+    closed: list[str] = []
+
+    def open_stream(cfg):
+        async def stream():
+            try:
+                if cfg.model == "primary":
+                    raise UpstreamError("primary down")
+                yield "a"
+                yield "b"
+            finally:
+                closed.append(cfg.model)
+
+        return stream()
+
+    async def run():
+        cfg, deltas = await hedged_stream([PRIMARY, BACKUP], open_stream, policy=policy)
+        return cfg, [d async for d in deltas]
+
+    cfg, deltas = asyncio.run(run())
+    assert cfg is BACKUP
+    assert deltas == ["a", "b"]
+    assert closed == ["primary", "backup"]
+    assert policy.failovers_total == 1
+
+    def broken_midway(cfg):
+        async def stream():
+            yield "a"
+            raise UpstreamError(f"{cfg.model} cut off")
+
+        return stream()
+
+    async def run_midway():
+        cfg, deltas = await hedged_stream([PRIMARY, BACKUP], broken_midway, policy=policy)
+        return [d async for d in deltas]
+
+    with pytest.raises(UpstreamError, match="primary cut off"):
+        asyncio.run(run_midway())
+
+
+def test_hedged_stream_races_first_delta_and_closes_loser():
+    policy = HedgePolicy(min_samples=1, default_delay_seconds=0.02)
+    closed: list[str] = []
+
+    def open_stream(cfg):
+        async def stream():
+            try:
+                await asyncio.sleep(1 if cfg.model == "primary" else 0.01)
+                yield cfg.model
+            finally:
+                closed.append(cfg.model)
+
+        return stream()
+
+    async def run():
+        cfg, deltas = await hedged_stream([PRIMARY, BACKUP], open_stream, policy=policy)
+        return cfg, [d async for d in deltas]
+
+    cfg, deltas = asyncio.run(run())
+    assert cfg is BACKUP
+    assert deltas == ["backup"]
+    assert sorted(closed) == ["backup", "primary"]
+    assert policy.hedge_wins == 1
+
+
+def test_successful_losers_are_discarded():
+    policy = HedgePolicy(min_samples=1, default_delay_seconds=0.0)
+    discarded: list[str] = []
+
+    async def discard(value):
+        discarded.append(value)
+
+    async def run():
+        gate = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.05, gate.set)
+
+        async def call(cfg):
+            await gate.wait()
+            return cfg.model
+
+        winner = await hedged_call([PRIMARY, BACKUP], call, policy=policy, discard=discard)
+        return winner
+
+    winner = asyncio.run(run())
+    # 两个请求在同一轮完成：返回其一，另一个成功结果交给 discard 释放
+    assert discarded == [{"primary": "backup", "backup": "primary"}[winner]]
+
+
+def test_latency_tracked_per_call_kind_and_cache_hits_skipped():
+    from app.services.upstream_llm import ChatResult
+
+    policy = HedgePolicy(min_samples=1, default_delay_seconds=45.0)
+
+    async def fresh(cfg):
+        return ChatResult(content="{}", model=cfg.model)
+
+    async def cached(cfg):
+        return ChatResult(content="{}", model=cfg.model, cached=True)
+
+    async def run():
+        await hedged_call([PRIMARY], fresh, policy=policy, kind="json_repair")
+        await hedged_call([PRIMARY], cached, policy=policy, kind="report")
+
+    asyncio.run(run())
+    assert policy.delay_for("primary:json_repair") < 1
+    # 整篇报告未积累样本（缓存命中不计），仍用默认延迟，不受修复调用的短耗时影响
+    assert policy.delay_for("primary:report") == 45.0
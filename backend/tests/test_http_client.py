@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+
+from app.services.http_client import (
+    PoolConfig,
+    PoolStats,
+    UpstreamClientPool,
+    _MeteredTransport,
+    close_upstream_pool,
+    get_upstream_pool,
+    pool_config_from_settings,
+    upstream_pool_lifespan,
+)
+from app.settings import Settings
+
+
+def test_metered_transport_tracks_in_flight_and_totals():
+    stats = PoolStats(max_connections=1)
+    class _Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'{"ok": true}'
+
+    inner = httpx.MockTransport(lambda request: httpx.Response(200, stream=_Body()))
+    transport = _MeteredTransport(inner, stats)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            res = await client.get("https://upstream.test/v1/chat/completions")
+            assert res.json() == {"ok": True}
+
+    asyncio.run(run())
+    assert stats.requests_total == 1
+    assert stats.in_flight == 0
+    assert stats.peak_in_flight == 1
+
+
+def test_pool_config_mounts_upstream_host():
+    settings = Settings(
+        upstream_base_url="https://upstream.test/v1/chat/completions",
+        upstream_max_connections_per_host=5,
+        upstream_http2=False,
+    )
+    config = pool_config_from_settings(settings)
+    assert config.hosts == ("https://upstream.test",)
+
+    pool = UpstreamClientPool(config)
+    metrics = pool.metrics()
+    assert metrics["http2"] is False
+    assert metrics["hosts"]["https://upstream.test"]["max_connections"] == 5
+    asyncio.run(pool.aclose())
+
+
+def test_shared_pool_reused_within_loop_and_closed_by_lifespan():
+    class _App:
+        class state:  # noqa: N801 - 模拟 app.state
+            pass
+
+    async def run():
+        first = get_upstream_pool()
+        assert get_upstream_pool() is first
+        app = _App()
+        async with upstream_pool_lifespan(app):
+            assert app.state.upstream_pool is first
+        assert first.closed
+        await close_upstream_pool()
+
+    asyncio.run(run())
+
+
+def test_pool_config_defaults():
+    config = PoolConfig()
+    assert config.max_connections >= config.max_keepalive_connections
+
+
+def test_hedge_host_gets_its_own_mount_and_limits():
+    settings = Settings(
+        upstream_base_url="https://Upstream.test:443/v1/chat/completions",
+        upstream_hedge_base_url="https://hedge.test:8443/v1/chat/completions",
+        upstream_max_connections_per_host=3,
+        upstream_http2=False,
+    )
+    config = pool_config_from_settings(settings)
+    assert config.hosts == ("https://upstream.test", "https://hedge.test:8443")
+
+    pool = UpstreamClientPool(config)
+    routed = pool.client._transport_for_url(httpx.URL("https://hedge.test:8443/v1/chat/completions"))
+    assert routed is pool._transports["https://hedge.test:8443"]
+    assert pool.client._transport_for_url(httpx.URL("https://upstream.test/v1")) is pool._transports["https://upstream.test"]
+    assert pool.metrics()["hosts"]["https://hedge.test:8443"]["max_connections"] == 3
+    asyncio.run(pool.aclose())
+
+
+def test_pool_replaced_on_loop_change_closes_old_client():
+    async def first():
+        return get_upstream_pool()
+
+    async def second():
+        pool = get_upstream_pool()
+        await asyncio.sleep(0)
+        return pool
+
+    old = asyncio.run(first())
+    new = asyncio.run(second())
+    assert new is not old
+    assert old.closed
+    asyncio.run(close_upstream_pool())
@@ -0,0 +1,230 @@
+import asyncio
+import io
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services import jobs as jobs_module
+from app.services.jobs import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    InMemoryJobStore,
+    Job,
+    JobManager,
+    JobQueueFull,
+    SQLiteJobStore,
+)
+from app.services.pdf_delivery import PdfSpool
+
+
+async def _fake_runner(*, module, payload, screenshot_data_url, bypass_cache, on_stage):
+    for stage in ["prompt", "upstream", "parse", "validate", "render"]:
+        on_stage(stage)
+        await asyncio.sleep(0)
+    return PdfSpool(io.BytesIO(b"%PDF-" + module.encode()))
+
+
+def _read_result(store, job_id: str) -> bytes | None:
+    spool = store.open_result(job_id)
+    if spool is None:
+        return None
+    try:
+        return spool.read_bytes()
+    finally:
+        spool.close()
+
+
+async def _wait_finished(manager: JobManager, job_id: str) -> list[tuple[str, str]]:
+    return [(job.status, job.stage) async for job in manager.watch(job_id, poll_seconds=0.05)]
+
+
+def test_job_runs_through_stages_and_stores_pdf(tmp_path):
+    async def run():
+        manager = JobManager(InMemoryJobStore(result_dir=tmp_path), workers=1, runner=_fake_runner)
+        job = await manager.submit(module="brand", payload={"storeName": "A"})
+        seen = await asyncio.wait_for(_wait_finished(manager, job.id), timeout=2)
+        await manager.aclose()
+        return manager, job, seen
+
+    manager, job, seen = asyncio.run(run())
+    assert seen[0][0] in {JOB_QUEUED, JOB_RUNNING}
+    assert seen[-1][0] == JOB_DONE
+    assert _read_result(manager.store, job.id) == b"%PDF-brand"
+    assert (tmp_path / f"{job.id}.pdf").read_bytes() == b"%PDF-brand"
+    assert manager.metrics()["completed_total"] == 1
+
+
+def test_failed_job_records_error():
+    async def failing(**_kwargs):
+        raise RuntimeError("上游失败")
+
+    async def run():
+        manager = JobManager(InMemoryJobStore(), runner=failing)
+        job = await manager.submit(module="brand", payload={})
+        await asyncio.wait_for(_wait_finished(manager, job.id), timeout=2)
+        await manager.aclose()
+        return manager.store.get(job.id)
+
+    job = asyncio.run(run())
+    assert job.status == JOB_FAILED
+    assert job.error == "上游失败"
+
+
+def test_submit_rejected_when_queue_full():
+    async def run():
+        release = asyncio.Event()
+
+        async def blocking(**_kwargs):
+            await release.wait()
+            return PdfSpool(io.BytesIO(b"%PDF"))
+
+        manager = JobManager(InMemoryJobStore(), workers=1, queue_size=1, runner=blocking)
+        await manager.submit(module="brand", payload={})
+        await asyncio.sleep(0.01)
+        await manager.submit(module="brand", payload={})
+        try:
+            await manager.submit(module="brand", payload={})
+        except JobQueueFull:
+            rejected = True
+        else:
+            rejected = False
+        release.set()
+        await manager.aclose()
+        return rejected, manager.metrics()
+
+    rejected, metrics = asyncio.run(run())
+    assert rejected
+    assert metrics["rejected_total"] == 1
+
+
+def test_sqlite_store_requeues_unfinished_jobs_after_restart(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    store = SQLiteJobStore(path)
+    store.create(Job(id="j1", module="market", payload={"areaName": "漕河泾"}, screenshot=b"\xff\xd8"))
+    store.update("j1", status=JOB_RUNNING, stage="upstream")
+    store.close()
+
+    seen: dict = {}
+
+    async def runner(**kwargs):
+        seen.update(kwargs)
+        return PdfSpool(io.BytesIO(b"%PDF"))
+
+    async def run():
+        manager = JobManager(SQLiteJobStore(path), runner=runner)
+        manager.start()
+        await asyncio.wait_for(_wait_finished(manager, "j1"), timeout=2)
+        await manager.aclose()
+        return manager.store
+
+    store = asyncio.run(run())
+    assert store.get("j1").status == JOB_DONE
+    assert _read_result(store, "j1") == b"%PDF"
+    assert (tmp_path / "jobs-results" / "j1.pdf").exists()
+    assert seen["payload"] == {"areaName": "漕河泾"}
+    assert seen["screenshot_data_url"].data == b"\xff\xd8"
+
+
+def test_expired_jobs_remove_result_files(tmp_path, monkeypatch):
+    now = time.time()
+    stores = [
+        InMemoryJobStore(ttl_seconds=60, result_dir=tmp_path / "mem"),
+        SQLiteJobStore(tmp_path / "jobs.sqlite3", ttl_seconds=60),
+    ]
+    for store in stores:
+        store.create(Job(id="old", module="brand", payload={}))
+        store.set_result("old", PdfSpool(io.BytesIO(b"%PDF-old")))
+        store.update("old", status=JOB_DONE)
+        path = store.results.path("old")
+        assert path.exists()
+
+        monkeypatch.setattr(time, "time", lambda: now + 120)
+        store.create(Job(id="new", module="brand", payload={}))
+        monkeypatch.undo()
+        assert store.get("old") is None
+        assert store.open_result("old") is None
+        assert not path.exists()
+
+
+def test_job_routes_submit_poll_events_and_download(monkeypatch):
+    from app.main import create_app
+
+    manager = JobManager(InMemoryJobStore(), runner=_fake_runner)
+    monkeypatch.setattr(jobs_module, "_MANAGER", manager)
+
+    with TestClient(create_app()) as client:
+        res = client.post(
+            "/api/jobs",
+            data={"module": "brand", "payload_json": json.dumps({"storeName": "测试店"}, ensure_ascii=False)},
+        )
+        assert res.status_code == 202
+        job_id = res.json()["job_id"]
+
+        with client.stream("GET", f"/api/jobs/{job_id}/events") as events:
+            text = "".join(events.iter_text())
+        assert "event: done" in text
+
+        status = client.get(f"/api/jobs/{job_id}").json()
+        assert status["status"] == JOB_DONE
+
+        pdf = client.get(f"/api/jobs/{job_id}/pdf")
+        assert pdf.status_code == 200
+        assert pdf.content == b"%PDF-brand"
+        assert "filename*=" in pdf.headers["content-disposition"]
+        assert pdf.headers["content-length"] == str(len(b"%PDF-brand"))
+        # 下载不会删除结果文件，可重复下载
+        assert client.get(f"/api/jobs/{job_id}/pdf").content == b"%PDF-brand"
+
+        assert client.get("/api/jobs/missing").status_code == 404
+        assert client.post("/api/jobs", json={"module": "unknown", "payload": {}}).status_code == 400
+
+
+def test_default_result_dir_removed_on_close():
+    store = InMemoryJobStore()
+    store.create(Job(id="j1", module="brand", payload={}))
+    store.set_result("j1", PdfSpool(io.BytesIO(b"%PDF")))
+    directory = store.results.directory
+    assert (directory / "j1.pdf").exists()
+    store.close()
+    assert not directory.exists()
+
+
+def test_sqlite_store_drops_legacy_pdf_column(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "jobs.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE report_jobs (id TEXT PRIMARY KEY, module TEXT NOT NULL, payload TEXT NOT NULL, screenshot BLOB, "
+        "no_cache INTEGER NOT NULL, status TEXT NOT NULL, stage TEXT NOT NULL, error TEXT NOT NULL, "
+        "created_at REAL NOT NULL, updated_at REAL NOT NULL, pdf BLOB)"
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteJobStore(path)
+    store.create(Job(id="j1", module="brand", payload={}))
+    columns = {row[1] for row in store._conn.execute("PRAGMA table_info(report_jobs)")}
+    store.close()
+    assert "pdf" not in columns
+    assert "screenshot" in columns
+
+
+def test_submit_rejects_oversized_screenshot(monkeypatch):
+    from app.main import create_app
+
+    monkeypatch.setenv("MAX_UPLOAD_MB", "1")
+    manager = JobManager(InMemoryJobStore(), runner=_fake_runner)
+    monkeypatch.setattr(jobs_module, "_MANAGER", manager)
+
+    with TestClient(create_app()) as client:
+        res = client.post(
+            "/api/jobs",
+            data={"module": "market", "payload_json": "{}"},
+            files={"screenshot": ("s.png", b"\0" * (1024 * 1024 + 1), "image/png")},
+        )
+    assert res.status_code == 413
+    assert manager.metrics()["submitted_total"] == 0
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.mock_upstream import canned_report
+from app.services import json_codec
+from app.services.report_service import _validate_fast
+from app.services.upstream_llm import UpstreamConfig, UpstreamError, chat_completions
+
+
+def test_loads_accepts_str_and_bytes_and_raises_decode_error():
+    assert json_codec.loads('{"a": "中文"}') == {"a": "中文"}
+    assert json_codec.loads('{"a": 1}'.encode()) == {"a": 1}
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads("{bad")
+
+
+def test_loads_falls_back_for_inputs_only_stdlib_accepts():
+    assert json_codec.loads('{"n": NaN}')["n"] != json_codec.loads('{"n": NaN}')["n"]
+
+
+def test_validate_fast_reads_fenced_json_directly():
+    text = "```json\n" + json.dumps(canned_report("brand", sections=2), ensure_ascii=False) + "\n```"
+    report = _validate_fast(text)
+    assert report is not None
+    assert len(report.sections) == 2
+
+
+def test_validate_fast_returns_none_for_tolerant_parser_cases():
+    assert _validate_fast('{"cover": {}, "sections": [],}') is None
+    assert _validate_fast('{"cover": {"store_name": "A"}, "sections": []}') is None
+
+
+def test_upstream_envelope_decoded_with_codec():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"not json")
+
+    async def run():
+        cfg = UpstreamConfig(base_url="https://upstream.test/v1/chat/completions", api_key="k", model="m")
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await chat_completions(client, cfg=cfg, system="S", user_prompt="P")
+
+    with pytest.raises(UpstreamError, match="非JSON"):
+        asyncio.run(run())
@@ -1,4 +1,10 @@
-from app.services.json_parser import parse_json_text
+import asyncio
+import json
+
+import pytest
+
+from app.services.json_parser import get_repair_stats, parse_json_text, repair_json_text
+from app.services.upstream_llm import UpstreamConfig
 
 
 def test_parse_json_text_strips_code_fence():
@@ -33,3 +39,68 @@ def test_parse_json_text_strips_plain_json_label_with_colon():
     )
     data = parse_json_text(raw)
     assert data["cover"]["report_subtitle"] == "C"
+
+
+def _report_text(sections: int) -> str:
+    return json.dumps(
+        {
+            "cover": {
+                "store_name": "A",
+                "report_title": "B",
+                "report_subtitle": "C",
+                "business_line": "D",
+                "period_text": "E",
+                "plan_date": "F",
+            },
+            "sections": [
+                {"title": f"S{i}", "summary": "概要", "blocks": [{"type": "paragraph", "text": "正文"}]}
+                for i in range(sections)
+            ],
+        },
+        ensure_ascii=False,
+    )
+
+
+def test_repair_trailing_commas_and_fullwidth_delimiters():
+    assert repair_json_text('{"a": [1, 2,], "b": {"c": 1,},}') == {"a": [1, 2], "b": {"c": 1}}
+    assert repair_json_text('{“title”：“标题”，"items"：［"甲"，"乙"］｝') == {"title": "标题", "items": ["甲", "乙"]}
+
+
+def test_repair_document_opening_with_fullwidth_delimiter():
+    assert repair_json_text("｛“a”：1｝") == {"a": 1}
+    assert repair_json_text("［1，2］") == [1, 2]
+    assert repair_json_text("输出如下：｛“a”：［1，2，") == {"a": [1, 2]}
+
+
+def test_repair_unescaped_quotes_newlines_and_backslashes():
+    data = repair_json_text('{"text": "他说"好的"\n然后\t继续", "path": "C:\\目录"}')
+    assert data == {"text": '他说"好的"\n然后\t继续', "path": "C:\\目录"}
+
+
+def test_repair_salvages_complete_sections_from_truncated_output():
+    full = _report_text(3)
+    cut = full[: full.index('"S2"') + 10]
+    data = repair_json_text("```json\n" + cut)
+    assert [s["title"] for s in data["sections"]] == ["S0", "S1"]
+    assert data["cover"]["store_name"] == "A"
+
+
+def test_repair_raises_when_nothing_recoverable():
+    with pytest.raises(json.JSONDecodeError):
+        repair_json_text("模型没有输出 JSON")
+
+
+def test_repair_report_data_prefers_local_repair(monkeypatch):
+    from app.services import report_service
+
+    async def fail_repair(*_args, **_kwargs):
+        raise AssertionError("不应调用上游修复")
+
+    monkeypatch.setattr(report_service, "_repair_json", fail_repair)
+    stats = get_repair_stats()
+    before = stats.local_hits
+    raw = _report_text(2)[:-30]
+    targets = [UpstreamConfig(base_url="https://example.test", api_key="k", model="m")]
+    data = asyncio.run(report_service._repair_report_data(None, targets, "brand", raw))
+    assert len(data["sections"]) == 1
+    assert stats.local_hits == before + 1
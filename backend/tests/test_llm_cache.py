@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.llm_cache import LLMCache, MemoryLRUCache, SQLiteCache, cache_key
+from app.services.upstream_llm import UpstreamConfig, chat_completions
+
+
+def test_cache_key_stable_and_ignores_stream_flag():
+    a = {"model": "m", "messages": [{"role": "user", "content": "你好"}], "temperature": 0.8, "stream": False}
+    b = {"stream": True, "temperature": 0.8, "messages": [{"role": "user", "content": "你好"}], "model": "m"}
+    assert cache_key(a) == cache_key(b)
+    assert cache_key(a) != cache_key({**a, "temperature": 0.2})
+
+
+def test_memory_lru_evicts_oldest_and_expires(monkeypatch):
+    cache = MemoryLRUCache(max_entries=2, ttl_seconds=10)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_persists_and_backfills_memory(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    disk = SQLiteCache(path, max_entries=2, ttl_seconds=60)
+    disk.set("a", "1")
+    disk.set("b", "2")
+    disk.set("c", "3")
+    assert len(disk) == 2
+    disk.close()
+
+    cache = LLMCache(MemoryLRUCache(max_entries=4, ttl_seconds=60), SQLiteCache(path, max_entries=2, ttl_seconds=60))
+    assert cache.get("c") == "3"
+    assert cache.hits_disk == 1
+    assert cache.get("c") == "3"
+    assert cache.hits_memory == 1
+
+
+def test_chat_completions_uses_cache_and_bypass():
+    calls = {"n": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"第{calls['n']}次"}}]})
+
+    cache = LLMCache(MemoryLRUCache(max_entries=8, ttl_seconds=60))
+    cfg = UpstreamConfig(base_url="https://upstream.test/v1/chat/completions", api_key="k", model="m")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await chat_completions(client, cfg=cfg, system="S", user_prompt="P", cache=cache)
+            second = await chat_completions(client, cfg=cfg, system="S", user_prompt="P", cache=cache)
+            third = await chat_completions(
+                client, cfg=cfg, system="S", user_prompt="P", cache=cache, bypass_cache=True
+            )
+            return first, second, third
+
+    assert asyncio.run(run()) == ("第1次", "第1次", "第2次")
+    assert calls["n"] == 2
+    assert json.dumps(cache.metrics())
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.domain.report_schema import ReportData
+from app.mock_upstream import MockUpstreamSettings, canned_report, create_mock_app, detect_module
+from app.services.report_service import generate_pdf_bytes
+from app.services.upstream_llm import UpstreamConfig, UpstreamError, chat_completions, stream_chat_completions
+
+CFG = UpstreamConfig(base_url="http://mock/v1/chat/completions", api_key="mock", model="mock-model")
+
+
+def _mock_client(**overrides) -> tuple[httpx.AsyncClient, object]:
+    settings = MockUpstreamSettings(**{"latency_ms": 0, "tokens_per_second": 0, "seed": 1, **overrides})
+    app = create_mock_app(settings)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app)), app.state.mock
+
+
+def test_detect_module_and_canned_report_schema():
+    assert detect_module("请输出一份商圈调研分析报告") == "market"
+    assert detect_module("数据统计分析") == "data-statistics"
+    for module in ["brand", "market", "store-activity", "data-statistics"]:
+        ReportData.model_validate(canned_report(module, sections=2))
+
+
+def test_non_streaming_returns_report_json():
+    async def run():
+        client, mock = _mock_client()
+        async with client:
+            text = await chat_completions(client, cfg=CFG, system="请严格按照JSON规则输出", user_prompt="品牌定位分析")
+        return text, mock
+
+    text, mock = asyncio.run(run())
+    assert ReportData.model_validate(json.loads(text)).cover.report_title == "品牌定位分析方案"
+    assert mock.metrics()["requests_total"] == 1
+
+
+def test_streaming_returns_markdown_deltas():
+    async def run():
+        client, _mock = _mock_client(chunk_chars=8)
+        async with client:
+            return [
+                delta
+                async for delta in stream_chat_completions(
+                    client, cfg=CFG, system="严格输出Markdown正文", user_prompt="外卖店铺活动方案"
+                )
+            ]
+
+    deltas = asyncio.run(run())
+    assert len(deltas) > 10
+    assert "".join(deltas).startswith("# 外卖店铺活动方案")
+
+
+def test_rate_limit_injection_sets_retry_after():
+    async def run():
+        client, mock = _mock_client(rate_limit_rate=1.0, retry_after_seconds=3)
+        async with client:
+            res = await client.post(str(CFG.base_url), json={"model": "m", "messages": []})
+        return res, mock
+
+    res, mock = asyncio.run(run())
+    assert res.status_code == 429
+    assert res.headers["retry-after"] == "3"
+    assert mock.metrics()["rate_limited_total"] == 1
+
+
+def test_error_and_truncation_injection():
+    async def run():
+        client, _mock = _mock_client(error_rate=1.0)
+        async with client:
+            with pytest.raises(UpstreamError):
+                await chat_completions(client, cfg=CFG, system="JSON", user_prompt="品牌定位")
+        client, _mock = _mock_client(truncate_rate=1.0)
+        async with client:
+            return await chat_completions(client, cfg=CFG, system="JSON", user_prompt="品牌定位")
+
+    text = asyncio.run(run())
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+
+
+def test_max_tokens_truncates_with_length_finish_reason():
+    async def run():
+        client, _mock = _mock_client()
+        async with client:
+            res = await client.post(
+                str(CFG.base_url),
+                json={"model": "m", "max_tokens": 50, "messages": [{"role": "user", "content": "品牌定位"}]},
+            )
+        return res.json()
+
+    data = asyncio.run(run())
+    assert data["choices"][0]["finish_reason"] == "length"
+    assert data["usage"]["completion_tokens"] <= 50
+
+
+def test_generate_pdf_end_to_end_against_mock(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_API_KEY", "mock")
+    monkeypatch.setenv("UPSTREAM_BASE_URL", CFG.base_url)
+
+    stages: list[str] = []
+
+    async def run():
+        client, _mock = _mock_client(sections=2)
+        async with client:
+            return await generate_pdf_bytes(
+                module="data-statistics",
+                payload={"storeName": "测试店"},
+                client=client,
+                bypass_cache=True,
+                on_stage=stages.append,
+            )
+
+    assert asyncio.run(run()).startswith(b"%PDF")
+    assert stages == ["prompt", "upstream", "parse", "validate", "render"]
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.domain.report_schema import ReportData
+from app.mock_upstream import MockUpstreamSettings, canned_report, create_mock_app
+from app.prompts.outline import build_outline_prompt, build_section_prompt
+from app.services.outline_generation import (
+    PHASE_OUTLINE,
+    OutlineGenerationError,
+    generate_outlined_report,
+    parse_outline,
+)
+from app.services.report_service import generate_pdf_bytes
+
+REPORT = canned_report("brand", sections=3)
+OUTLINE = {
+    "cover": REPORT["cover"],
+    "sections": [{"title": s["title"], "summary": s["summary"]} for s in REPORT["sections"]],
+}
+
+
+def _section_index(prompt: str) -> int:
+    for idx, section in enumerate(OUTLINE["sections"]):
+        if f"第 {idx + 1} 章" in prompt:
+            return idx
+    raise AssertionError("未找到章节序号")
+
+
+def test_prompts_split_outline_and_sections():
+    outline_prompt = build_outline_prompt("brand", {"storeName": "测试店"})
+    assert "只输出报告大纲" in outline_prompt
+    assert "测试店" in outline_prompt
+    section_prompt = build_section_prompt("brand", {"storeName": "测试店"}, OUTLINE, 1)
+    assert "第 2 章" in section_prompt
+    assert OUTLINE["sections"][1]["title"] in section_prompt
+    assert "顶层字段：cover、sections" not in section_prompt
+
+
+def test_parse_outline_drops_blocks_and_requires_sections():
+    outline = parse_outline(json.dumps(REPORT, ensure_ascii=False))
+    assert outline["sections"][0] == OUTLINE["sections"][0]
+    with pytest.raises(OutlineGenerationError):
+        parse_outline(json.dumps({"cover": REPORT["cover"], "sections": []}))
+
+
+def test_sections_run_concurrently_and_failed_section_is_retried_alone():
+    calls: list[tuple[int, bool]] = []
+    active = {"now": 0, "peak": 0}
+
+    async def call(prompt: str, phase: str, is_retry: bool) -> str:
+        if phase == PHASE_OUTLINE:
+            return json.dumps(OUTLINE, ensure_ascii=False)
+        idx = _section_index(prompt)
+        calls.append((idx, is_retry))
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        if idx == 1 and not is_retry:
+            return '{"blocks": [{"type": "unknown"}]}'
+        return json.dumps({"blocks": REPORT["sections"][idx]["blocks"]}, ensure_ascii=False)
+
+    stages: list[str] = []
+    data = asyncio.run(
+        generate_outlined_report(call, module="brand", payload={}, concurrency=2, retries=1, on_stage=stages.append)
+    )
+
+    assert ReportData.model_validate(data).model_dump() == ReportData.model_validate(REPORT).model_dump()
+    assert stages == ["sections"]
+    assert active["peak"] == 2
+    assert sorted(calls) == [(0, False), (1, False), (1, True), (2, False)]
+
+
+def test_section_failure_after_retries_raises():
+    async def call(prompt: str, phase: str, is_retry: bool) -> str:
+        if phase == PHASE_OUTLINE:
+            return json.dumps(OUTLINE, ensure_ascii=False)
+        return "不是JSON"
+
+    with pytest.raises(OutlineGenerationError):
+        asyncio.run(generate_outlined_report(call, module="brand", payload={}, retries=1))
+
+
+def test_generate_pdf_outline_mode_against_mock(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_API_KEY", "mock")
+    monkeypatch.setenv("UPSTREAM_BASE_URL", "http://mock/v1/chat/completions")
+
+    stages: list[str] = []
+
+    async def run():
+        app = create_mock_app(MockUpstreamSettings(latency_ms=0, tokens_per_second=0, sections=3, seed=1))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+            pdf = await generate_pdf_bytes(
+                module="store-activity",
+                payload={"storeName": "测试店"},
+                client=client,
+                bypass_cache=True,
+                on_stage=stages.append,
+                mode="outline",
+            )
+        return pdf, app.state.mock.metrics()
+
+    pdf, metrics = asyncio.run(run())
+    assert pdf.startswith(b"%PDF")
+    assert stages == ["prompt", "outline", "sections", "validate", "render"]
+    assert metrics["requests_total"] == 4
@@ -0,0 +1,109 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.index as api_index
+from app.domain.report_schema import ReportData
+from app.main import create_app
+from app.mock_upstream import canned_report
+from app.services.pdf_delivery import PdfSpool, new_spool, pdf_streaming_response, reserve_spool_path, spool_for_path
+from app.services.render_executor import RenderExecutor
+
+
+def test_render_to_file_spills_large_pdf_to_disk(monkeypatch):
+    monkeypatch.setenv("PDF_SPOOL_MAX_MEMORY_BYTES", "1024")
+    report = ReportData.model_validate(canned_report("brand", sections=2))
+    executor = RenderExecutor(workers=0)
+    spool = asyncio.run(executor.render_to_file(report, module="brand"))
+    try:
+        assert spool.file._rolled
+        assert spool.read_bytes().startswith(b"%PDF")
+        assert executor.metrics()["last_pdf_bytes"] == spool.size
+    finally:
+        spool.close()
+
+
+def test_generate_streams_spool_and_closes_it(monkeypatch):
+    monkeypatch.setenv("PDF_STREAM_CHUNK_BYTES", "7")
+    spools: list[PdfSpool] = []
+
+    async def fake_generate(**_kwargs):
+        spool = PdfSpool(io.BytesIO(b"%PDF-1.4 streamed body"))
+        spools.append(spool)
+        return spool
+
+    monkeypatch.setattr(api_index, "generate_pdf_file", fake_generate)
+    client = TestClient(api_index.app)
+    response = client.post("/api/generate", data={"module": "brand", "payload_json": "{}"})
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 streamed body"
+    assert response.headers["content-length"] == str(len(b"%PDF-1.4 streamed body"))
+    assert response.headers["content-type"] == "application/pdf"
+    assert spools[0].closed
+
+
+def test_stateful_pdf_route_streams_from_spool():
+    app = create_app()
+    report_id = app.state.report_store.save(
+        {"module": "brand", "markdown": "# 标题\n\n正文内容", "meta": {"title": "品牌定位"}, "created_at": ""}
+    )
+    client = TestClient(app)
+    response = client.get(f"/api/reports/{report_id}/pdf")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+def test_spool_close_is_idempotent():
+    spool = new_spool()
+    spool.file.write(b"abc")
+    assert spool.size == 3
+    spool.close()
+    spool.close()
+    assert spool.closed
+
+
+def _path_spool(data: bytes) -> PdfSpool:
+    path = reserve_spool_path()
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return spool_for_path(path)
+
+
+def test_spool_removed_when_client_disconnects_mid_body(monkeypatch):
+    monkeypatch.setenv("PDF_STREAM_CHUNK_BYTES", "4")
+    spool = _path_spool(b"%PDF-1.4 disconnected body")
+    response = pdf_streaming_response(spool)
+    sent: list[dict] = []
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and sent:
+            raise OSError("client went away")
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    with pytest.raises(Exception):
+        asyncio.run(response(scope, receive, send))
+    assert spool.closed
+    assert not os.path.exists(spool.path)
+
+
+def test_spool_removed_when_client_disconnects_before_body():
+    spool = _path_spool(b"%PDF-1.4 never sent")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await asyncio.sleep(1)
+
+    asyncio.run(pdf_streaming_response(spool)({"type": "http", "asgi": {"spec_version": "2.3"}}, receive, send))
+    assert spool.closed
+    assert not os.path.exists(spool.path)
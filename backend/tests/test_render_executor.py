@@ -0,0 +1,61 @@
+import asyncio
+from pathlib import Path
+
+from app.domain.report_schema import ReportData
+from app.mock_upstream import canned_report
+from app.services.render_executor import RenderExecutor
+
+REPORT = ReportData.model_validate(canned_report("brand", sections=2))
+
+
+def test_thread_mode_renders_without_blocking_event_loop():
+    async def run():
+        executor = RenderExecutor(workers=0)
+        ticks = 0
+        done = False
+
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        pdf = await executor.render(REPORT, module="brand")
+        done = True
+        await task
+        return pdf, ticks, executor.metrics()
+
+    pdf, ticks, metrics = asyncio.run(run())
+    assert pdf.startswith(b"%PDF")
+    assert ticks > 1
+    assert metrics["mode"] == "thread"
+    assert metrics["completed_total"] == 1
+    assert metrics["pending"] == 0
+
+
+def test_process_pool_renders_and_recycles_workers(monkeypatch):
+    # spawn 子进程按父进程 sys.path 导入 app；其他用例可能已把 backend 目录移出
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1]))
+
+    async def run():
+        executor = RenderExecutor(workers=1, max_tasks_per_worker=2)
+        await executor.start()
+        try:
+            results = await asyncio.gather(*(executor.render(REPORT, module="market") for _ in range(3)))
+            metrics = executor.metrics()
+            spool = await executor.render_to_file(REPORT, module="market")
+            return results, metrics, spool
+        finally:
+            executor.shutdown()
+
+    results, metrics, spool = asyncio.run(run())
+    assert spool.read_bytes().startswith(b"%PDF")
+    spool.close()
+    assert not Path(spool.path).exists()
+    assert all(pdf.startswith(b"%PDF") for pdf in results)
+    assert metrics["mode"] == "process"
+    assert metrics["completed_total"] == 3
+    assert metrics["peak_pending"] == 3
+    assert metrics["queue_depth"] == 0
+    assert metrics["pool_recycles"] == 1
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.domain.report_schema import ReportData
+from app.services.report_transforms import (
+    FIELD_CELL,
+    FIELD_HEADER,
+    WHITESPACE,
+    TextTransform,
+    TransformPipeline,
+    date_transform,
+    replace_date_text,
+    sanitize_markdown,
+)
+
+NOW = datetime(2026, 1, 31, tzinfo=timezone(timedelta(hours=8)))
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("执行时间：2023年10月27日", "执行时间：2026年01月31日"),
+        ("2023年10月27", "2026年01月31日"),
+        ("2023-10-27 与 2023/1/5", "2026-01-31 与 2026/01/31"),
+        ("2023.10.27", "2026.01.31"),
+        ("周期 2023-10，对比 2023年9月", "周期 2026-01，对比 2026年01月"),
+        ("客单价 2023 元", "客单价 2023 元"),
+        ("无日期文本", "无日期文本"),
+    ],
+)
+def test_replace_date_text(raw, expected):
+    assert replace_date_text(raw, NOW) == expected
+
+
+def test_sanitize_markdown_matches_renderer_rules():
+    assert sanitize_markdown("## **核心定位**：高品质") == "核心定位：高品质"
+    assert sanitize_markdown("- __卖点__：*真材实料*") == "卖点：真材实料"
+    assert sanitize_markdown("1. 推荐使用 `满减` 策略") == "推荐使用 满减 策略"
+    assert sanitize_markdown("普通文本") == "普通文本"
+
+
+def test_whitespace_only_trims_content_fields():
+    pipeline = TransformPipeline([WHITESPACE])
+    assert pipeline.transform_text("  午高峰   曝光\n\t不足  ", FIELD_CELL) == "午高峰   曝光\n\t不足"
+    assert pipeline.transform_text("  表头  ", FIELD_HEADER) == "  表头  "
+
+
+def test_pipeline_scopes_transforms_by_field_and_skips_prechecked():
+    calls: list[str] = []
+
+    def upper(s: str) -> str:
+        calls.append(s)
+        return s.upper()
+
+    pipeline = TransformPipeline([TextTransform("upper", upper, precheck=lambda s: "x" in s, fields=frozenset({FIELD_CELL}))])
+    assert pipeline.transform_text("x1", FIELD_CELL) == "X1"
+    assert pipeline.transform_text("x1", FIELD_HEADER) == "x1"
+    assert pipeline.transform_text("y1", FIELD_CELL) == "y1"
+    assert calls == ["x1"]
+
+
+def test_pipeline_single_traversal_over_large_table():
+    rows = [[f"2023-10-{(r % 28) + 1:02d}", "**店长**", f"{r}"] for r in range(500)]
+    report = ReportData.model_validate(
+        {
+            "cover": {
+                "store_name": "A",
+                "report_title": "T",
+                "report_subtitle": "S",
+                "business_line": "B",
+                "period_text": "P",
+                "plan_date": "D",
+            },
+            "sections": [
+                {
+                    "title": "## 2023年10月 数据",
+                    "summary": "摘要",
+                    "blocks": [{"type": "table", "headers": ["**日期**", "负责人", "单量"], "rows": rows}],
+                }
+            ],
+        }
+    )
+    TransformPipeline([date_transform(NOW), WHITESPACE]).apply(report)
+    section = report.sections[0]
+    # Markdown 标记留给渲染时的 to_markup 处理，这里只替换日期
+    assert section.title == "## 2026年01月 数据"
+    table = section.blocks[0]
+    assert table.headers[0] == "**日期**"
+    assert {row[0] for row in table.rows} == {"2026-01-31"}
+    assert {row[1] for row in table.rows} == {"**店长**"}
+    assert table.rows[499][2] == "499"
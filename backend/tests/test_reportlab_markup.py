@@ -0,0 +1,41 @@
+from reportlab.platypus import Paragraph
+
+from app.services.reportlab.markup import escape_markup, to_markup, to_markup_batch
+from app.services.reportlab.tables import build_fast_table
+from app.services.reportlab.theme import get_theme_styles
+
+
+def test_bold_kept_other_markers_stripped():
+    assert to_markup("## **核心定位**：高品质") == "<b>核心定位</b>：高品质"
+    assert to_markup("- __卖点__：*真材实料*") == "<b>卖点</b>：真材实料"
+    assert to_markup("1. 推荐使用 `满减` 策略") == "推荐使用 满减 策略"
+    assert to_markup("  普通文本 ") == "普通文本"
+    assert to_markup("") == ""
+
+
+def test_special_characters_escaped_inside_and_outside_bold():
+    assert to_markup("满30减5 & 满50<减10>") == "满30减5 &amp; 满50&lt;减10&gt;"
+    assert to_markup("**A&B<C>**") == "<b>A&amp;B&lt;C&gt;</b>"
+    assert to_markup("a**b") == "a**b"
+    assert escape_markup("<店铺>&") == "&lt;店铺&gt;&amp;"
+
+
+def test_markup_parses_as_paragraph():
+    style = get_theme_styles("brand").styles["body"]
+    for raw in ("<script>", "A & B", "**粗体** < 1", "x *y* `z`"):
+        Paragraph(to_markup(raw), style).wrap(200, 200)
+
+
+def test_batch_reuses_results():
+    out = to_markup_batch(["**店长**", 12, "**店长**"])
+    assert out == ["<b>店长</b>", "12", "<b>店长</b>"]
+    assert out[0] is out[2]
+
+
+def test_table_cells_are_escaped():
+    registry = get_theme_styles("data-statistics")
+    table = build_fast_table(["**指标**", "值"], [["满减<5元", "1"], ["普通"]], registry.styles, registry.theme)
+    data = table._cellvalues
+    assert isinstance(data[0][0], Paragraph)
+    assert isinstance(data[1][0], Paragraph)
+    assert data[2] == ["普通", ""]
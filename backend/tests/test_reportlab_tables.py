@@ -0,0 +1,52 @@
+import pytest
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph
+
+from app.services.reportlab.tables import TABLE_WIDTH, _plain_text, build_fast_table, estimate_col_widths
+from app.services.reportlab.theme import get_theme_styles
+
+HEADERS = ["店铺", "月售", "主推活动与差异点"]
+
+
+def _rows(count: int) -> list[list[str]]:
+    return [[f"示例店{i}", str(100 + i), "满减梯度与新客立减叠加，午高峰配送费减免，评价返券提升复购" * 2] for i in range(count)]
+
+
+def test_estimate_col_widths_fills_total_and_favours_long_columns():
+    widths = estimate_col_widths([20, 50, 2000])
+    assert sum(widths) == pytest.approx(TABLE_WIDTH)
+    assert widths[0] == pytest.approx(14 * mm)
+    assert widths[1] == 50
+    assert widths[2] > TABLE_WIDTH / 2
+    assert sum(estimate_col_widths([50, 50])) == pytest.approx(TABLE_WIDTH)
+
+
+def test_short_cells_are_plain_strings_long_cells_wrap():
+    registry = get_theme_styles("data-statistics")
+    table = build_fast_table(HEADERS, _rows(3) + [["A&B", "1"]], registry.styles, registry.theme)
+    data = table._cellvalues
+    assert data[0] == HEADERS
+    assert data[1][0] == "示例店0"
+    assert isinstance(data[1][2], Paragraph)
+    assert isinstance(data[4][0], Paragraph)
+    assert data[4][2] == ""
+
+
+def test_widths_measure_visible_text_not_markup():
+    assert _plain_text("<b>店长</b> &amp; 店员 &lt;3") == "店长 & 店员 <3"
+    registry = get_theme_styles("data-statistics")
+    plain = build_fast_table(["负责人", "说明"], [["店长", "A&B"]] * 3, registry.styles, registry.theme)
+    marked = build_fast_table(["**负责人**", "说明"], [["**店长**", "A&B"]] * 3, registry.styles, registry.theme)
+    assert marked._colWidths == pytest.approx(plain._colWidths)
+
+
+def test_table_style_shared_and_headers_repeat_on_split():
+    registry = get_theme_styles("market")
+    first = build_fast_table(HEADERS, _rows(200), registry.styles, registry.theme)
+    second = build_fast_table(HEADERS, _rows(2), registry.styles, registry.theme)
+    assert first._linecmds == second._linecmds
+    assert first.repeatRows == 1
+    first.wrapOn(None, TABLE_WIDTH, 700)
+    parts = first.split(TABLE_WIDTH, 700)
+    assert len(parts) == 2
+    assert parts[1]._cellvalues[0] == HEADERS
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.reportlab.theme import DEFAULT_THEME, THEMES, get_theme_styles, warm_up_styles
+
+
+def test_theme_styles_built_once_per_module():
+    first = get_theme_styles("market")
+    assert get_theme_styles("market") is first
+    assert get_theme_styles("unknown") is get_theme_styles("")
+    assert get_theme_styles("unknown").theme == DEFAULT_THEME
+
+
+def test_theme_styles_are_colored_per_theme_and_read_only():
+    brand = get_theme_styles("brand")
+    market = get_theme_styles("market")
+    assert brand.styles["title"] is not market.styles["title"]
+    assert brand.styles["title"].textColor == THEMES["brand"].primary
+    assert market.styles["section_title"].textColor == THEMES["market"].primary
+    assert brand.styles["body"].fontName == brand.font_name
+    with pytest.raises(TypeError):
+        brand.styles["title"] = market.styles["title"]
+
+
+def test_theme_styles_thread_safe():
+    warm_up_styles()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(get_theme_styles, ["data-statistics"] * 32))
+    assert all(item is results[0] for item in results)
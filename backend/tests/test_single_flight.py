@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight, flight_key
+
+
+def test_flight_key_stable_for_dict_order():
+    assert flight_key("brand", {"a": 1, "b": 2}) == flight_key("brand", {"b": 2, "a": 1})
+    assert flight_key("brand", {"a": 1}) != flight_key("market", {"a": 1})
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight()
+    calls = {"n": 0}
+
+    async def work():
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return b"%PDF"
+
+    async def run():
+        return await asyncio.gather(*(group.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == [b"%PDF"] * 5
+    assert calls["n"] == 1
+    assert group.metrics() == {"in_flight": 0, "leaders_total": 1, "shared_total": 4}
+
+
+def test_errors_propagate_to_all_waiters():
+    group = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("上游失败")
+
+    async def run():
+        return await asyncio.gather(group.do("k", work), group.do("k", work), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_one_waiter_cancel_keeps_shared_task_running():
+    group = SingleFlight()
+    calls = {"n": 0}
+
+    async def work():
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        first = asyncio.ensure_future(group.do("k", work))
+        second = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "ok"
+    assert calls["n"] == 1
+
+
+def test_last_waiter_cancel_cancels_shared_task():
+    group = SingleFlight()
+    state = {"cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        waiter = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert state["cancelled"] is True
+    assert group.metrics()["in_flight"] == 0
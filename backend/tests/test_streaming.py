@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.services.sse import format_sse
+from app.services.upstream_llm import UpstreamConfig, parse_sse_delta, stream_chat_completions
+
+
+def _sse_body(*deltas: str) -> bytes:
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": d}}]}, ensure_ascii=False)
+        for d in deltas
+    ]
+    lines.append("data: [DONE]")
+    return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def test_parse_sse_delta():
+    assert parse_sse_delta('data: {"choices": [{"delta": {"content": "你好"}}]}') == "你好"
+    assert parse_sse_delta(": keep-alive") == ""
+    assert parse_sse_delta("data: [DONE]") is None
+
+
+def test_stream_chat_completions_yields_deltas():
+    seen: dict = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["body"] = json.loads(request.content)
+        return httpx.Response(200, content=_sse_body("# 标题", "\n正文"))
+
+    async def run():
+        cfg = UpstreamConfig(base_url="https://upstream.test/v1/chat/completions", api_key="k", model="m")
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return [d async for d in stream_chat_completions(client, cfg=cfg, system="S", user_prompt="P")]
+
+    assert asyncio.run(run()) == ["# 标题", "\n正文"]
+    assert seen["body"]["stream"] is True
+
+
+def test_format_sse_multiline():
+    assert format_sse("delta", "a\nb") == "event: delta\ndata: a\ndata: b\n\n"
+
+
+def test_generate_report_stream_emits_deltas_and_done(monkeypatch):
+    async def fake_stream(_client, **_kwargs):
+        for part in ["# 标题\n", "正文"]:
+            yield part
+
+    import app.routes.reports_generate as reports_generate
+
+    monkeypatch.setattr(reports_generate, "stream_chat_completions", fake_stream)
+
+    from app.main import create_app
+
+    client = TestClient(create_app())
+    res = client.post("/api/reports/generate/stream", data={"module": "brand", "payload_json": "{}"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert "event: delta" in res.text
+    assert "event: done" in res.text
+    assert "report_id" in res.text
+
+
+def _collect_stream_events(monkeypatch, primary_error: bool, text: str) -> tuple[list, int]:
+    from app.mock_upstream import canned_report
+    from app.services import report_service
+    from app.services.upstream_llm import UpstreamError
+
+    monkeypatch.setenv("UPSTREAM_API_KEY", "k")
+    monkeypatch.setenv("UPSTREAM_MODEL_DEFAULT", "primary")
+    monkeypatch.setenv("UPSTREAM_HEDGE_MODEL_DEFAULT", "backup")
+    canned = text or json.dumps(canned_report("brand", sections=1), ensure_ascii=False)
+
+    async def fake_stream(_client, *, cfg, **_kwargs):
+        if primary_error and cfg.model == "primary":
+            raise UpstreamError("primary down")
+        yield canned[: len(canned) // 2]
+        yield canned[len(canned) // 2 :]
+
+    parses = []
+    real_parse = report_service.parse_json_text
+
+    def counting_parse(raw):
+        parses.append(raw)
+        return real_parse(raw)
+
+    monkeypatch.setattr(report_service, "stream_chat_completions", fake_stream)
+    monkeypatch.setattr(report_service, "parse_json_text", counting_parse)
+
+    async def run():
+        return [
+            (event, data)
+            async for event, data in report_service.stream_pdf_generation(
+                module="brand", payload={"storeName": "A"}, client=object(), bypass_cache=True
+            )
+        ]
+
+    return asyncio.run(run()), len(parses)
+
+
+def test_stream_pdf_generation_fails_over_like_non_stream(monkeypatch):
+    events, parses = _collect_stream_events(monkeypatch, primary_error=True, text="")
+    stages = [data.get("model", data["stage"]) for event, data in events if event == "stage"]
+    assert stages == ["prompt", "primary", "backup", "parse", "validate", "render"]
+    assert events[-1][0] == "pdf"
+    assert parses == 0
+
+
+def test_stream_pdf_generation_parses_repaired_text_once(monkeypatch):
+    from app.mock_upstream import canned_report
+
+    truncated = json.dumps(canned_report("brand", sections=2), ensure_ascii=False)[:-40]
+    events, parses = _collect_stream_events(monkeypatch, primary_error=False, text=truncated)
+    stages = [data["stage"] for event, data in events if event == "stage"]
+    assert stages[-4:] == ["parse", "repair", "validate", "render"]
+    assert events[-1][0] == "pdf"
+    assert parses == 1
+
+
+def test_generate_report_stream_reports_unexpected_errors_as_event(monkeypatch):
+    async def fake_stream(_client, **_kwargs):
+        yield "# 标题\n"
+
+    def broken_save(*_args, **_kwargs):
+        raise RuntimeError("store unavailable")
+
+    import app.routes.reports_generate as reports_generate
+
+    monkeypatch.delenv("DIAGNOSTIC_LOGS", raising=False)
+    monkeypatch.setattr(reports_generate, "stream_chat_completions", fake_stream)
+    monkeypatch.setattr(reports_generate, "_save_report", broken_save)
+
+    from app.main import create_app
+
+    client = TestClient(create_app())
+    res = client.post("/api/reports/generate/stream", data={"module": "brand", "payload_json": "{}"})
+    assert res.status_code == 200
+    assert "event: delta" in res.text
+    assert res.text.rstrip().endswith('data: {"detail": "服务器内部错误"}')
+    assert "event: error" in res.text
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from app.mock_upstream import canned_report
+from app.services.report_service import generate_pdf_bytes
+from app.services.structured_output import (
+    ParseFailureTracker,
+    get_parse_failure_tracker,
+    report_response_format,
+    structured_output_mode,
+)
+from app.services.upstream_llm import UpstreamConfig, chat_completion_result
+
+SETTINGS = SimpleNamespace(
+    upstream_structured_output={"gpt-4o-mini": "json_schema", "deepseek-chat": "json_object", "bad": "xml"},
+    upstream_structured_output_default="none",
+)
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+
+
+def test_capability_table_lookup():
+    assert structured_output_mode(SETTINGS, "gpt-4o-mini") == "json_schema"
+    assert structured_output_mode(SETTINGS, "deepseek-chat") == "json_object"
+    assert structured_output_mode(SETTINGS, "bad") == "none"
+    assert structured_output_mode(SETTINGS, "other") == "none"
+    assert report_response_format(SETTINGS, "other") is None
+    assert report_response_format(SETTINGS, "deepseek-chat") == {"type": "json_object"}
+
+
+def test_report_schema_is_strict():
+    fmt = report_response_format(SETTINGS, "gpt-4o-mini")
+    assert fmt["type"] == "json_schema"
+    assert fmt["json_schema"]["strict"] is True
+    schema = fmt["json_schema"]["schema"]
+    nodes = list(_walk(schema))
+    assert not any("oneOf" in n or "discriminator" in n or "const" in n for n in nodes)
+    for node in nodes:
+        if node.get("type") == "object":
+            assert node["additionalProperties"] is False
+            assert set(node["required"]) == set(node["properties"])
+    assert schema["$defs"]["ParagraphBlock"]["properties"]["type"] == {"enum": ["paragraph"], "type": "string"}
+
+
+def test_response_format_sent_but_dropped_for_continuations():
+    bodies: list[dict] = []
+    replies = ['{"cover": {', '"store_name": "A"}}']
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        content = replies[len(bodies) - 1]
+        finish = "length" if len(bodies) == 1 else "stop"
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}, "finish_reason": finish}]})
+
+    async def run():
+        cfg = UpstreamConfig(base_url="https://upstream.test/v1/chat/completions", api_key="k", model="gpt-4o-mini")
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await chat_completion_result(
+                client,
+                cfg=cfg,
+                system="S",
+                user_prompt="P",
+                max_continuations=1,
+                response_format=report_response_format(SETTINGS, "gpt-4o-mini"),
+            )
+
+    result = asyncio.run(run())
+    assert result.model == "gpt-4o-mini"
+    assert bodies[0]["response_format"]["json_schema"]["name"] == "report_data"
+    assert "response_format" not in bodies[1]
+
+
+def test_parse_failure_tracker_reports_rate_per_model():
+    tracker = ParseFailureTracker()
+    tracker.record("m1", mode="none", failed=True)
+    tracker.record("m1", mode="none", failed=False)
+    tracker.record("m2", mode="json_schema", failed=False)
+    metrics = tracker.metrics()
+    assert metrics["m1"] == {"mode": "none", "responses": 2, "parse_failures": 1, "failure_rate": 0.5}
+    assert metrics["m2"]["failure_rate"] == 0.0
+
+
+def test_generate_pdf_sends_schema_and_records_parse(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_API_KEY", "k")
+    monkeypatch.setenv("UPSTREAM_MODEL_DEFAULT", "schema-model")
+    monkeypatch.setenv("UPSTREAM_STRUCTURED_OUTPUT", json.dumps({"schema-model": "json_schema"}))
+    seen: dict = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["body"] = json.loads(request.content)
+        content = json.dumps(canned_report("brand", sections=1), ensure_ascii=False)
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}, "finish_reason": "stop"}]})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await generate_pdf_bytes(module="brand", payload={"storeName": "A"}, client=client, bypass_cache=True)
+
+    before = get_parse_failure_tracker().metrics().get("schema-model", {}).get("responses", 0)
+    assert asyncio.run(run()).startswith(b"%PDF")
+    assert seen["body"]["response_format"]["type"] == "json_schema"
+    stats = get_parse_failure_tracker().metrics()["schema-model"]
+    assert stats["responses"] == before + 1
+    assert stats["mode"] == "json_schema"
@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+
+from app.services.llm_cache import cache_key
+from app.services.upstream_llm import ChatResult
+from app.services.token_estimator import (
+    IMAGE_TOKENS,
+    TRIM_MARKER,
+    OutputSizeTracker,
+    estimate_messages_tokens,
+    estimate_tokens,
+    get_output_tracker,
+    plan_request,
+    repair_max_tokens,
+    trim_to_tokens,
+)
+
+
+def _settings(**overrides):
+    values = {
+        "upstream_context_window_default": 128000,
+        "upstream_context_windows": {},
+        "upstream_max_tokens_floor": 2048,
+        "upstream_max_tokens_ceiling": 16384,
+        "upstream_max_tokens_headroom": 1.3,
+        "upstream_max_tokens_min_samples": 5,
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_estimate_tokens_counts_cjk_per_char_and_words_by_length():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("外卖运营") == 4
+    assert estimate_tokens("hello world") == 4
+    assert estimate_tokens("2024年，GMV") == 2 + 1 + 1 + 1
+
+
+def test_estimate_messages_tokens_counts_overhead_and_images():
+    messages = [
+        {"role": "system", "content": "系统"},
+        {"role": "user", "content": [{"type": "text", "text": "你好"}, {"type": "image_url", "image_url": {}}]},
+    ]
+    assert estimate_messages_tokens(messages) == 4 + 2 + 4 + 2 + IMAGE_TOKENS
+
+
+def test_trim_to_tokens_keeps_head_and_marks_truncation():
+    text = "品牌" * 500
+    trimmed = trim_to_tokens(text, 100)
+    assert trimmed.endswith(TRIM_MARKER)
+    assert text.startswith(trimmed[: -len(TRIM_MARKER)])
+    assert estimate_tokens(trimmed) <= 100
+    assert trim_to_tokens("短文本", 100) == "短文本"
+
+
+def test_repair_max_tokens_scales_with_input_and_caps():
+    assert repair_max_tokens("修复" * 100, ceiling=12000) == 240 + 512
+    assert repair_max_tokens("修复" * 10000, ceiling=12000) == 12000
+
+
+def test_plan_uses_ceiling_until_enough_samples():
+    tracker = OutputSizeTracker()
+    for _ in range(4):
+        tracker.record("brand", 3000)
+    plan = plan_request(
+        usage_key="brand", model="m", system="系统", user_prompt="提示", settings=_settings(), tracker=tracker
+    )
+    assert plan.max_tokens == 16384
+
+    tracker.record("brand", 3000)
+    plan = plan_request(
+        usage_key="brand", model="m", system="系统", user_prompt="提示", settings=_settings(), tracker=tracker
+    )
+    # 3000 × 1.3 = 3900，向上取整到 512 的倍数
+    assert plan.max_tokens == 4096
+    assert not plan.trimmed
+
+
+def test_plan_respects_floor():
+    tracker = OutputSizeTracker()
+    for _ in range(5):
+        tracker.record("brand", 100)
+    plan = plan_request(
+        usage_key="brand", model="m", system="系统", user_prompt="提示", settings=_settings(), tracker=tracker
+    )
+    assert plan.max_tokens == 2048
+
+
+def test_plan_shrinks_max_tokens_then_trims_prompt_near_context_window():
+    settings = _settings(upstream_context_windows={"small": 8000})
+    tracker = OutputSizeTracker()
+
+    plan = plan_request(
+        usage_key="x", model="small", system="", user_prompt="字" * 3000, settings=settings, tracker=tracker
+    )
+    assert not plan.trimmed
+    assert plan.max_tokens == 8000 - plan.prompt_tokens
+    assert plan.max_tokens < 16384
+
+    plan = plan_request(
+        usage_key="x", model="small", system="", user_prompt="字" * 7000, settings=settings, tracker=tracker
+    )
+    assert plan.trimmed
+    assert plan.user_prompt.endswith(TRIM_MARKER)
+    assert plan.max_tokens >= 2048
+    assert plan.prompt_tokens + plan.max_tokens <= 8000
+
+
+def test_cache_key_ignores_max_tokens():
+    body = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 4096}
+    assert cache_key(body) == cache_key({**body, "max_tokens": 16384})
+
+
+def test_output_tracker_records_only_fresh_complete_completions():
+    tracker = OutputSizeTracker()
+    tracker.record_completion("brand", ChatResult(content="x", finish_reason="stop"), 100)
+    tracker.record_completion("brand", ChatResult(content="x", finish_reason="stop", cached=True), 5000)
+    tracker.record_completion("brand", ChatResult(content="x", finish_reason="length"), 10)
+    tracker.record_completion("brand", ChatResult(content="x", finish_reason="stop", continuations=1), 9000)
+    assert tracker.count("brand") == 1
+    assert tracker.percentile("brand", 0.95) == 100
+
+
+def test_generate_route_skips_cached_markdown_in_output_tracker(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.routes.reports_generate as reports_generate
+    from app.main import create_app
+
+    monkeypatch.setenv("UPSTREAM_API_KEY", "test-key")
+    flags = {"cached": True}
+
+    async def fake_chat_completions(_client, *, result, **_kwargs):  # noqa: ANN001
+        result.cached = flags["cached"]
+        result.finish_reason = "stop"
+        return "# ok"
+
+    monkeypatch.setattr(reports_generate, "chat_completions", fake_chat_completions)
+    client = TestClient(create_app())
+    key = "markdown:data-statistics"
+    before = get_output_tracker().count(key)
+
+    res = client.post("/api/reports/generate", data={"module": "data-statistics", "payload_json": "{}"})
+    assert res.status_code == 200
+    assert get_output_tracker().count(key) == before
+
+    flags["cached"] = False
+    res = client.post("/api/reports/generate", data={"module": "data-statistics", "payload_json": '{"x": 1}'})
+    assert res.status_code == 200
+    assert get_output_tracker().count(key) == before + 1